@@ -0,0 +1,66 @@
+"""Application Dash unique regroupant toutes les visualisations.
+
+Toutes les pages partagent les mêmes tables (prenoms.store), chargées une
+seule fois par processus, et le même cache de figures. En production :
+
+    gunicorn -c gunicorn.conf.py app:server
+
+(gunicorn.conf.py active preload_app : les tables sont chargées avant le
+fork et partagées par les workers.) En développement : python app.py
+"""
+import os
+import sys
+
+import dash
+import dash_bootstrap_components as dbc
+from dash import dcc, html
+from dash.dependencies import Input, Output
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from prenoms import cache, metrics, store
+from prenoms.pages import (evolution, gender, regions, regions_domtom,
+                           trajectories, trends, wordclouds)
+
+PAGES = [evolution, trajectories, trends, regions, regions_domtom, wordclouds,
+         gender]
+
+# Charger toutes les données avant de créer l'application (et avant le fork
+# des workers avec gunicorn --preload)
+store.preload()
+
+app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP],
+                suppress_callback_exceptions=True, title='Prénoms en France')
+server = app.server
+
+# Un seul cache de figures pour toutes les pages (compteurs sur /cache-stats)
+figure_cache = cache.FigureCache()
+cache.register_stats_route(app, figure_cache)
+# Latences, tailles des réponses et mémoire par callback (format Prometheus)
+metrics.register_metrics_route(app, figure_cache)
+
+for page in PAGES:
+    page.register_callbacks(app, figure_cache)
+
+app.layout = html.Div([
+    dcc.Location(id='url'),
+    dbc.NavbarSimple(
+        brand='Prénoms en France',
+        children=[dbc.NavLink(page.TITLE, href=page.PATH, active='exact')
+                  for page in PAGES],
+        color='light'
+    ),
+    html.Div(id='page-content', style={'padding': '10px'})
+])
+
+
+@app.callback(Output('page-content', 'children'), Input('url', 'pathname'))
+def display_page(pathname):
+    for page in PAGES:
+        if pathname == page.PATH:
+            return page.layout()
+    return html.Div([html.H1('Page introuvable'),
+                     dcc.Link("Retour à l'accueil", href='/')])
+
+
+if __name__ == '__main__':
+    app.run(debug=True, port=8050)
@@ -0,0 +1,25 @@
+# Configuration gunicorn de l'application Dash (app.py) :
+#     gunicorn -c gunicorn.conf.py app:server
+import gc
+import os
+
+bind = os.environ.get('PRENOMS_BIND', '0.0.0.0:8050')
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+threads = int(os.environ.get('PRENOMS_THREADS', 2))
+timeout = 120
+
+# Les données sont chargées une fois dans le processus maître puis partagées
+# par les workers (copie sur écriture)
+preload_app = True
+
+
+def pre_fork(server, worker):
+    # Sortir les objets déjà chargés du ramasse-miettes : ses parcours ne
+    # recopient pas leurs pages mémoire dans chaque worker
+    gc.freeze()
+
+
+def child_exit(server, worker):
+    # Compteurs du worker arrêté retirés de /metrics (PRENOMS_METRICS_DIR)
+    from prenoms import metrics
+    metrics.forget_process(worker.pid)
@@ -0,0 +1 @@
+# Modules partagés par les différentes visualisations des prénoms.
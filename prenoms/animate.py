@@ -0,0 +1,235 @@
+"""Animations (GIF, MP4, WebM) des nuages de mots et de la course de barres
+au fil des années, en France ou dans un département.
+
+Les images sont dessinées dans un pool de processus, par blocs d'années
+consécutives, et envoyées à l'encodeur au fur et à mesure, dans l'ordre :
+seuls les blocs en cours sont en mémoire, en pixels bruts, sans fichiers PNG
+intermédiaires. Dans un bloc, les nuages de mots reprennent la disposition
+de l'année précédente (wordclouds.stable_layout) : les mots ne sautent pas
+d'une image à l'autre. Plus les blocs sont longs (--chunk), moins il y a de
+raccords ; avec --workers 1 il n'y en a aucun.
+
+Le GIF est écrit directement avec PIL. MP4 et WebM passent par ffmpeg (le
+programme ffmpeg, ou celui du paquet imageio-ffmpeg s'il est installé).
+
+    cd Initial\\ Implementation
+    PYTHONPATH=.. python -m prenoms.animate wordcloud --department Paris \\
+        --years 1950 2020 --out paris.mp4 [--variant top10] [--workers 4]
+    PYTHONPATH=.. python -m prenoms.animate barrace --sex 2 \\
+        --popularity populaire --out filles.gif [--dpt 75 --dpt 92]
+"""
+import argparse
+import os
+import shutil
+import subprocess
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from prenoms import barrace, data, store, wordclouds
+
+FORMATS = ('gif', 'mp4', 'webm')
+# Options d'encodage de ffmpeg par format (pixels en yuv420p : lisibles par
+# tous les navigateurs)
+FFMPEG_CODECS = {
+    'mp4': ['-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-crf', '23'],
+    'webm': ['-c:v', 'libvpx-vp9', '-pix_fmt', 'yuv420p', '-b:v', '0', '-crf', '32'],
+}
+CHUNK_YEARS = 10
+FPS = 2
+
+
+class GifEncoder:
+    """GIF écrit image par image (palette propre à chaque image)."""
+
+    def __init__(self, path, size, fps):
+        self.file = open(path, 'wb')
+        self.size = size
+        self.duration = int(1000 / fps)
+        self.started = False
+
+    def write(self, frame):
+        from PIL import GifImagePlugin, Image
+        image = Image.frombytes('RGB', self.size, frame).quantize(256)
+        if not self.started:
+            header, _ = GifImagePlugin.getheader(image, info={'loop': 0})
+            self.file.write(b''.join(header))
+            self.started = True
+        self.file.write(b''.join(GifImagePlugin.getdata(
+            image, duration=self.duration, include_color_table=True)))
+
+    def close(self):
+        self.file.write(b';')
+        self.file.close()
+
+
+def ffmpeg_path():
+    """Programme ffmpeg : celui du système, sinon celui d'imageio-ffmpeg."""
+    path = shutil.which('ffmpeg')
+    if path:
+        return path
+    try:
+        import imageio_ffmpeg
+    except ImportError:
+        return None
+    return imageio_ffmpeg.get_ffmpeg_exe()
+
+
+class FfmpegEncoder:
+    """Vidéo encodée par ffmpeg, qui lit les images brutes sur son entrée."""
+
+    def __init__(self, path, size, fps, fmt):
+        executable = ffmpeg_path()
+        if executable is None:
+            raise RuntimeError('ffmpeg introuvable : installez ffmpeg ou '
+                               'pip install imageio-ffmpeg (ou choisissez un GIF)')
+        command = [executable, '-y', '-loglevel', 'error',
+                   '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+                   '-s', f'{size[0]}x{size[1]}', '-r', str(fps), '-i', '-',
+                   *FFMPEG_CODECS[fmt], path]
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE)
+
+    def write(self, frame):
+        self.process.stdin.write(frame)
+
+    def close(self):
+        self.process.stdin.close()
+        if self.process.wait():
+            raise RuntimeError(f'ffmpeg a échoué (code {self.process.returncode})')
+
+
+def open_encoder(path, size, fps):
+    fmt = os.path.splitext(path)[1].lstrip('.').lower()
+    if fmt not in FORMATS:
+        raise ValueError(f'Format inconnu : {fmt} ({", ".join(FORMATS)})')
+    if fmt == 'gif':
+        return GifEncoder(path, size, fps)
+    return FfmpegEncoder(path, size, fps, fmt)
+
+
+def _init_worker(csv_path):
+    store.use_csv(csv_path)
+
+
+def wordcloud_frames(department, years, variant):
+    """Images brutes (RGB) des nuages de mots de years, années consécutives
+    d'un même bloc : la disposition passe d'une année à la suivante."""
+    layouts = {}
+    return [wordclouds.generate_wordcloud(department, year, variant, layouts).tobytes()
+            for year in years]
+
+
+@lru_cache(maxsize=None)
+def _bar_race_data(sex, depts, popularity_type):
+    from prenoms.pages import evolution
+    return evolution.bar_race_data(sex, list(depts), popularity_type)
+
+
+def bar_race_frames(sex, depts, popularity_type, indices):
+    """Images brutes (RGB) de la course de barres pour les années d'indices
+    indices."""
+    compact = _bar_race_data(sex, depts, popularity_type)
+    return [barrace.frame_image(compact, i).tobytes() for i in indices]
+
+
+def _chunks(values, size):
+    return [values[i:i + size] for i in range(0, len(values), size)]
+
+
+def encode(path, size, fps, func, chunks, csv_path=data.CSV_PATH, workers=None):
+    """Appelle func(*chunk) pour chaque bloc dans un pool de processus et
+    envoie les images à l'encodeur dans l'ordre, en gardant au plus
+    quelques blocs en mémoire."""
+    encoder = open_encoder(path, size, fps)
+    workers = workers or os.cpu_count() or 1
+    written = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(csv_path,)) as pool:
+            pending = deque()
+            chunks = iter(chunks)
+            for chunk in chunks:
+                pending.append(pool.submit(func, *chunk))
+                if len(pending) >= workers + 1:
+                    break
+            while pending:
+                for frame in pending.popleft().result():
+                    encoder.write(frame)
+                    written += 1
+                chunk = next(chunks, None)
+                if chunk is not None:
+                    pending.append(pool.submit(func, *chunk))
+                print(f'{written} images', flush=True)
+    finally:
+        encoder.close()
+    return written
+
+
+def animate_wordcloud(path, department=wordclouds.ALL_DEPARTMENTS, years=None,
+                      variant='simple', fps=FPS, csv_path=data.CSV_PATH,
+                      workers=None, chunk_years=CHUNK_YEARS):
+    """Animation des nuages de mots de department pour years (toutes les
+    années par défaut), dans l'ordre chronologique."""
+    _init_worker(csv_path)
+    years = sorted(years or wordclouds.years())
+    chunks = [(department, chunk, variant) for chunk in _chunks(years, chunk_years)]
+    return encode(path, wordclouds.IMAGE_SIZE, fps, wordcloud_frames, chunks,
+                  csv_path, workers)
+
+
+def animate_bar_race(path, sex='Tous', depts=(), popularity_type='populaire',
+                     years=None, fps=FPS, csv_path=data.CSV_PATH, workers=None,
+                     chunk_years=CHUNK_YEARS):
+    """Animation de la course de barres (France, ou somme des départements
+    depts) pour years (toutes les années par défaut)."""
+    _init_worker(csv_path)
+    depts = tuple(depts)
+    compact = _bar_race_data(sex, depts, popularity_type)
+    wanted = set(years) if years else None
+    indices = [i for i, year in enumerate(compact['years'])
+               if wanted is None or year in wanted]
+    chunks = [(sex, depts, popularity_type, chunk)
+              for chunk in _chunks(indices, chunk_years)]
+    return encode(path, barrace.FRAME_SIZE, fps, bar_race_frames, chunks,
+                  csv_path, workers)
+
+
+def _sex(value):
+    return value if value == 'Tous' else int(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Animations au fil des années')
+    parser.add_argument('kind', choices=['wordcloud', 'barrace'])
+    parser.add_argument('csv_path', nargs='?', default=data.CSV_PATH)
+    parser.add_argument('--out', required=True,
+                        help='fichier de sortie (.gif, .mp4 ou .webm)')
+    parser.add_argument('--years', type=int, nargs=2, metavar=('DEBUT', 'FIN'))
+    parser.add_argument('--fps', type=float, default=FPS)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk', type=int, default=CHUNK_YEARS,
+                        help="années consécutives rendues par un même processus")
+    parser.add_argument('--department', default=wordclouds.ALL_DEPARTMENTS,
+                        help='nuages de mots : nom du département')
+    parser.add_argument('--variant', choices=wordclouds.VARIANTS, default='simple')
+    parser.add_argument('--sex', type=_sex, default='Tous', choices=['Tous', 1, 2])
+    parser.add_argument('--popularity', choices=['populaire', 'impopulaire'],
+                        default='populaire')
+    parser.add_argument('--dpt', action='append', default=[],
+                        help='course de barres : code de département (répétable)')
+    args = parser.parse_args(argv)
+
+    years = range(args.years[0], args.years[1] + 1) if args.years else None
+    if args.kind == 'wordcloud':
+        count = animate_wordcloud(args.out, args.department, years and list(years),
+                                  args.variant, args.fps, args.csv_path,
+                                  args.workers, args.chunk)
+    else:
+        count = animate_bar_race(args.out, args.sex, args.dpt, args.popularity,
+                                 years and list(years), args.fps, args.csv_path,
+                                 args.workers, args.chunk)
+    print(f'{count} images écrites dans {args.out}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,254 @@
+"""Construction de la course de barres de la visualisation 1.
+
+Le top N de chaque année est obtenu en une passe (tri puis rang dans
+l'année), les étiquettes sont construites par opérations vectorisées et
+les frames sont assemblées à partir de tableaux déjà découpés par année.
+
+compact_data() renvoie les mêmes informations sous forme de colonnes
+(année, prénom, effectif) avec un dictionnaire des prénoms : c'est ce qui
+est envoyé au navigateur, qui construit lui-même les frames
+(EXPAND_FIGURE_JS). L'animation peut avancer par pas de plusieurs années.
+"""
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from prenoms import metrics
+
+N_BARS = 15
+# Pas de temps proposés pour l'animation, en années
+STEPS = (1, 5, 10)
+# Avancement signalé toutes les PROGRESS_STEP frames
+PROGRESS_STEP = 10
+
+
+def top_per_year(grouped, n=N_BARS, ascending=False):
+    """Les n prénoms les plus (ou les moins) donnés de chaque année.
+
+    grouped a les colonnes annais, preusuel, nombre ; le résultat est trié par
+    année puis par effectif.
+    """
+    years = grouped['annais'].to_numpy()
+    counts = grouped['nombre'].to_numpy().astype(np.int64)
+    # Tri stable sur les entiers, puis rang dans l'année
+    order = np.lexsort((counts if ascending else -counts, years))
+    years = years[order]
+    starts = np.flatnonzero(np.r_[True, years[1:] != years[:-1]])
+    rank = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+    return grouped.iloc[order[rank < n]]
+
+
+def _split_by_year(top, colors):
+    """Découpe les colonnes de top en tableaux par année.
+
+    Renvoie les années et, pour chacune, (prénoms, effectifs, étiquettes,
+    couleurs).
+    """
+    years = top['annais'].to_numpy()
+    codes = top['preusuel'].cat.codes.to_numpy()
+    names = np.asarray(top['preusuel'].cat.categories, dtype=object)[codes]
+    labels = names + ' (' + top['nombre'].to_numpy().astype(str).astype(object) + ')'
+    bounds = np.flatnonzero(years[1:] != years[:-1]) + 1
+    columns = [np.split(column, bounds) for column in
+               (names, top['nombre'].to_numpy(), labels, colors[codes])]
+    starts = np.concatenate([[0], bounds]).astype(int)
+    return years[starts] if len(years) else years, list(zip(*columns))
+
+
+def _bar(names, counts, labels, colors):
+    return go.Bar(
+        x=counts,
+        y=names,
+        text=labels,
+        textposition='inside',
+        orientation='h',
+        marker=dict(color=colors)
+    )
+
+
+def _title_prefix(popularity_type):
+    return f'Prénoms {"les moins populaires" if popularity_type == "impopulaire" else "les plus populaires"} en '
+
+
+def _title(popularity_type, year):
+    return f'{_title_prefix(popularity_type)}{int(year)}'
+
+
+def _layout(popularity_type, first_year, max_count):
+    return go.Layout(
+        title=_title(popularity_type, first_year) if first_year is not None else '',
+        xaxis=dict(title='Nombre de naissances', range=[0, max_count * 1.1]),  # Ajuster la plage de l'axe x dynamiquement
+        yaxis=dict(title='Prénom', autorange='reversed'),
+        margin=dict(l=100, r=40, t=40, b=40),  # Ajuster les marges
+        transition=dict(duration=500),
+        updatemenus=[dict(
+            type='buttons',
+            showactive=False,
+            y=1,
+            x=1.15,
+            xanchor='right',
+            yanchor='top',
+            pad=dict(t=0, r=10),
+            buttons=[
+                dict(
+                    label='Play',
+                    method='animate',
+                    args=[None, dict(frame=dict(duration=500, redraw=True),
+                                     fromcurrent=True, mode='immediate')]
+                ),
+                dict(
+                    label='Stop',
+                    method='animate',
+                    args=[[None], dict(frame=dict(duration=0, redraw=False),
+                                      mode='immediate', transition=dict(duration=0))]
+                )
+            ]
+        )]
+    )
+
+
+def every(grouped, step):
+    """Garde une année sur step (la première et la dernière sont gardées)."""
+    if step <= 1 or grouped.empty:
+        return grouped
+    years = grouped['annais'].to_numpy()
+    first, last = years.min(), years.max()
+    return grouped[((years - first) % step == 0) | (years == last)]
+
+
+@metrics.timed('bar_race_figure')
+def bar_race_figure(grouped, colors, popularity_type, n=N_BARS,
+                    progress=None):
+    """Figure animée (une frame par année) à partir des sommes par année et
+    par prénom ; progress(fait, total) est appelé au fil des frames.
+
+    preusuel est catégorielle ; colors donne la couleur de chaque prénom,
+    indexée par son code (store.name_colors()).
+    """
+    top = top_per_year(grouped, n, ascending=(popularity_type == 'impopulaire'))
+    years, bars = _split_by_year(top, colors)
+
+    frames = []
+    for i, year in enumerate(years):
+        frames.append(go.Frame(
+            data=[_bar(*bars[i])],
+            name=str(year),
+            layout=go.Layout(title=_title(popularity_type, year))
+        ))
+        if progress is not None and (i + 1) % PROGRESS_STEP == 0:
+            progress(i + 1, len(years))
+
+    fig = go.Figure(
+        data=[_bar(*bars[0])] if len(years) else [],
+        layout=_layout(popularity_type, years[0] if len(years) else None,
+                       top['nombre'].max() if len(years) else 0),
+        frames=frames
+    )
+    return fig
+
+
+@metrics.timed('bar_race_data')
+def compact_data(grouped, colors, popularity_type, n=N_BARS, step=1):
+    """Données de la course de barres en colonnes, pour EXPAND_FIGURE_JS.
+
+    Les lignes sont triées par année puis par rang ; celles de l'année
+    years[i] sont entre offsets[i] et offsets[i + 1]. Les prénoms sont des
+    indices dans names (et colors), qui ne contient que les prénoms
+    affichés : les libellés ne sont lus qu'ici, à partir des codes.
+    """
+    top = top_per_year(every(grouped, step), n,
+                       ascending=(popularity_type == 'impopulaire'))
+    years = top['annais'].to_numpy()
+    bounds = np.flatnonzero(years[1:] != years[:-1]) + 1
+    starts = np.concatenate([[0], bounds]).astype(int)
+    codes, used = pd.factorize(top['preusuel'].cat.codes.to_numpy())
+    first_year = int(years[0]) if len(years) else None
+    return {
+        'years': years[starts].tolist() if len(years) else [],
+        'offsets': starts.tolist() + [len(years)],
+        'names': np.asarray(top['preusuel'].cat.categories)[used].tolist(),
+        'colors': colors[used].tolist(),
+        'name': codes.tolist(),
+        'count': top['nombre'].tolist(),
+        'title': _title_prefix(popularity_type),
+        'layout': _layout(popularity_type, first_year,
+                          top['nombre'].max() if len(years) else 0).to_plotly_json(),
+    }
+
+
+# Images fixes de la course de barres (vidéos, voir prenoms.animate)
+FRAME_SIZE = (1280, 720)
+FRAME_MARGIN = 40
+FRAME_LABEL_WIDTH = 220
+
+
+@lru_cache(maxsize=None)
+def _frame_font(size):
+    # Police du paquet wordcloud, comme les nuages de mots (accents compris)
+    from PIL import ImageFont
+    from wordcloud.wordcloud import FONT_PATH
+    return ImageFont.truetype(FONT_PATH, size)
+
+
+def frame_image(data, i, size=FRAME_SIZE):
+    """Image PIL de l'année data['years'][i] de compact_data(data), à la
+    même échelle pour toutes les années."""
+    from PIL import Image, ImageDraw
+    width, height = size
+    image = Image.new('RGB', size, 'white')
+    draw = ImageDraw.Draw(image)
+    title_font, font = _frame_font(32), _frame_font(18)
+    draw.text((width // 2, FRAME_MARGIN // 2), f"{data['title']}{data['years'][i]}",
+              fill='black', font=title_font, anchor='mt')
+
+    top = FRAME_MARGIN + 40
+    left = FRAME_MARGIN + FRAME_LABEL_WIDTH
+    max_count = data['layout']['xaxis']['range'][1] or 1
+    rows = range(data['offsets'][i], data['offsets'][i + 1])
+    row_height = (height - top - FRAME_MARGIN) / max(len(rows), N_BARS)
+    for rank, j in enumerate(rows):
+        name, count = data['names'][data['name'][j]], data['count'][j]
+        y = top + rank * row_height
+        middle = y + row_height / 2
+        length = (width - left - FRAME_MARGIN) * count / max_count
+        draw.rectangle([left, y + 2, left + length, y + row_height - 2],
+                       fill=data['colors'][data['name'][j]] or 'gray')
+        draw.text((left - 10, middle), name, fill='black', font=font, anchor='rm')
+        draw.text((left + length + 5, middle), str(count), fill='black',
+                  font=font, anchor='lm')
+    return image
+
+
+# Fonction clientside : construit la figure animée (une frame par année)
+# à partir de compact_data
+EXPAND_FIGURE_JS = """
+function(data) {
+    if (!data) {
+        return window.dash_clientside.no_update;
+    }
+    var frames = [];
+    for (var i = 0; i < data.years.length; i++) {
+        var x = [], y = [], text = [], color = [];
+        for (var j = data.offsets[i]; j < data.offsets[i + 1]; j++) {
+            var name = data.names[data.name[j]];
+            x.push(data.count[j]);
+            y.push(name);
+            text.push(name + ' (' + data.count[j] + ')');
+            color.push(data.colors[data.name[j]]);
+        }
+        frames.push({
+            name: String(data.years[i]),
+            data: [{type: 'bar', x: x, y: y, text: text, textposition: 'inside',
+                    orientation: 'h', marker: {color: color}}],
+            layout: {title: {text: data.title + data.years[i]}}
+        });
+    }
+    return {
+        data: frames.length ? [frames[0].data[0]] : [],
+        layout: data.layout,
+        frames: frames
+    };
+}
+"""
@@ -0,0 +1,277 @@
+"""Mesures de performance du chargement, des agrégats et des callbacks.
+
+Un jeu de données synthétique au format de dpt2020.csv est généré à 1, 10
+et 100 fois le nombre de lignes du vrai fichier (prénoms répartis selon une
+loi de Zipf, quelques lignes _PRENOMS_RARES, XX et XXXX comme dans les
+données). Pour chaque taille, on mesure :
+
+- la construction de chaque cache (prénoms, cube, top K, séries,
+  tendances, indicateurs régionaux, mixité), une fois ;
+- les fonctions appelées par les callbacks (course de barres, cartes, top
+  50, nuages de mots, trajectoires...), répétées --repeat fois.
+
+Pour chaque mesure : latence (médiane et minimum, en ms), pic de mémoire
+(allouée pendant un appel pour les callbacks, avec tracemalloc ; mémoire
+résidente du processus pour les constructions, en Mo) et taille de la
+réponse envoyée au navigateur (JSON ou image, en Ko). --json enregistre les
+résultats ; --compare signale (code de retour 1) les mesures plus lentes
+que celles d'un fichier précédent de plus de --tolerance.
+
+À lancer depuis le répertoire des GeoJSON :
+
+    cd Initial\\ Implementation
+    PYTHONPATH=.. python -m prenoms.bench [--scales 1 10 100] [--repeat 5]
+                                          [--dir /tmp/prenoms-bench]
+                                          [--json resultats.json]
+                                          [--compare reference.json]
+"""
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from prenoms import (cube, data, gender, geo, metrics, regional, series, store,
+                     topk, trends)
+
+SCALES = (1, 10, 100)
+# Nombre de lignes de dpt2020.csv, si le fichier n'est pas disponible
+BASE_ROWS = 3_700_000
+FIRST_YEAR, LAST_YEAR = 1900, 2020
+REPEAT = 5
+TOLERANCE = 0.25
+
+
+def _departments():
+    try:
+        return sorted(geo.department_names(geo.GEOJSON_DOMTOM))
+    except OSError:
+        return [f'{i:02d}' for i in range(1, 96)]
+
+
+def generate_csv(path, rows, seed=0, chunksize=data.CHUNK_ROWS):
+    """Écrit un CSV synthétique de rows lignes au format de dpt2020.csv."""
+    rng = np.random.default_rng(seed)
+    n_names = max(200, rows // 400)
+    names = np.array([f'PRENOM{i}' for i in range(n_names)], dtype=object)
+    depts = np.array(_departments(), dtype=object)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write('sexe;preusuel;annais;dpt;nombre\n')
+        for start in range(0, rows, chunksize):
+            n = min(chunksize, rows - start)
+            chunk = pd.DataFrame({
+                'sexe': rng.integers(1, 3, n),
+                'preusuel': names[(rng.zipf(1.3, n) - 1) % n_names],
+                'annais': rng.integers(FIRST_YEAR, LAST_YEAR + 1, n).astype(str).astype(object),
+                'dpt': rng.choice(depts, n),
+                'nombre': rng.geometric(0.05, n) + 2,
+            })
+            # Lignes écartées par le nettoyage, comme dans les vraies données
+            noise = rng.random(n)
+            chunk.loc[noise < 0.02, 'preusuel'] = '_PRENOMS_RARES'
+            chunk.loc[(noise >= 0.02) & (noise < 0.03), 'annais'] = 'XXXX'
+            chunk.loc[(noise >= 0.03) & (noise < 0.04), 'dpt'] = 'XX'
+            chunk.to_csv(f, sep=';', header=False, index=False)
+    os.replace(tmp, path)
+    return path
+
+
+def base_rows(csv_path=data.CSV_PATH):
+    """Nombre de lignes du vrai fichier (sans l'en-tête), ou BASE_ROWS."""
+    if not os.path.exists(csv_path):
+        return BASE_ROWS
+    with open(csv_path, 'rb') as f:
+        return sum(block.count(b'\n') for block in iter(lambda: f.read(2**20), b'')) - 1
+
+
+def payload_size(value):
+    """Taille en octets de ce qui est envoyé au navigateur pour value."""
+    if value is None:
+        return 0
+    if isinstance(value, bytes):
+        return len(value)
+    from PIL import Image
+    if isinstance(value, Image.Image):
+        from io import BytesIO
+        buf = BytesIO()
+        value.save(buf, format='png')
+        return len(buf.getvalue())
+    if hasattr(value, 'to_json') and not hasattr(value, 'to_plotly_json'):
+        return len(value.to_json())  # graphique Altair
+    from plotly.utils import PlotlyJSONEncoder
+    return len(json.dumps(value, cls=PlotlyJSONEncoder))
+
+
+def measure(func, repeat=REPEAT):
+    """Latence (médiane, minimum), pic de mémoire et taille du résultat de
+    func()."""
+    tracemalloc.start()
+    try:
+        result = func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {'latency_ms': statistics.median(times) * 1000 if times else None,
+            'min_ms': min(times) * 1000 if times else None,
+            'peak_mb': peak / 2**20,
+            'payload_kb': payload_size(result) / 1024}
+
+
+def _timed(func):
+    """Mesure d'une construction : un seul appel. tracemalloc ralentirait
+    la lecture du CSV d'un facteur 10 : la mémoire indiquée est le pic de
+    mémoire résidente du processus à la fin de l'étape."""
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    return {'latency_ms': elapsed * 1000, 'min_ms': elapsed * 1000,
+            'peak_mb': (metrics.max_rss() or 0) / 2**20, 'payload_kb': 0.0}
+
+
+def build_cases(csv_path):
+    """Constructions des caches de csv_path, dans l'ordre de dépendance."""
+    return [
+        ('cache des prénoms', lambda: data.load_names(csv_path, rebuild=True)),
+        ('cube', lambda: cube.load_cube(csv_path, rebuild=True)),
+        ('top K', lambda: topk.load_topk(csv_path, rebuild=True)),
+        ('séries', lambda: series.load_series(csv_path, rebuild=True)),
+        ('tendances', lambda: trends.load_trends(csv_path, rebuild=True)),
+        ('indicateurs régionaux', lambda: regional.load_regional(csv_path, rebuild=True)),
+        ('mixité', lambda: gender.load_gender(csv_path, rebuild=True)),
+    ]
+
+
+def callback_cases():
+    """Fonctions appelées par les callbacks, sur les données de store."""
+    from prenoms import barrace, wordclouds
+    from prenoms.pages import (evolution, gender as gender_page, regions,
+                               regions_domtom, trajectories,
+                               trends as trends_page)
+
+    years = store.aggregates().years
+    year = years[len(years) // 2]
+    depts = store.top_names().depts.tolist()[:3]
+    national = store.aggregates().national_years(cube.SEX_ALL)[['annais', 'preusuel', 'nombre']]
+    names = store.top_names().national(year, k=5)['preusuel'].tolist()
+    department = wordclouds.departments()[1]
+    colour_values = regions_domtom.colour_values.__wrapped__
+    return [
+        ('course de barres, France', lambda: evolution.bar_race_data('Tous', None, 'populaire')),
+        ('course de barres, 3 départements',
+         lambda: evolution.bar_race_data('Tous', depts, 'populaire')),
+        ('course de barres, pas de 10 ans',
+         lambda: evolution.bar_race_data('Tous', None, 'populaire', 10)),
+        ('course de barres, figure complète',
+         lambda: barrace.bar_race_figure(national, store.name_colors(), 'populaire')),
+        ('carte (create_map)', lambda: regions.create_map(year)),
+        ('top 50 (create_top50_table)', lambda: regions.create_top50_table(year)),
+        ('carte et top 50 (callback)', lambda: regions.content(year)),
+        ('carte DOM-TOM', lambda: regions_domtom.create_map(year)),
+        ('carte DOM-TOM, diversité', lambda: colour_values('diversity')),
+        ('carte DOM-TOM, quotients', lambda: colour_values('lq', names[0])),
+        ('nuage de mots, département',
+         lambda: wordclouds.generate_wordcloud(department, year, 'top10')),
+        ('nuage de mots, France',
+         lambda: wordclouds.generate_wordcloud(wordclouds.ALL_DEPARTMENTS, year, 'top10')),
+        ('trajectoires, 5 prénoms', lambda: trajectories.create_figure(names, None, cube.SEX_ALL)),
+        ('trajectoires, 3 départements',
+         lambda: trajectories.create_figure(names, depts, cube.SEX_ALL)),
+        ('recherche approchée', lambda: store.name_series().search.search('PRENOM1X')),
+        ('tendances', lambda: trends_page.create_table(
+            store.trend_stats().ranking('burst', cube.SEX_ALL, trends_page.N_ROWS))),
+        ('mixité', lambda: gender_page.create_figure(
+            store.gender_mix().most_mixed(gender_page.N_LINES)['preusuel'].tolist(), None)),
+    ]
+
+
+def run_scale(scale, rows, directory, repeat=REPEAT, regenerate=False):
+    """Génère (si besoin) le jeu de données de taille scale et renvoie ses
+    mesures."""
+    csv_path = os.path.join(directory, f'x{scale}', data.CSV_PATH)
+    if regenerate or not os.path.exists(csv_path):
+        print(f'Génération de {csv_path} ({rows:,} lignes)', flush=True)
+        generate_csv(csv_path, rows)
+    results = []
+
+    def record(kind, case, values):
+        results.append(dict(values, scale=scale, rows=rows, kind=kind, case=case))
+        print(_format(results[-1]), flush=True)
+
+    # Les tables des tailles déjà mesurées ne doivent pas rester en mémoire
+    # (store et caches des pages) : elles fausseraient les pics de mémoire
+    store.clear()
+    gc.collect()
+    for case, func in build_cases(csv_path):
+        record('construction', case, _timed(func))
+    store.use_csv(csv_path)
+    for case, func in callback_cases():
+        record('callback', case, measure(func, repeat))
+    return results
+
+
+def _format(result):
+    latency = result['latency_ms']
+    return (f"x{result['scale']:<4} {result['kind']:<12} {result['case']:<36} "
+            f"{latency:10.1f} ms  {result['peak_mb']:8.1f} Mo  "
+            f"{result['payload_kb']:8.1f} Ko")
+
+
+def compare(results, reference, tolerance=TOLERANCE):
+    """Mesures plus lentes que reference (même taille, même cas) de plus de
+    tolerance."""
+    previous = {(r['scale'], r['kind'], r['case']): r for r in reference}
+    slower = []
+    for result in results:
+        before = previous.get((result['scale'], result['kind'], result['case']))
+        if before and result['latency_ms'] > before['latency_ms'] * (1 + tolerance):
+            slower.append((result, before))
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Mesures de performance')
+    parser.add_argument('--scales', type=int, nargs='+', default=list(SCALES))
+    parser.add_argument('--base-rows', type=int, default=None,
+                        help='lignes à l\'échelle 1 (celles de dpt2020.csv par défaut)')
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    parser.add_argument('--dir', default=os.path.join(data.CACHE_DIRNAME, 'bench'),
+                        help='répertoire des jeux de données synthétiques')
+    parser.add_argument('--regenerate', action='store_true')
+    parser.add_argument('--json', help='fichier où enregistrer les résultats')
+    parser.add_argument('--compare', help='résultats de référence (--json)')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    args = parser.parse_args(argv)
+
+    rows = args.base_rows or base_rows()
+    results = []
+    for scale in args.scales:
+        results += run_scale(scale, rows * scale, args.dir, args.repeat,
+                             args.regenerate)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=1)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            slower = compare(results, json.load(f), args.tolerance)
+        for result, before in slower:
+            print(f"Plus lent : x{result['scale']} {result['kind']} {result['case']} "
+                  f"{before['latency_ms']:.1f} -> {result['latency_ms']:.1f} ms")
+        return 1 if slower else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
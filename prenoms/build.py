@@ -0,0 +1,200 @@
+"""Construction parallèle du cache des prénoms, du cube et de l'index top K.
+
+Chaque étape est découpée en tâches indépendantes réparties sur un
+ProcessPoolExecutor :
+
+- lecture : chaque CSV est découpé en plages d'octets alignées sur les fins
+  de ligne ; chaque processus lit, nettoie et somme sa plage, puis les
+  sommes partielles sont fusionnées par prenoms.data.fold ;
+- cube : les processus relisent le cache des prénoms mappé en mémoire (rien
+  n'est envoyé par pickle) et calculent les agrégats d'un groupe d'années
+  consécutives ; la fusion est un tri stable des morceaux sur les clés ;
+- top K : même découpage par années à partir du cube mappé en mémoire, les
+  tableaux denses sont recollés le long de l'axe des années.
+
+    python -m prenoms.build [dpt2020.csv] [--workers N]
+"""
+import argparse
+import io
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from prenoms import cube, data, topk
+
+# Taille maximale d'une plage d'octets lue par une tâche
+RANGE_BYTES = 64 * 2**20
+# Nombre de tâches par processus, pour équilibrer la charge
+TASKS_PER_WORKER = 4
+
+_worker_cache_dir = None
+
+
+@contextmanager
+def _stage(timings, name):
+    start = time.perf_counter()
+    yield
+    timings[name] = time.perf_counter() - start
+
+
+def _init_worker(cache_dir):
+    global _worker_cache_dir
+    _worker_cache_dir = cache_dir
+
+
+def _byte_ranges(path, parts):
+    """Découpe le fichier (sans l'en-tête) en plages [début, fin) d'octets."""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        start = len(f.readline())
+    parts = max(parts, -(-(size - start) // RANGE_BYTES), 1)
+    bounds = [start + (size - start) * i // parts for i in range(parts + 1)]
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+
+
+def _fold_range(path, start, stop, chunksize):
+    """Somme les lignes du CSV qui commencent dans [start, stop)."""
+    with open(path, 'rb') as f:
+        columns = f.readline().decode('utf-8').strip().split(';')
+        # Une ligne appartient à la plage qui contient son premier octet
+        f.seek(start - 1)
+        f.readline()
+        first = f.tell()
+        f.seek(stop - 1)
+        f.readline()
+        last = f.tell()
+        f.seek(first)
+        buffer = f.read(max(last - first, 0))
+    if not buffer:
+        return None
+    reader = pd.read_csv(io.BytesIO(buffer), sep=';', header=None,
+                         names=columns, dtype=data.RAW_DTYPES,
+                         chunksize=chunksize)
+    with reader:
+        return data.fold(data.clean(raw) for raw in reader)
+
+
+def _read_parallel(pool, paths, parts, chunksize):
+    """Équivalent parallèle de prenoms.data.read_sources."""
+    frame = None
+    for path in paths:
+        futures = [pool.submit(_fold_range, path, start, stop, chunksize)
+                   for start, stop in _byte_ranges(path, parts)]
+        new = data.fold(part for part in (future.result() for future in futures)
+                        if part is not None)
+        frame = new if frame is None else data.replace_years(frame, new, ['annais'])
+    return frame
+
+
+def _year_groups(years, weights, parts):
+    """Groupes d'années consécutives de poids (nombre de lignes) proches."""
+    cumulative = np.cumsum(weights)
+    targets = cumulative[-1] * np.arange(1, parts) / parts
+    cuts = np.unique(np.searchsorted(cumulative, targets, side='right'))
+    return [group.tolist() for group in np.split(np.asarray(years), cuts)
+            if len(group)]
+
+
+def _codes(frame):
+    """Colonnes de frame en tableaux numpy (codes pour les catégorielles) :
+    évite d'envoyer les catégories avec chaque résultat."""
+    return {col: frame[col].cat.codes.to_numpy()
+            if isinstance(frame[col].dtype, pd.CategoricalDtype)
+            else frame[col].to_numpy() for col in frame.columns}
+
+
+def _rollup_years(first_year, last_year):
+    names = data.load_frame(os.path.join(_worker_cache_dir, 'names'))
+    annais = names['annais'].to_numpy()
+    start, stop = np.searchsorted(annais, [first_year, last_year + 1])
+    rows = names.iloc[start:stop]
+    return (_codes(cube.rollup(rows, cube.NATIONAL_KEYS)),
+            _codes(cube.rollup(rows, cube.DEPARTMENTAL_KEYS)))
+
+
+def _merge(parts, keys, template):
+    """Recolle les morceaux (un par groupe d'années) d'une table du cube et
+    la trie par keys ; l'ordre à l'intérieur de chaque clé est conservé."""
+    columns = {col: np.concatenate([part[col] for part in parts])
+               for col in parts[0]}
+    order = np.lexsort([columns[key] for key in keys][::-1])
+    frame = {}
+    for col, values in columns.items():
+        values = values[order]
+        if isinstance(template[col].dtype, pd.CategoricalDtype):
+            values = pd.Categorical.from_codes(
+                values, categories=template[col].cat.categories, validate=False)
+        frame[col] = values
+    return pd.DataFrame(frame)
+
+
+def _topk_years(years):
+    aggregates = cube.load_cube_dir(os.path.join(_worker_cache_dir, 'cube'))
+    return topk.dense_tables(aggregates, np.asarray(years, dtype=np.int16))
+
+
+def build_all(csv_path=data.CSV_PATH, cache_dir=None, workers=None,
+              chunksize=data.CHUNK_ROWS):
+    """(Re)construit le cache des prénoms, le cube et l'index top K en
+    parallèle et renvoie la durée de chaque étape en secondes."""
+    cache_dir = cache_dir or data.cache_dir_for(csv_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    parts = workers * TASKS_PER_WORKER
+    paths = data.sources(csv_path, cache_dir)
+    names_dir = os.path.join(cache_dir, 'names')
+    cube_dir = os.path.join(cache_dir, 'cube')
+    timings = OrderedDict()
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(cache_dir,)) as pool:
+        with _stage(timings, 'lecture'):
+            names = _read_parallel(pool, paths, parts, chunksize)
+            data.save_frame(names, names_dir)
+            data.mark_fresh(paths, os.path.join(cache_dir, 'names.json'))
+
+        with _stage(timings, 'cube'):
+            years, weights = np.unique(names['annais'].to_numpy(),
+                                       return_counts=True)
+            groups = _year_groups(years, weights, parts)
+            results = list(pool.map(_rollup_years, [g[0] for g in groups],
+                                    [g[-1] for g in groups]))
+            os.makedirs(cube_dir, exist_ok=True)
+            for i, (table, keys) in enumerate(
+                    (('national', cube.NATIONAL_KEYS),
+                     ('departmental', cube.DEPARTMENTAL_KEYS))):
+                data.save_frame(_merge([r[i] for r in results], keys, names),
+                                os.path.join(cube_dir, table))
+            data.mark_fresh(paths, os.path.join(cache_dir, 'cube.json'))
+
+        with _stage(timings, 'top K'):
+            aggregates = cube.load_cube_dir(cube_dir)
+            all_years = topk.year_range(aggregates)
+            groups = np.array_split(all_years, min(parts, len(all_years)))
+            tables = list(pool.map(_topk_years, [g.tolist() for g in groups]))
+            merged = {key: np.concatenate([t[key] for t in tables])
+                      for key in tables[0]}
+            topk.save_topk(aggregates, all_years, merged,
+                           os.path.join(cache_dir, 'topk'))
+            data.mark_fresh(paths, os.path.join(cache_dir, 'topk.json'))
+
+    timings['total'] = time.perf_counter() - start
+    return timings
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Construction parallèle du cache, du cube et du top K')
+    parser.add_argument('csv_path', nargs='?', default=data.CSV_PATH)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunksize', type=int, default=data.CHUNK_ROWS)
+    args = parser.parse_args()
+    for stage, seconds in build_all(args.csv_path, workers=args.workers,
+                                    chunksize=args.chunksize).items():
+        print(f'{stage:<10} {seconds:8.2f} s')
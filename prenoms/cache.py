@@ -0,0 +1,224 @@
+"""Cache des figures renvoyées par les callbacks.
+
+Les callbacks sont des fonctions pures de leurs entrées : leur résultat est
+mémorisé sous une clé normalisée (les listes, comme les départements
+sélectionnés, ne dépendent pas de l'ordre) qui comprend la version des
+données (store.data_version) : après une reconstruction ou un ajout de
+fichiers, les figures calculées sur les anciennes données ne sont plus
+relues. Le cache mémoire est borné en octets avec éviction LRU ; un second
+niveau optionnel sur disque, lui aussi borné, peut être partagé par
+plusieurs workers gunicorn.
+
+Configuration par variables d'environnement :
+PRENOMS_CACHE_MAX_MB (taille du cache mémoire, 256 Mo par défaut),
+PRENOMS_CACHE_DIR (répertoire du cache disque, désactivé par défaut) et
+PRENOMS_CACHE_DISK_MAX_MB (taille du cache disque, 1024 Mo par défaut).
+"""
+import functools
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+from prenoms import store
+
+DEFAULT_MAX_MB = 256
+DEFAULT_DISK_MAX_MB = 1024
+# Le cache disque est ramené à cette fraction de sa taille maximale quand
+# il la dépasse
+DISK_TRIM_RATIO = 0.9
+
+
+def normalize(value):
+    """Rend une entrée de callback hashable. Les listes et les ensembles
+    (sélections multiples) ne dépendent pas de l'ordre, une liste vide
+    équivaut à None (aucun filtre) ; les tuples gardent leur ordre."""
+    if isinstance(value, (list, set, frozenset)):
+        if not value:
+            return None
+        return tuple(sorted((normalize(v) for v in value), key=repr))
+    if isinstance(value, tuple):
+        return tuple(normalize(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, normalize(v)) for k, v in value.items()))
+    return value
+
+
+def args_key(args):
+    """Clé des arguments positionnels d'un callback : chacun est normalisé,
+    leur ordre est gardé."""
+    return tuple(normalize(arg) for arg in args)
+
+
+class FigureCache:
+    """Cache LRU borné en mémoire, avec un niveau disque optionnel."""
+
+    def __init__(self, max_bytes=None, disk_dir=None, disk_max_bytes=None,
+                 version=store.data_version):
+        if max_bytes is None:
+            max_bytes = int(float(os.environ.get('PRENOMS_CACHE_MAX_MB',
+                                                 DEFAULT_MAX_MB)) * 2**20)
+        if disk_dir is None:
+            disk_dir = os.environ.get('PRENOMS_CACHE_DIR') or None
+        if disk_max_bytes is None:
+            disk_max_bytes = int(float(os.environ.get('PRENOMS_CACHE_DISK_MAX_MB',
+                                                      DEFAULT_DISK_MAX_MB)) * 2**20)
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.version = version
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._disk_size = 0
+        self._trimming = False
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._disk_size = sum(size for _, _, size in self._disk_files())
+
+    def _disk_path(self, key):
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.disk_dir, digest + '.pkl')
+
+    def _disk_files(self):
+        """(date de dernière lecture, chemin, taille) des entrées sur disque."""
+        files = []
+        with os.scandir(self.disk_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith('.pkl'):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    files.append((stat.st_mtime_ns, entry.path, stat.st_size))
+        return files
+
+    def _trim_disk(self):
+        """Supprime les entrées les moins récemment lues jusqu'à
+        DISK_TRIM_RATIO de disk_max_bytes. La taille est recalculée sur le
+        répertoire : les autres workers y écrivent aussi. Appelé sans le
+        verrou, pour que les lectures en mémoire n'attendent pas le disque."""
+        try:
+            files = sorted(self._disk_files())
+            size = sum(size for _, _, size in files)
+            target = self.disk_max_bytes * DISK_TRIM_RATIO
+            evicted = 0
+            for _, path, file_size in files:
+                if size <= target:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                size -= file_size
+                evicted += 1
+            with self._lock:
+                self._disk_size = size
+                self.disk_evictions += evicted
+        finally:
+            with self._lock:
+                self._trimming = False
+
+    def _store(self, key, value, size):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self._size += size
+            while self._size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= evicted
+                self.evictions += 1
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+        if self.disk_dir:
+            try:
+                with open(self._disk_path(key), 'rb') as f:
+                    payload = f.read()
+            except OSError:
+                pass
+            else:
+                # La date de modification sert de date de dernière lecture
+                # pour l'éviction
+                try:
+                    os.utime(self._disk_path(key))
+                except OSError:
+                    pass
+                value = pickle.loads(payload)
+                self._store(key, value, len(payload))
+                with self._lock:
+                    self.disk_hits += 1
+                return value
+        with self._lock:
+            self.misses += 1
+        return default
+
+    def set(self, key, value):
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self._store(key, value, len(payload))
+        if self.disk_dir:
+            path = self._disk_path(key)
+            tmp = '%s.tmp-%d-%d' % (path, os.getpid(), threading.get_ident())
+            with open(tmp, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp, path)
+            with self._lock:
+                self._disk_size += len(payload)
+                trim = self._disk_size > self.disk_max_bytes and not self._trimming
+                self._trimming = self._trimming or trim
+            if trim:
+                self._trim_disk()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'disk_hits': self.disk_hits,
+                    'misses': self.misses, 'evictions': self.evictions,
+                    'disk_evictions': self.disk_evictions,
+                    'entries': len(self._entries), 'bytes': self._size,
+                    'max_bytes': self.max_bytes}
+
+    def memoize(self, func=None, ignore=()):
+        """Décorateur : mémorise func selon ses arguments normalisés et la
+        version des données, sans tenir compte des arguments nommés listés
+        dans ignore (fonction d'avancement...)."""
+        if func is None:
+            return functools.partial(self.memoize, ignore=ignore)
+        missing = object()
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (func.__module__, func.__qualname__, args_key(args),
+                   normalize({k: v for k, v in kwargs.items() if k not in ignore}),
+                   self.version() if self.version else None)
+            value = self.get(key, missing)
+            if value is missing:
+                value = func(*args, **kwargs)
+                self.set(key, value)
+            return value
+        return wrapper
+
+
+def register_stats_route(app, cache, path='/cache-stats'):
+    """Expose les compteurs du cache en JSON sur le serveur Flask de Dash."""
+    import flask
+    app.server.add_url_rule(path, 'cache_stats',
+                            lambda: flask.jsonify(cache.stats()))
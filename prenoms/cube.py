@@ -0,0 +1,186 @@
+"""Cube d'agrégats (sexe, année, département) -> effectifs par prénom.
+
+Le cube est construit une fois à partir du cache de prenoms.data et persisté
+à côté de lui. Chaque agrégat est trié par clé puis par effectif décroissant,
+et un index clé -> (début, fin) permet aux callbacks de lire une tranche sans
+parcourir toute la table. Le sexe 0 (SEX_ALL) regroupe les deux sexes.
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from prenoms import data, metrics
+
+SEX_ALL = 0
+
+NATIONAL_KEYS = ['sexe', 'annais']
+DEPARTMENTAL_KEYS = ['sexe', 'annais', 'dpt']
+
+
+def rollup(names, keys):
+    """Somme des naissances par clé et par prénom, pour chaque sexe et pour
+    les deux sexes réunis, triée par clé puis par effectif décroissant."""
+    by_sex = names.groupby(keys + ['preusuel'], observed=True,
+                           sort=False)['nombre'].sum().reset_index()
+    both = names.groupby([k for k in keys if k != 'sexe'] + ['preusuel'],
+                         observed=True, sort=False)['nombre'].sum().reset_index()
+    both['sexe'] = SEX_ALL
+    frame = pd.concat([by_sex, both[by_sex.columns]], ignore_index=True)
+    frame = frame.astype({'sexe': np.uint8, 'annais': np.int16,
+                          'nombre': np.int32})
+    frame = frame.sort_values(keys + ['nombre', 'preusuel'],
+                              ascending=[True] * len(keys) + [False, True])
+    return frame.reset_index(drop=True)
+
+
+def _key_codes(column):
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column.cat.codes.to_numpy()
+    return column.to_numpy()
+
+
+def _partition_index(frame, keys):
+    """Index clé -> (début, fin) pour chaque préfixe de keys.
+
+    Pour keys = ['sexe', 'annais'], on obtient à la fois les entrées (sexe,)
+    et (sexe, annais).
+    """
+    index = {}
+    n = len(frame)
+    if n == 0:
+        return index
+    change = np.zeros(n, dtype=bool)
+    change[0] = True
+    for level in range(1, len(keys) + 1):
+        codes = _key_codes(frame[keys[level - 1]])
+        change[1:] |= codes[1:] != codes[:-1]
+        starts = np.flatnonzero(change)
+        stops = np.append(starts[1:], n)
+        labels = [frame[k].iloc[starts].tolist() for k in keys[:level]]
+        for key, start, stop in zip(zip(*labels), starts.tolist(), stops.tolist()):
+            index[key] = (start, stop)
+    return index
+
+
+def _take(frame, bounds):
+    """Concatène les tranches [début, fin) de frame sans parcourir le reste."""
+    bounds = [b for b in bounds if b is not None]
+    if not bounds:
+        return frame.iloc[0:0]
+    if len(bounds) == 1:
+        start, stop = bounds[0]
+        return frame.iloc[start:stop]
+    positions = np.concatenate([np.arange(start, stop) for start, stop in bounds])
+    return frame.iloc[positions]
+
+
+class AggregateCube:
+    """Agrégats national (sexe, année) et départemental (sexe, année, dpt).
+
+    Toutes les tranches renvoyées ont les colonnes de la table d'origine et
+    sont triées par effectif décroissant à l'intérieur de chaque clé.
+    """
+
+    def __init__(self, national, departmental):
+        self.national = national
+        self.departmental = departmental
+        self._national_index = _partition_index(national, NATIONAL_KEYS)
+        self._departmental_index = _partition_index(departmental,
+                                                    DEPARTMENTAL_KEYS)
+        # Années (entiers) présentes, calculées une fois
+        self.years = sorted({int(key[1]) for key in self._national_index
+                             if len(key) == 2})
+
+    def year_rows(self, years):
+        """Lignes nationales et départementales des années years, pour tous
+        les sexes, dans l'ordre des tables."""
+        sexes = sorted({key[0] for key in self._national_index})
+        keys = [(sex, year) for sex in sexes for year in years]
+        return (_take(self.national, [self._national_index.get(key) for key in keys]),
+                _take(self.departmental,
+                      [self._departmental_index.get(key) for key in keys]))
+
+    def national_slice(self, year, sex=SEX_ALL):
+        """Prénoms d'une année au niveau national."""
+        return _take(self.national, [self._national_index.get((sex, year))])
+
+    def national_years(self, sex=SEX_ALL):
+        """Prénoms de toutes les années au niveau national, par année."""
+        return _take(self.national, [self._national_index.get((sex,))])
+
+    def department_slice(self, year, dept, sex=SEX_ALL):
+        """Prénoms d'une année dans un département."""
+        return _take(self.departmental,
+                     [self._departmental_index.get((sex, year, dept))])
+
+    def year_departments(self, year, sex=SEX_ALL):
+        """Prénoms d'une année dans tous les départements, par département."""
+        return _take(self.departmental,
+                     [self._departmental_index.get((sex, year))])
+
+    @metrics.timed('departments_groupby')
+    def departments_years(self, depts, sex=SEX_ALL):
+        """Prénoms de toutes les années, sommés sur les départements choisis.
+
+        Renvoie les colonnes annais, preusuel, nombre, triées par année puis
+        par effectif décroissant comme national_years. Les sommes sont un
+        np.bincount sur la clé entière (année, code du prénom).
+        """
+        years = self.years
+        bounds = [bound for bound in (self._departmental_index.get((sex, year, dept))
+                                      for year in years for dept in depts)
+                  if bound is not None]
+        positions = (np.concatenate([np.arange(start, stop) for start, stop in bounds])
+                     if bounds else np.zeros(0, dtype=np.int64))
+        names = self.departmental['preusuel']
+        n_names = len(names.cat.categories)
+        first_year = years[0] if years else 0
+        key = ((self.departmental['annais'].to_numpy()[positions].astype(np.int64)
+                - first_year) * n_names + names.cat.codes.to_numpy()[positions])
+        sums = np.bincount(key, self.departmental['nombre'].to_numpy()[positions],
+                           minlength=len(years) * n_names)
+        key = np.flatnonzero(sums)
+        count = sums[key].astype(np.int32)
+        year, code = np.divmod(key, n_names)
+        # Catégories triées : l'ordre des codes est celui des prénoms
+        order = np.lexsort((code, -count, year))
+        return pd.DataFrame({
+            'annais': (year[order] + first_year).astype(np.int16),
+            'preusuel': pd.Categorical.from_codes(code[order], dtype=names.dtype),
+            'nombre': count[order],
+        })
+
+
+def build_cube(names, cube_dir):
+    os.makedirs(cube_dir, exist_ok=True)
+    data.save_frame(rollup(names, NATIONAL_KEYS),
+                    os.path.join(cube_dir, 'national'))
+    data.save_frame(rollup(names, DEPARTMENTAL_KEYS),
+                    os.path.join(cube_dir, 'departmental'))
+
+
+def load_cube(csv_path=data.CSV_PATH, cache_dir=None, rebuild=False):
+    """Charge le cube d'agrégats, en le (re)construisant si le CSV a changé."""
+    cache_dir = cache_dir or data.cache_dir_for(csv_path)
+    cube_dir = os.path.join(cache_dir, 'cube')
+    meta_path = os.path.join(cache_dir, 'cube.json')
+    paths = data.sources(csv_path, cache_dir)
+    if rebuild or not data.is_fresh(paths, meta_path):
+        build_cube(data.load_names(csv_path, cache_dir), cube_dir)
+        data.mark_fresh(paths, meta_path)
+    return load_cube_dir(cube_dir)
+
+
+def load_cube_dir(cube_dir):
+    """Relit (en mappant les colonnes) un cube écrit dans cube_dir."""
+    return AggregateCube(data.load_frame(os.path.join(cube_dir, 'national')),
+                         data.load_frame(os.path.join(cube_dir, 'departmental')))
+
+
+if __name__ == '__main__':
+    # python -m prenoms.cube [chemin/vers/dpt2020.csv]
+    path = sys.argv[1] if len(sys.argv) > 1 else data.CSV_PATH
+    load_cube(path, rebuild=True)
+    print('Cube écrit dans', os.path.join(data.cache_dir_for(path), 'cube'))
@@ -0,0 +1,324 @@
+"""Chargement partagé de dpt2020.csv.
+
+Le CSV est lu une seule fois, par blocs : chaque bloc est nettoyé puis
+ajouté aux sommes par (sexe, année, département, prénom), si bien que la
+mémoire utilisée dépend de la taille des blocs et du nombre de clés, pas de
+celle du fichier. Le résultat est écrit dans un cache colonnaire (un fichier
+.npy par colonne). Les démarrages suivants mappent ce cache en mémoire au
+lieu de reparser le texte, et les processus d'un même serveur partagent
+ainsi les mêmes pages.
+
+Des fichiers supplémentaires (nouvelles années) peuvent être ajoutés au
+cache sans relire dpt2020.csv, voir prenoms.ingest ; ils sont listés dans
+SOURCES_FILENAME et relus avec lui en cas de reconstruction.
+"""
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+
+from prenoms import metrics
+
+CSV_PATH = 'dpt2020.csv'
+CACHE_DIRNAME = '.prenoms_cache'
+CACHE_VERSION = 2
+SOURCES_FILENAME = 'sources.json'
+
+CHUNK_ROWS = 500000
+# Nombre de lignes en attente au-delà duquel elles sont ajoutées aux sommes
+FOLD_ROWS = 2000000
+
+YEAR_MIN = 1900
+
+# Noms de colonnes utilisés par la visualisation 2
+ENGLISH_COLUMNS = {'sexe': 'sex', 'preusuel': 'name', 'annais': 'year',
+                   'dpt': 'dept', 'nombre': 'count'}
+
+
+def clean(raw):
+    """Nettoie un extrait brut du CSV et renvoie un DataFrame typé."""
+    raw = raw[(raw['preusuel'] != '_PRENOMS_RARES') & (raw['dpt'] != 'XX')]
+    annais = pd.to_numeric(raw['annais'], errors='coerce')
+    nombre = pd.to_numeric(raw['nombre'], errors='coerce')
+    sexe = pd.to_numeric(raw['sexe'], errors='coerce')
+    keep = ((annais >= YEAR_MIN) & nombre.notna()
+            & sexe.notna() & raw['preusuel'].notna() & raw['dpt'].notna())
+    return pd.DataFrame({
+        'sexe': sexe[keep].to_numpy(dtype=np.uint8),
+        'preusuel': pd.Categorical(raw['preusuel'][keep]),
+        'annais': annais[keep].to_numpy(dtype=np.int16),
+        'dpt': pd.Categorical(raw['dpt'][keep]),
+        'nombre': nombre[keep].to_numpy(dtype=np.int32),
+    })
+
+
+RAW_DTYPES = {'preusuel': str, 'annais': str, 'dpt': str}
+KEYS = ['sexe', 'annais', 'dpt', 'preusuel']
+
+
+def read_csv(csv_path=CSV_PATH):
+    raw = pd.read_csv(csv_path, sep=';', dtype=RAW_DTYPES)
+    return clean(raw)
+
+
+def iter_chunks(csv_path=CSV_PATH, chunksize=CHUNK_ROWS):
+    """Lit le CSV par blocs de chunksize lignes et renvoie chaque bloc
+    nettoyé (mêmes colonnes que clean)."""
+    with pd.read_csv(csv_path, sep=';', dtype=RAW_DTYPES,
+                     chunksize=chunksize) as reader:
+        for raw in reader:
+            yield clean(raw)
+
+
+class _Vocabulary:
+    """Correspondance valeur -> code commune à tous les blocs, complétée
+    par les valeurs nouvelles de chaque bloc."""
+
+    def __init__(self):
+        self.values = pd.Index([], dtype=object)
+
+    def encode(self, column):
+        """Codes des valeurs d'une colonne catégorielle."""
+        categories = column.cat.categories
+        mapping = self.values.get_indexer(categories).astype(np.int32)
+        new = mapping < 0
+        if new.any():
+            mapping[new] = len(self.values) + np.arange(new.sum(), dtype=np.int32)
+            self.values = self.values.append(categories[new].astype(object))
+        if not len(mapping):
+            return np.zeros(len(column), dtype=np.int32)
+        return mapping[column.cat.codes.to_numpy()]
+
+    def categorical(self, codes):
+        """Catégorielle aux catégories triées à partir de codes."""
+        values = np.asarray(self.values, dtype=object)
+        order = np.argsort(values.astype(str), kind='stable')
+        rank = np.empty(len(order), dtype=np.int32)
+        rank[order] = np.arange(len(order), dtype=np.int32)
+        return pd.Categorical.from_codes(rank[codes], categories=values[order],
+                                         validate=False)
+
+
+# Bits de chaque clé dans la clé entière unique utilisée pour sommer
+_KEY_BITS = {'sexe': 8, 'annais': 16, 'dpt': 16, 'preusuel': 24}
+
+
+def _sum_keys(frames):
+    """Somme nombre par clé ; les quatre clés (entières) sont regroupées en
+    un seul entier 64 bits, bien plus rapide à hacher qu'un groupby
+    multi-colonnes."""
+    frame = pd.concat(frames, ignore_index=True)
+    packed = np.zeros(len(frame), dtype=np.int64)
+    for key in KEYS:
+        packed = (packed << _KEY_BITS[key]) | frame[key].to_numpy().astype(np.int64)
+    sums = frame['nombre'].groupby(packed, sort=False).sum()
+    packed = sums.index.to_numpy()
+    columns = {}
+    for key in reversed(KEYS):
+        columns[key] = packed & ((1 << _KEY_BITS[key]) - 1)
+        packed = packed >> _KEY_BITS[key]
+    return pd.DataFrame(dict({key: columns[key] for key in KEYS},
+                             nombre=sums.to_numpy()))
+
+
+def fold(chunks):
+    """Somme les naissances par (sexe, année, département, prénom) sur un
+    itérable de blocs nettoyés.
+
+    Seules les sommes (en entiers) et les blocs en attente sont gardés en
+    mémoire. Le résultat a les colonnes de clean, avec des catégories
+    triées, et est trié par année.
+    """
+    names, depts = _Vocabulary(), _Vocabulary()
+    totals, pending, pending_rows = [], [], 0
+    for chunk in chunks:
+        pending.append(pd.DataFrame({
+            'sexe': chunk['sexe'].to_numpy(),
+            'annais': chunk['annais'].to_numpy(),
+            'dpt': depts.encode(chunk['dpt']),
+            'preusuel': names.encode(chunk['preusuel']),
+            'nombre': chunk['nombre'].to_numpy(dtype=np.int64),
+        }))
+        pending_rows += len(chunk)
+        if pending_rows >= FOLD_ROWS:
+            totals = [_sum_keys(totals + pending)]
+            pending, pending_rows = [], 0
+    if pending or not totals:
+        frames = totals + pending
+        totals = [_sum_keys(frames) if frames else pd.DataFrame(
+            {key: np.zeros(0, dtype=np.int32) for key in KEYS + ['nombre']})]
+    frame = totals[0].sort_values('annais', kind='stable')
+    return pd.DataFrame({
+        'sexe': frame['sexe'].to_numpy(dtype=np.uint8),
+        'preusuel': names.categorical(frame['preusuel'].to_numpy()),
+        'annais': frame['annais'].to_numpy(dtype=np.int16),
+        'dpt': depts.categorical(frame['dpt'].to_numpy()),
+        'nombre': frame['nombre'].to_numpy(dtype=np.int32),
+    })
+
+
+def align_categories(frames, column):
+    """Recode column dans chaque DataFrame de frames sur l'union triée de
+    leurs catégories (sur place) ; l'ordre relatif des valeurs est gardé."""
+    categories = sorted(set().union(*(frame[column].cat.categories
+                                      for frame in frames)))
+    for frame in frames:
+        frame[column] = frame[column].cat.set_categories(categories)
+
+
+def _sort_codes(frame, keys):
+    return [frame[key].cat.codes.to_numpy()
+            if isinstance(frame[key].dtype, pd.CategoricalDtype)
+            else frame[key].to_numpy() for key in keys]
+
+
+def replace_years(frame, new, keys):
+    """Remplace dans frame (trié par keys) les années présentes dans new
+    (triée de la même façon) et renvoie le résultat trié par keys."""
+    kept = frame[~frame['annais'].isin(np.unique(new['annais']))]
+    kept, new = kept.copy(), new.copy()
+    for column in ('preusuel', 'dpt'):
+        if column in frame.columns:
+            align_categories([kept, new], column)
+    merged = pd.concat([kept, new], ignore_index=True)
+    # Tri stable : l'ordre à l'intérieur de chaque clé est conservé
+    order = np.lexsort(_sort_codes(merged, keys)[::-1])
+    return merged.iloc[order].reset_index(drop=True)
+
+
+def read_sources(paths, chunksize=CHUNK_ROWS):
+    """Lit et somme un ou plusieurs CSV par blocs (voir fold). Les années
+    d'un fichier remplacent celles des fichiers qui le précèdent."""
+    if isinstance(paths, str):
+        paths = [paths]
+    frame = None
+    for path in paths:
+        new = fold(iter_chunks(path, chunksize))
+        frame = new if frame is None else replace_years(frame, new, ['annais'])
+    return frame
+
+
+def save_frame(frame, directory):
+    """Écrit un DataFrame colonne par colonne (codes + catégories pour les
+    colonnes catégorielles) de façon atomique."""
+    tmp = directory + '.tmp-%d' % os.getpid()
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    columns = []
+    for col in frame.columns:
+        values = frame[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            categories = np.asarray(values.cat.categories, dtype=str)
+            np.save(os.path.join(tmp, col + '.categories.npy'), categories)
+            np.save(os.path.join(tmp, col + '.codes.npy'),
+                    values.cat.codes.to_numpy())
+            columns.append([col, 'category'])
+        else:
+            np.save(os.path.join(tmp, col + '.npy'), values.to_numpy())
+            columns.append([col, 'array'])
+    with open(os.path.join(tmp, 'columns.json'), 'w') as f:
+        json.dump(columns, f)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp, directory)
+
+
+def load_frame(directory, mmap=True):
+    """Relit un DataFrame écrit par save_frame, en mappant les colonnes."""
+    mode = 'r' if mmap else None
+    with open(os.path.join(directory, 'columns.json')) as f:
+        columns = json.load(f)
+    data = {}
+    for col, kind in columns:
+        if kind == 'category':
+            categories = np.load(os.path.join(directory, col + '.categories.npy'))
+            codes = np.load(os.path.join(directory, col + '.codes.npy'),
+                            mmap_mode=mode)
+            data[col] = pd.Categorical.from_codes(
+                codes, categories=categories.astype(object), validate=False)
+        else:
+            data[col] = np.load(os.path.join(directory, col + '.npy'),
+                                mmap_mode=mode)
+    return pd.DataFrame(data, copy=False)
+
+
+def cache_dir_for(csv_path=CSV_PATH):
+    return os.path.join(os.path.dirname(os.path.abspath(csv_path)), CACHE_DIRNAME)
+
+
+def appended_sources(cache_dir):
+    """Fichiers ajoutés au cache par prenoms.ingest, dans l'ordre d'ajout."""
+    try:
+        with open(os.path.join(cache_dir, SOURCES_FILENAME)) as f:
+            return [path for path in json.load(f) if os.path.exists(path)]
+    except (OSError, ValueError):
+        return []
+
+
+def record_sources(cache_dir, paths):
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(os.path.join(cache_dir, SOURCES_FILENAME), 'w') as f:
+        json.dump(paths, f)
+
+
+def sources(csv_path=CSV_PATH, cache_dir=None):
+    """Le CSV principal suivi des fichiers ajoutés au cache."""
+    cache_dir = cache_dir or cache_dir_for(csv_path)
+    return [csv_path] + appended_sources(cache_dir)
+
+
+def _source_meta(paths):
+    if isinstance(paths, str):
+        paths = [paths]
+    stats = [os.stat(path) for path in paths]
+    return {'version': CACHE_VERSION,
+            'sources': [[stat.st_size, stat.st_mtime_ns] for stat in stats]}
+
+
+def is_fresh(paths, meta_path):
+    """Vrai si l'artefact décrit par meta_path a été construit à partir de la
+    version actuelle du ou des fichiers sources paths."""
+    try:
+        with open(meta_path) as f:
+            return json.load(f) == _source_meta(paths)
+    except (OSError, ValueError):
+        return False
+
+
+def mark_fresh(paths, meta_path):
+    with open(meta_path, 'w') as f:
+        json.dump(_source_meta(paths), f)
+
+
+@metrics.timed('csv_load')
+def build_store(csv_path=CSV_PATH, cache_dir=None, chunksize=CHUNK_ROWS):
+    """Lit le CSV (et les fichiers ajoutés) par blocs et (ré)écrit le cache
+    colonnaire."""
+    cache_dir = cache_dir or cache_dir_for(csv_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    paths = sources(csv_path, cache_dir)
+    save_frame(read_sources(paths, chunksize), os.path.join(cache_dir, 'names'))
+    mark_fresh(paths, os.path.join(cache_dir, 'names.json'))
+    return cache_dir
+
+
+def load_names(csv_path=CSV_PATH, cache_dir=None, rebuild=False):
+    """Renvoie les données nettoyées de dpt2020.csv.
+
+    Colonnes : sexe (uint8), preusuel (category), annais (int16),
+    dpt (category), nombre (int32). Le cache est reconstruit si le CSV a
+    changé depuis sa création.
+    """
+    cache_dir = cache_dir or cache_dir_for(csv_path)
+    if rebuild or not is_fresh(sources(csv_path, cache_dir),
+                               os.path.join(cache_dir, 'names.json')):
+        build_store(csv_path, cache_dir)
+    return load_frame(os.path.join(cache_dir, 'names'))
+
+
+if __name__ == '__main__':
+    # python -m prenoms.data [chemin/vers/dpt2020.csv]
+    path = sys.argv[1] if len(sys.argv) > 1 else CSV_PATH
+    print('Cache écrit dans', build_store(path))
@@ -0,0 +1,308 @@
+"""Export statique : toutes les visualisations en fichiers à servir tels
+quels (nginx, CDN, python -m http.server), sans Python à chaque requête.
+
+Le site contient :
+
+- evolution.html et data/barrace/ : les données compactes de la course de
+  barres (barrace.compact_data) pour chaque sexe, popularité et pas de
+  temps, transformées en figure animée dans le navigateur par
+  barrace.EXPAND_FIGURE_JS ;
+- carte.html, geo/ et data/carte.json : les contours simplifiés des
+  départements (une seule fois) et le prénom le plus donné de chaque
+  département pour chaque année ;
+- nuages.html et wordclouds/ : les nuages de mots de chaque (département,
+  année), rendus en parallèle (wordclouds.prerender) ;
+- plotly.min.js, copié depuis le paquet plotly : aucune ressource externe.
+
+La reconstruction est incrémentale : un fichier n'est réécrit que si son
+contenu change (les outils de synchronisation vers un CDN ne renvoient que
+ceux-là) et les nuages de mots déjà rendus sont gardés tant que les données
+n'ont pas changé. À lancer depuis le répertoire des GeoJSON :
+
+    cd Initial\\ Implementation
+    PYTHONPATH=.. python -m prenoms.export [--out site] [--workers N]
+                                           [--variant simple|top10]
+                                           [--format png|webp] [--force]
+                                           [chemin/vers/dpt2020.csv]
+"""
+import argparse
+import json
+import os
+
+from prenoms import barrace, data, geo, store, wordclouds
+
+OUT_DIR = 'site'
+SEXES = {'Tous': 'tous', 1: 'garcons', 2: 'filles'}
+POPULARITIES = ('populaire', 'impopulaire')
+
+
+def _write(path, content):
+    """Écrit content (str ou octets) dans path s'il a changé ; renvoie vrai
+    si le fichier a été écrit."""
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == content:
+                return False
+    except OSError:
+        pass
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = '%s.tmp-%d' % (path, os.getpid())
+    with open(tmp, 'wb') as f:
+        f.write(content)
+    os.replace(tmp, path)
+    return True
+
+
+def _json(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+def bar_race_file(sex, popularity_type, step):
+    return f'data/barrace/{SEXES[sex]}-{popularity_type}-{step}.json'
+
+
+def bar_race_files():
+    """Données de la course de barres (France entière) de chaque
+    combinaison de filtres de la page évolution."""
+    from prenoms.pages import evolution
+    for sex in SEXES:
+        for popularity_type in POPULARITIES:
+            for step in barrace.STEPS:
+                yield (bar_race_file(sex, popularity_type, step),
+                       _json(evolution.bar_race_data(sex, None, popularity_type, step)))
+
+
+def map_files():
+    """Contours simplifiés (une seule fois) et prénom le plus donné de
+    chaque département, année par année."""
+    with open(geo.map_file(geo.GEOJSON_DOMTOM), 'rb') as f:
+        yield 'geo/departements.geojson', f.read()
+    names = geo.department_names(geo.GEOJSON_DOMTOM)
+    top_names = store.top_names()
+    years = top_names.years.tolist()
+    depts = sorted(names)
+    index = {dept: i for i, dept in enumerate(depts)}
+    name, count = [], []
+    for year in years:
+        frame = top_names.most_frequent_by_department(year)
+        year_name, year_count = [None] * len(depts), [None] * len(depts)
+        for dept, preusuel, nombre in zip(frame['dpt'].astype(str),
+                                          frame['preusuel'].astype(str),
+                                          frame['nombre'].tolist()):
+            if dept in index:
+                year_name[index[dept]] = preusuel
+                year_count[index[dept]] = nombre
+        name.append(year_name)
+        count.append(year_count)
+    yield 'data/carte.json', _json({
+        'years': years, 'depts': depts,
+        'labels': [names[dept] for dept in depts],
+        'name': name, 'count': count})
+
+
+def wordcloud_files(out_dir, variants, fmt):
+    """Index des images de nuages de mots : chemin relatif de chaque
+    (variante, département, année)."""
+    directory = os.path.join(out_dir, 'wordclouds')
+
+    def relative(department, year, variant):
+        path = wordclouds.image_path(directory, department, year, variant, fmt)
+        return os.path.relpath(path, out_dir).replace(os.sep, '/')
+
+    # Le chemin d'une image ne dépend que du code du département et de l'année
+    years = wordclouds.years()
+    departments = wordclouds.departments()
+    yield 'data/nuages.json', _json({
+        'years': years,
+        'departments': departments,
+        'variants': list(variants),
+        'patterns': {variant: {department: relative(department, '{year}', variant)
+                               for department in departments}
+                     for variant in variants}})
+
+
+PAGE = """<!DOCTYPE html>
+<html lang="fr">
+<head>
+<meta charset="utf-8">
+<title>{title} - Prénoms en France</title>
+<script src="plotly.min.js"></script>
+<style>
+body {{font-family: sans-serif; background: #f8f9fa; margin: 0}}
+nav {{background: white; padding: 10px 20px}}
+nav a {{margin-right: 20px}}
+.panel {{background: white; padding: 20px; border-radius: 5px; margin: 10px}}
+label {{font-weight: bold; margin-right: 10px}}
+</style>
+</head>
+<body>
+<nav><a href="index.html">Prénoms en France</a>
+<a href="evolution.html">Évolution des prénoms</a>
+<a href="carte.html">Carte</a>
+<a href="nuages.html">Nuages de mots</a></nav>
+<div class="panel"><h1>{title}</h1>{body}</div>
+<script>
+{script}
+</script>
+</body>
+</html>
+"""
+
+INDEX_BODY = """
+<p>Version statique des visualisations des prénoms donnés en France de 1900
+à 2020 : évolution des prénoms les plus (et les moins) populaires, prénom le
+plus donné dans chaque département et nuages de mots par département.</p>
+<ul>
+<li><a href="evolution.html">Évolution des prénoms</a></li>
+<li><a href="carte.html">Carte des prénoms par département</a></li>
+<li><a href="nuages.html">Nuages de mots par département et par année</a></li>
+</ul>
+"""
+
+EVOLUTION_BODY = """
+<label>Sexe</label>
+<select id="sex">
+<option value="tous">Tous</option><option value="garcons">Garçons</option>
+<option value="filles">Filles</option>
+</select>
+<label>Popularité</label>
+<select id="popularity">
+<option value="populaire">Les plus populaires</option>
+<option value="impopulaire">Les moins populaires</option>
+</select>
+<label>Pas de temps</label>
+<select id="step">STEP_OPTIONS</select>
+<div id="chart" style="height: 70vh"></div>
+"""
+
+EVOLUTION_SCRIPT = """
+var expand = EXPAND_FIGURE_JS;
+function update() {
+    var file = 'data/barrace/' + document.getElementById('sex').value + '-'
+        + document.getElementById('popularity').value + '-'
+        + document.getElementById('step').value + '.json';
+    fetch(file).then(function(r) { return r.json(); }).then(function(data) {
+        Plotly.react('chart', expand(data));
+    });
+}
+['sex', 'popularity', 'step'].forEach(function(id) {
+    document.getElementById(id).addEventListener('change', update);
+});
+update();
+"""
+
+MAP_BODY = """
+<label>Année</label>
+<input id="year" type="range" style="width: 60%">
+<span id="year-label"></span>
+<div id="map" style="height: 75vh"></div>
+"""
+
+MAP_SCRIPT = """
+fetch('data/carte.json').then(function(r) { return r.json(); }).then(function(data) {
+    var slider = document.getElementById('year');
+    slider.min = 0;
+    slider.max = data.years.length - 1;
+    slider.value = data.years.length - 1;
+    function show() {
+        var i = Number(slider.value);
+        document.getElementById('year-label').textContent = data.years[i];
+        var text = data.labels.map(function(label, j) {
+            return label + '<br>' + (data.name[i][j] || '') + ' (' + (data.count[i][j] || 0) + ')';
+        });
+        Plotly.react('map', [{
+            type: 'choropleth', geojson: 'geo/departements.geojson',
+            featureidkey: 'properties.code', locations: data.depts,
+            z: data.count[i], text: text, hoverinfo: 'text',
+            colorscale: 'Viridis', colorbar: {title: {text: 'Naissances'}}
+        }], {
+            title: {text: 'Carte des prénoms en ' + data.years[i]},
+            geo: {fitbounds: 'locations', visible: false, projection: {type: 'mercator'}},
+            margin: {r: 0, t: 40, l: 0, b: 0}
+        });
+    }
+    slider.addEventListener('input', show);
+    show();
+});
+"""
+
+WORDCLOUD_BODY = """
+<label>Département</label><select id="department"></select>
+<label>Année</label><select id="year"></select>
+<label>Variante</label><select id="variant"></select>
+<div><img id="image" style="max-width: 100%" alt="Nuage de mots"></div>
+"""
+
+WORDCLOUD_SCRIPT = """
+fetch('data/nuages.json').then(function(r) { return r.json(); }).then(function(data) {
+    function fill(id, values) {
+        var select = document.getElementById(id);
+        values.forEach(function(value) {
+            var option = document.createElement('option');
+            option.value = option.textContent = value;
+            select.appendChild(option);
+        });
+        select.addEventListener('change', show);
+    }
+    function show() {
+        var variant = document.getElementById('variant').value;
+        var department = document.getElementById('department').value;
+        document.getElementById('image').src = data.patterns[variant][department]
+            .replace('{year}', document.getElementById('year').value);
+    }
+    fill('department', data.departments);
+    fill('year', data.years);
+    fill('variant', data.variants);
+    show();
+});
+"""
+
+
+def pages():
+    step_options = ''.join(f'<option value="{step}">{step} an{"s" if step > 1 else ""}</option>'
+                           for step in barrace.STEPS)
+    evolution_script = EVOLUTION_SCRIPT.replace('EXPAND_FIGURE_JS',
+                                                barrace.EXPAND_FIGURE_JS.strip())
+    for path, title, body, script in (
+            ('index.html', 'Prénoms en France', INDEX_BODY, ''),
+            ('evolution.html', 'Évolution des prénoms',
+             EVOLUTION_BODY.replace('STEP_OPTIONS', step_options), evolution_script),
+            ('carte.html', 'Carte des prénoms par département', MAP_BODY, MAP_SCRIPT),
+            ('nuages.html', 'Nuages de mots', WORDCLOUD_BODY, WORDCLOUD_SCRIPT)):
+        yield path, PAGE.format(title=title, body=body, script=script)
+
+
+def export(csv_path=data.CSV_PATH, out_dir=OUT_DIR, variants=wordclouds.VARIANTS,
+           fmt='png', workers=None, force=False):
+    """Écrit (ou met à jour) le site statique dans out_dir."""
+    from plotly.offline import get_plotlyjs
+    store.use_csv(csv_path)
+    # Nuages de mots : gardés tant que les données et RENDER_VERSION (dans
+    # leur chemin) n'ont pas changé
+    wordclouds.prerender(csv_path, variants, fmt, workers, force=force,
+                         directory=os.path.join(out_dir, 'wordclouds'))
+
+    files = [('plotly.min.js', get_plotlyjs())]
+    files += pages()
+    files += bar_race_files()
+    files += map_files()
+    files += wordcloud_files(out_dir, variants, fmt)
+    written = sum(_write(os.path.join(out_dir, path), content)
+                  for path, content in files)
+    print(f'{written} fichiers écrits, {len(files) - written} inchangés dans {out_dir}')
+    return out_dir
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export statique des visualisations')
+    parser.add_argument('csv_path', nargs='?', default=data.CSV_PATH)
+    parser.add_argument('--out', default=OUT_DIR)
+    parser.add_argument('--variant', choices=wordclouds.VARIANTS, action='append')
+    parser.add_argument('--format', choices=sorted(wordclouds.FORMATS), default='png')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--force', action='store_true')
+    args = parser.parse_args()
+    export(args.csv_path, args.out, args.variant or wordclouds.VARIANTS,
+           args.format, args.workers, args.force)
@@ -0,0 +1,213 @@
+"""Mixité des prénoms : naissances de garçons et de filles par prénom et par
+année, en France et par département.
+
+Les effectifs nationaux par sexe sont ceux du tableau dense de
+prenoms.series. Le tableau départemental est obtenu en un seul pivot
+vectorisé des lignes du cube (clé prénom, année, département ; une colonne
+garçons, une colonne filles), trié par clé : les effectifs d'un prénom
+dans un département se retrouvent par recherche dichotomique.
+
+Pour chaque prénom sont précalculés, sur toute la période : la part de
+garçons, la mixité (part du sexe minoritaire, de 0 à 0.5) et l'évolution
+de la part de garçons entre la première et la dernière décennie où le
+prénom compte au moins MIN_DECADE_BIRTHS naissances.
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from prenoms import cube, data, series
+
+BOYS, GIRLS = 1, 2
+# Part du sexe minoritaire à partir de laquelle un prénom est dit mixte
+MIXED_SHARE = 0.2
+# Naissances minimales d'une décennie (évolution) et d'une année (courbes)
+MIN_DECADE_BIRTHS = 100
+MIN_YEAR_BIRTHS = 20
+# Naissances minimales (sur la période) pour figurer dans les classements
+MIN_TOTAL = 1000
+
+STATS = ['total', 'male_share', 'mix', 'first_share', 'last_share', 'shift']
+
+
+def male_share(boys, girls):
+    """Part de garçons, NaN sans naissance."""
+    boys = np.asarray(boys, dtype=np.float64)
+    total = boys + np.asarray(girls, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(total > 0, boys / total, np.nan)
+
+
+def _name_stats(boys, girls, years):
+    """Indicateurs de mixité de chaque prénom (lignes de boys/girls)."""
+    total = boys.sum(axis=1) + girls.sum(axis=1)
+    share = male_share(boys.sum(axis=1), girls.sum(axis=1))
+
+    # Sommes par décennie, puis première et dernière décennie assez fournie
+    starts = np.flatnonzero(np.r_[True, np.diff(np.asarray(years) // 10) != 0])
+    decade_boys = np.add.reduceat(boys, starts, axis=1)
+    decade_girls = np.add.reduceat(girls, starts, axis=1)
+    decade_share = male_share(decade_boys, decade_girls)
+    valid = decade_boys + decade_girls >= MIN_DECADE_BIRTHS
+    any_valid = valid.any(axis=1)
+    rows = np.arange(len(total))
+    first = valid.argmax(axis=1)
+    last = valid.shape[1] - 1 - valid[:, ::-1].argmax(axis=1)
+    first_share = np.where(any_valid, decade_share[rows, first], np.nan)
+    last_share = np.where(any_valid, decade_share[rows, last], np.nan)
+    return {
+        'total': total.astype(np.int64),
+        'male_share': share.astype(np.float32),
+        'mix': np.minimum(share, 1 - share).astype(np.float32),
+        'first_share': first_share.astype(np.float32),
+        'last_share': last_share.astype(np.float32),
+        'shift': (last_share - first_share).astype(np.float32),
+    }
+
+
+def build_gender(aggregates, name_series, gender_dir):
+    national = name_series.national_counts
+    stats = _name_stats(np.asarray(national[:, BOYS, :], dtype=np.int64),
+                        np.asarray(national[:, GIRLS, :], dtype=np.int64),
+                        name_series.years)
+
+    # Pivot des lignes départementales : une ligne par (prénom, année,
+    # département), une colonne par sexe
+    departmental = aggregates.departmental
+    sexe = departmental['sexe'].to_numpy()
+    rows = sexe != cube.SEX_ALL
+    first_year = int(name_series.years[0])
+    n_years, n_depts = len(name_series.years), len(name_series.depts)
+    key = ((departmental['preusuel'].cat.codes.to_numpy()[rows].astype(np.int64)
+            * n_years + departmental['annais'].to_numpy()[rows] - first_year)
+           * n_depts + departmental['dpt'].cat.codes.to_numpy()[rows])
+    keys, inverse = np.unique(key, return_inverse=True)
+    count = departmental['nombre'].to_numpy()[rows]
+    boys = np.bincount(inverse, np.where(sexe[rows] == BOYS, count, 0),
+                       minlength=len(keys))
+    girls = np.bincount(inverse, np.where(sexe[rows] == GIRLS, count, 0),
+                        minlength=len(keys))
+
+    os.makedirs(gender_dir, exist_ok=True)
+    arrays = dict(stats, keys=keys, boys=boys.astype(np.int32),
+                  girls=girls.astype(np.int32))
+    for name, array in arrays.items():
+        np.save(os.path.join(gender_dir, name + '.npy'), array)
+
+
+class GenderMix:
+    """Effectifs par sexe et indicateurs de mixité des prénoms."""
+
+    def __init__(self, gender_dir, name_series):
+        def load(key):
+            return np.load(os.path.join(gender_dir, key + '.npy'), mmap_mode='r')
+        self.series = name_series
+        self.years = name_series.years
+        self.stats = {stat: np.asarray(load(stat)) for stat in STATS}
+        self.keys = load('keys')
+        self.boys = load('boys')
+        self.girls = load('girls')
+        self._dept_index = {dept: i for i, dept in enumerate(name_series.depts)}
+
+    def _department_rows(self, code):
+        """Lignes du pivot départemental du prénom d'indice code."""
+        span = len(self.years) * len(self.series.depts)
+        start, stop = np.searchsorted(self.keys, [code * span, (code + 1) * span])
+        return slice(start, stop)
+
+    def counts(self, name, depts=None):
+        """Garçons et filles nommés name chaque année, en France ou dans les
+        départements depts."""
+        code = self.series.code(name)
+        n_years = len(self.years)
+        if code is None:
+            return np.zeros(n_years, dtype=np.int64), np.zeros(n_years, dtype=np.int64)
+        if not depts:
+            national = self.series.national_counts[code]
+            return (np.asarray(national[BOYS], dtype=np.int64),
+                    np.asarray(national[GIRLS], dtype=np.int64))
+        rows = self._department_rows(code)
+        n_depts = len(self.series.depts)
+        wanted = [self._dept_index[d] for d in depts if d in self._dept_index]
+        local = self.keys[rows] - code * n_years * n_depts
+        keep = np.isin(local % n_depts, wanted)
+        year = local[keep] // n_depts
+        return (np.bincount(year, self.boys[rows][keep], minlength=n_years).astype(np.int64),
+                np.bincount(year, self.girls[rows][keep], minlength=n_years).astype(np.int64))
+
+    def trajectory(self, name, depts=None):
+        """Colonnes annais, boys, girls et male_share de name (male_share
+        NaN les années de moins de MIN_YEAR_BIRTHS naissances)."""
+        boys, girls = self.counts(name, depts)
+        share = male_share(boys, girls)
+        share[boys + girls < MIN_YEAR_BIRTHS] = np.nan
+        return pd.DataFrame({'annais': self.years, 'boys': boys, 'girls': girls,
+                             'male_share': share})
+
+    def male_shares(self, names, year, dept=None):
+        """Part de garçons de chaque prénom de names une année, en France ou
+        dans le département dept (NaN si inconnu)."""
+        codes = np.array([-1 if code is None else code
+                          for code in map(self.series.code, names)], dtype=np.int64)
+        known = codes >= 0
+        i = int(year) - int(self.years[0])
+        shares = np.full(len(codes), np.nan)
+        if not 0 <= i < len(self.years):
+            return shares
+        if dept is None:
+            national = self.series.national_counts
+            shares[known] = male_share(national[codes[known], BOYS, i],
+                                       national[codes[known], GIRLS, i])
+            return shares
+        j = self._dept_index.get(dept)
+        if j is None:
+            return shares
+        wanted = (codes * len(self.years) + i) * len(self.series.depts) + j
+        pos = np.minimum(np.searchsorted(self.keys, wanted), len(self.keys) - 1)
+        found = known & (np.asarray(self.keys)[pos] == wanted)
+        shares[found] = male_share(self.boys[pos[found]], self.girls[pos[found]])
+        return shares
+
+    def frame(self, min_total=MIN_TOTAL):
+        """Indicateurs des prénoms d'au moins min_total naissances (colonnes
+        preusuel puis STATS)."""
+        keep = self.stats['total'] >= min_total
+        columns = {'preusuel': self.series.names[keep]}
+        columns.update((stat, values[keep]) for stat, values in self.stats.items())
+        return pd.DataFrame(columns)
+
+    def most_mixed(self, k=50, min_total=MIN_TOTAL):
+        """Les k prénoms les plus mixtes sur toute la période."""
+        frame = self.frame(min_total).sort_values(['mix', 'total'],
+                                                  ascending=[False, False])
+        return frame.head(k).reset_index(drop=True)
+
+    def most_shifted(self, k=50, min_total=MIN_TOTAL):
+        """Les k prénoms dont la part de garçons a le plus changé entre leur
+        première et leur dernière décennie."""
+        frame = self.frame(min_total).dropna(subset=['shift'])
+        order = np.lexsort((-frame['total'].to_numpy(),
+                            -np.abs(frame['shift'].to_numpy())))
+        return frame.iloc[order[:k]].reset_index(drop=True)
+
+
+def load_gender(csv_path=data.CSV_PATH, cache_dir=None, rebuild=False):
+    """Charge la table de mixité, en la (re)construisant si le CSV a changé."""
+    cache_dir = cache_dir or data.cache_dir_for(csv_path)
+    gender_dir = os.path.join(cache_dir, 'gender')
+    meta_path = os.path.join(cache_dir, 'gender.json')
+    paths = data.sources(csv_path, cache_dir)
+    name_series = series.load_series(csv_path, cache_dir)
+    if rebuild or not data.is_fresh(paths, meta_path):
+        build_gender(cube.load_cube(csv_path, cache_dir), name_series, gender_dir)
+        data.mark_fresh(paths, meta_path)
+    return GenderMix(gender_dir, name_series)
+
+
+if __name__ == '__main__':
+    # python -m prenoms.gender [chemin/vers/dpt2020.csv]
+    path = sys.argv[1] if len(sys.argv) > 1 else data.CSV_PATH
+    load_gender(path, rebuild=True)
+    print('Table écrite dans', os.path.join(data.cache_dir_for(path), 'gender'))
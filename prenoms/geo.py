@@ -0,0 +1,97 @@
+"""Accès aux contours des départements.
+
+Les tables de prénoms ne sont jamais fusionnées avec les géométries : elles
+sont reliées par le code du département. Le GeoDataFrame n'est chargé que
+lorsqu'une carte est réellement dessinée.
+"""
+import json
+import os
+from functools import lru_cache
+
+GEOJSON_DOMTOM = 'departements-avec-outre-mer.geojson'
+GEOJSON_SIMPLIFIED = 'departements-version-simplifiee.geojson'
+
+
+@lru_cache(maxsize=None)
+def department_names(path=GEOJSON_DOMTOM):
+    """Dictionnaire code -> nom du département, lu sans geopandas."""
+    with open(path, encoding='utf-8') as f:
+        features = json.load(f)['features']
+    return {feature['properties']['code']: feature['properties']['nom']
+            for feature in features}
+
+
+def department_codes(path=GEOJSON_DOMTOM):
+    """Dictionnaire nom du département -> code."""
+    return {nom: code for code, nom in department_names(path).items()}
+
+
+@lru_cache(maxsize=None)
+def load_departments(path=GEOJSON_DOMTOM):
+    import geopandas as gpd
+    return gpd.read_file(path)
+
+
+# Niveaux de simplification des contours (tolérance en degrés), voir
+# prenoms/topology.py ; 'full' garde le fichier d'origine
+TIERS = {'full': 0.0, 'high': 0.0005, 'medium': 0.002, 'low': 0.01}
+MAP_TIER = os.environ.get('PRENOMS_MAP_TIER', 'medium')
+
+GEOJSON_ROUTE = '/geo/'
+GEOJSON_MAX_AGE = 7 * 24 * 3600
+MIMETYPES = {'.geojson': 'application/geo+json', '.topojson': 'application/json'}
+
+_served_files = {}
+
+
+def map_file(path=GEOJSON_DOMTOM, fmt='geojson', tier=None, rebuild=False):
+    """Chemin des contours de path au niveau tier (PRENOMS_MAP_TIER par
+    défaut), en 'geojson' ou 'topojson'. Les fichiers simplifiés sont
+    construits au premier appel dans le cache, à côté de path."""
+    from prenoms import data, topology
+    tier = tier or MAP_TIER
+    if tier not in TIERS:
+        raise ValueError(f'Niveau de carte inconnu : {tier} ({", ".join(TIERS)})')
+    if tier == 'full' and fmt == 'geojson' and not rebuild:
+        return path
+    out_dir = os.path.join(os.path.dirname(os.path.abspath(path)),
+                           data.CACHE_DIRNAME, 'geo')
+    stem = os.path.splitext(os.path.basename(path))[0]
+    target = os.path.join(out_dir, f'{stem}.{tier}.{fmt}')
+    meta_path = os.path.join(out_dir, f'{stem}.{tier}.v{topology.VERSION}.json')
+    if rebuild or not os.path.exists(target) or not data.is_fresh(path, meta_path):
+        topology.write_tier(path, out_dir, tier, TIERS[tier])
+        data.mark_fresh(path, meta_path)
+    return target
+
+
+def geojson_url(path=GEOJSON_DOMTOM):
+    """Adresse à laquelle register_geojson_route sert le fichier path.
+
+    Le nom servi comprend la version de prenoms.topology et la date de
+    modification du fichier (réécrit quand la source ou la simplification
+    changent) : le navigateur ne garde pas d'anciens contours en cache."""
+    from prenoms import topology
+    stem, ext = os.path.splitext(os.path.basename(path))
+    name = f'{stem}.v{topology.VERSION}.{os.stat(path).st_mtime_ns}{ext}'
+    _served_files[name] = os.path.abspath(path)
+    return GEOJSON_ROUTE + name
+
+
+def register_geojson_route(app):
+    """Sert les fichiers de contours passés à geojson_url sur le serveur
+    Flask de Dash avec un long délai de cache : le navigateur ne les
+    télécharge qu'une fois."""
+    import flask
+    if 'geojson' in app.server.view_functions:
+        return
+
+    def send_geojson(name):
+        path = _served_files.get(name)
+        if path is None:
+            flask.abort(404)
+        return flask.send_file(path,
+                               mimetype=MIMETYPES.get(os.path.splitext(path)[1],
+                                                      'application/json'),
+                               max_age=GEOJSON_MAX_AGE)
+    app.server.add_url_rule(GEOJSON_ROUTE + '<name>', 'geojson', send_geojson)
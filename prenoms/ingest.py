@@ -0,0 +1,76 @@
+"""Ajout de nouveaux fichiers (nouvelles années) au cache.
+
+Chaque fichier est lu par blocs et sommé (voir prenoms.data.fold). Les
+années qu'il contient remplacent celles déjà présentes dans le cache des
+prénoms et dans le cube d'agrégats, qui sont complétés sans relire
+dpt2020.csv ; l'index top K est recalculé à partir du cube. Ajouter deux
+fois le même fichier ne compte donc pas deux fois ses naissances.
+
+    python -m prenoms.ingest [--csv dpt2020.csv] nouveau.csv [...]
+"""
+import argparse
+import os
+import shutil
+
+import numpy as np
+
+from prenoms import cube, data, topk
+
+
+def _drop_wordclouds(cache_dir):
+    """Supprime les nuages de mots déjà rendus : leur répertoire dépend de
+    la version des données (voir prenoms.wordclouds.render_dir), ils ne
+    seraient plus relus."""
+    shutil.rmtree(os.path.join(cache_dir, 'wordclouds'), ignore_errors=True)
+
+
+def append(paths, csv_path=data.CSV_PATH, cache_dir=None,
+           chunksize=data.CHUNK_ROWS):
+    """Ajoute les fichiers paths au cache de csv_path et renvoie les années
+    ajoutées ou remplacées."""
+    cache_dir = cache_dir or data.cache_dir_for(csv_path)
+    # Les artefacts existants doivent être à jour avant d'être complétés
+    topk.load_topk(csv_path, cache_dir)
+    new = data.read_sources(paths, chunksize)
+    years = sorted(int(year) for year in np.unique(new['annais']))
+
+    names_dir = os.path.join(cache_dir, 'names')
+    names = data.load_frame(names_dir, mmap=False)
+    data.save_frame(data.replace_years(names, new, ['annais']), names_dir)
+
+    cube_dir = os.path.join(cache_dir, 'cube')
+    for table, keys in (('national', cube.NATIONAL_KEYS),
+                        ('departmental', cube.DEPARTMENTAL_KEYS)):
+        table_dir = os.path.join(cube_dir, table)
+        current = data.load_frame(table_dir, mmap=False)
+        data.save_frame(data.replace_years(current, cube.rollup(new, keys), keys),
+                        table_dir)
+
+    appended = data.appended_sources(cache_dir)
+    appended += [os.path.abspath(path) for path in paths
+                 if os.path.abspath(path) not in appended]
+    data.record_sources(cache_dir, appended)
+    all_sources = data.sources(csv_path, cache_dir)
+    data.mark_fresh(all_sources, os.path.join(cache_dir, 'names.json'))
+    data.mark_fresh(all_sources, os.path.join(cache_dir, 'cube.json'))
+
+    topk.build_topk(cube.load_cube(csv_path, cache_dir),
+                    os.path.join(cache_dir, 'topk'))
+    data.mark_fresh(all_sources, os.path.join(cache_dir, 'topk.json'))
+    _drop_wordclouds(cache_dir)
+    return years
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Ajout de fichiers de prénoms au cache')
+    parser.add_argument('paths', nargs='+')
+    parser.add_argument('--csv', default=data.CSV_PATH,
+                        help='CSV principal (dpt2020.csv par défaut)')
+    parser.add_argument('--chunksize', type=int, default=data.CHUNK_ROWS)
+    args = parser.parse_args()
+    years = append(args.paths, args.csv, chunksize=args.chunksize)
+    if years:
+        print(f'Années ajoutées : {years[0]}-{years[-1]} ({len(years)})')
+    else:
+        print('Aucune ligne valide dans', ', '.join(args.paths))
@@ -0,0 +1,132 @@
+"""Callbacks lourds exécutés en tâche de fond.
+
+Les figures coûteuses (course de barres sur tous les départements, nuage de
+mots de « Tous les départements »...) sont calculées dans un processus à
+part par les background callbacks de Dash, avec un gestionnaire local
+DiskcacheManager (SQLite, sans broker externe) : les threads du serveur
+restent libres pour les interactions légères. Les tâches envoient leur
+avancement à la page, et Dash annule la tâche en cours d'un utilisateur
+quand il change les entrées.
+
+Les requêtes identiques en cours sont dédoublonnées : une seule tâche
+calcule, les autres attendent son résultat dans le cache partagé par tous
+les workers. Si diskcache, multiprocess ou psutil ne sont pas installés
+(pip install "dash[diskcache]"), les callbacks restent des callbacks
+ordinaires.
+
+Configuration : PRENOMS_JOBS_DIR (répertoire du cache des tâches,
+.prenoms_cache/jobs par défaut).
+"""
+import functools
+import hashlib
+import os
+import time
+from functools import lru_cache
+
+from prenoms import cache, data, store
+
+RESULT_EXPIRE = 24 * 3600
+POLL_INTERVAL = 0.1
+
+# Barre d'avancement affichée pendant une tâche de fond
+PROGRESS_SHOWN = {'display': 'block', 'width': '100%'}
+PROGRESS_HIDDEN = {'display': 'none'}
+
+_MISSING = object()
+
+
+def no_progress(done, total):
+    pass
+
+
+def jobs_dir():
+    return (os.environ.get('PRENOMS_JOBS_DIR')
+            or os.path.join(data.cache_dir_for(store.csv_path()), 'jobs'))
+
+
+@lru_cache(maxsize=None)
+def manager():
+    """Gestionnaire des tâches de fond, ou None si ses dépendances
+    manquent."""
+    try:
+        import diskcache
+        from dash import DiskcacheManager
+        return DiskcacheManager(diskcache.Cache(jobs_dir()),
+                                cache_by=[store.data_version], expire=RESULT_EXPIRE)
+    except ImportError:
+        return None
+
+
+def _key(func, args):
+    key = (func.__module__, func.__qualname__, cache.args_key(args),
+           store.data_version())
+    return hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+
+
+def shared_call(func, args, progress=no_progress):
+    """func(*args, progress=progress), calculé une seule fois pour des
+    entrées identiques même quand plusieurs tâches les demandent en même
+    temps.
+
+    La première tâche prend un verrou (son pid) dans le cache des tâches ;
+    les suivantes attendent son résultat, et reprennent le calcul si elle a
+    été annulée entre-temps.
+    """
+    jobs = manager()
+    if jobs is None:
+        return func(*args, progress=progress)
+    handle = jobs.handle
+    key = _key(func, args)
+    result_key, lock_key = 'result-' + key, 'running-' + key
+    while True:
+        value = handle.get(result_key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if handle.add(lock_key, os.getpid()):
+            try:
+                value = func(*args, progress=progress)
+                handle.set(result_key, value, expire=RESULT_EXPIRE)
+                return value
+            finally:
+                handle.delete(lock_key)
+        holder = handle.get(lock_key)
+        if holder is not None and not jobs.job_running(holder):
+            handle.delete(lock_key)
+        time.sleep(POLL_INTERVAL)
+
+
+def heavy_callback(app, output, inputs, progress=None, running=None):
+    """Décorateur : enregistre func(*entrées, progress=...) comme callback de
+    app, exécuté en tâche de fond si possible.
+
+    progress est une paire de sorties (valeur, maximum) d'une barre
+    d'avancement, running la liste (sortie, valeur pendant, valeur après)
+    de Dash ; func appelle progress(fait, total) au fil du calcul.
+    """
+    def decorator(func):
+        jobs = manager()
+        if jobs is None:
+            app.callback(output, inputs)(func)
+            return func
+
+        options = {'background': True, 'manager': jobs,
+                   'running': running or []}
+        if progress:
+            options['progress'] = progress
+            options['progress_default'] = ['0', '1']
+
+        # functools.wraps : Dash construit la clé de cache à partir du
+        # source de func, propre à chaque callback
+        @functools.wraps(func)
+        def job(*args):
+            if not progress:
+                return shared_call(func, args)
+            set_progress, args = args[0], args[1:]
+
+            def report(done, total):
+                set_progress((str(done), str(total)))
+            return shared_call(func, args, report)
+
+        app.callback(output, inputs, **options)(job)
+        return func
+    return decorator
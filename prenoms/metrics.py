@@ -0,0 +1,380 @@
+"""Mesures des étapes coûteuses et des callbacks, au format Prometheus.
+
+- stage(nom) (gestionnaire de contexte) et timed(nom) (décorateur) mesurent
+  une étape : lecture du CSV, groupby de la course de barres, construction
+  des cartes, rendu des nuages de mots... (histogramme
+  prenoms_stage_seconds) ;
+- register_metrics_route(app) mesure chaque requête de callback Dash
+  (latence, taille de la réponse, croissance du pic de mémoire résidente
+  du processus, par sortie du callback) et expose tout sur /metrics ;
+- les requêtes de callback peuvent être profilées (cProfile, ou
+  pyinstrument s'il est installé) : une sur PRENOMS_PROFILE_EVERY, et le
+  profil est écrit et journalisé si elle dépasse PRENOMS_PROFILE_SLOW_MS ;
+- start_log_summary() journalise régulièrement un résumé (serveur Bokeh,
+  qui n'a pas de route /metrics).
+
+Chaque processus a ses propres compteurs. Avec plusieurs workers gunicorn,
+définir PRENOMS_METRICS_DIR : chaque processus y écrit ses compteurs, et
+/metrics renvoie la somme de ceux de tous les workers.
+"""
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BYTES_BUCKETS = tuple(2**i for i in range(10, 26, 2))  # 1 Ko à 16 Mo
+
+METRICS_DIR = os.environ.get('PRENOMS_METRICS_DIR')
+# Intervalle minimal entre deux écritures des compteurs dans METRICS_DIR
+FLUSH_INTERVAL = 1.0
+PROFILE_EVERY = int(os.environ.get('PRENOMS_PROFILE_EVERY', 0))
+PROFILE_SLOW_MS = float(os.environ.get('PRENOMS_PROFILE_SLOW_MS', 1000))
+PROFILE_LINES = 25
+
+DASH_UPDATE_PATH = '_dash-update-component'
+
+HELP = {
+    'prenoms_stage_seconds': ('histogram', "Durée d'une étape coûteuse"),
+    'prenoms_callback_seconds': ('histogram', "Durée d'une requête de callback Dash"),
+    'prenoms_callback_response_bytes': ('histogram', "Taille de la réponse d'un callback"),
+    'prenoms_callback_rss_growth_bytes': (
+        'counter', "Croissance du pic de mémoire résidente pendant les callbacks"),
+    'prenoms_callback_errors_total': ('counter', 'Callbacks terminés en erreur'),
+    'prenoms_process_max_rss_bytes': ('gauge', 'Pic de mémoire résidente du processus'),
+    'prenoms_figure_cache': ('gauge', 'Compteurs du cache des figures'),
+}
+
+
+class Registry:
+    """Histogrammes et compteurs d'un processus, indexés par
+    (nom, étiquettes)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self._last_flush = 0.0
+
+    def observe(self, name, labels, value, buckets=SECONDS_BUCKETS):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            entry = self.histograms.get(key)
+            if entry is None:
+                entry = self.histograms[key] = {
+                    'buckets': list(buckets), 'counts': [0] * (len(buckets) + 1),
+                    'sum': 0.0, 'count': 0}
+            entry['counts'][bisect_left(entry['buckets'], value)] += 1
+            entry['sum'] += value
+            entry['count'] += 1
+        self._maybe_flush()
+
+    def increment(self, name, labels, value=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+        self._maybe_flush()
+
+    def snapshot(self):
+        with self._lock:
+            return {'histograms': [[name, list(labels), dict(entry, counts=list(entry['counts']))]
+                                   for (name, labels), entry in self.histograms.items()],
+                    'counters': [[name, list(labels), value]
+                                 for (name, labels), value in self.counters.items()]}
+
+    def _maybe_flush(self):
+        if not METRICS_DIR or time.monotonic() - self._last_flush < FLUSH_INTERVAL:
+            return
+        self.flush()
+
+    def flush(self):
+        """Écrit les compteurs du processus dans METRICS_DIR."""
+        if not METRICS_DIR:
+            return
+        self._last_flush = time.monotonic()
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        path = os.path.join(METRICS_DIR, f'{os.getpid()}.json')
+        # Un fichier temporaire par thread : les requêtes et /metrics peuvent
+        # écrire en même temps
+        tmp = f'{path}.tmp-{threading.get_ident()}'
+        with open(tmp, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp, path)
+
+
+registry = Registry()
+
+
+@contextmanager
+def stage(name):
+    """Mesure la durée du bloc comme étape name."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe('prenoms_stage_seconds', {'stage': name},
+                         time.perf_counter() - start)
+
+
+def timed(name):
+    """Décorateur : mesure chaque appel comme étape name."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def max_rss():
+    """Pic de mémoire résidente du processus, en octets (None sous
+    Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    import sys
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def forget_process(pid):
+    """Oublie les compteurs d'un worker arrêté (fichier de METRICS_DIR)."""
+    if METRICS_DIR:
+        try:
+            os.remove(os.path.join(METRICS_DIR, f'{pid}.json'))
+        except FileNotFoundError:
+            pass
+
+
+def _snapshots():
+    """Compteurs de tous les processus (METRICS_DIR) ou du processus
+    courant."""
+    if not METRICS_DIR:
+        return [registry.snapshot()]
+    registry.flush()
+    snapshots = []
+    for name in sorted(os.listdir(METRICS_DIR)):
+        if name.endswith('.json'):
+            try:
+                with open(os.path.join(METRICS_DIR, name)) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+    return snapshots
+
+
+def _merge(snapshots):
+    histograms, counters = {}, {}
+    for snapshot in snapshots:
+        for name, labels, entry in snapshot['histograms']:
+            key = (name, tuple(tuple(label) for label in labels))
+            merged = histograms.setdefault(key, {
+                'buckets': entry['buckets'], 'counts': [0] * len(entry['counts']),
+                'sum': 0.0, 'count': 0})
+            merged['counts'] = [a + b for a, b in zip(merged['counts'], entry['counts'])]
+            merged['sum'] += entry['sum']
+            merged['count'] += entry['count']
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(tuple(label) for label in labels))
+            counters[key] = counters.get(key, 0) + value
+    return histograms, counters
+
+
+def _labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+def render(gauges=()):
+    """Texte au format d'exposition Prometheus ; gauges est une liste
+    (nom, étiquettes, valeur) ajoutée telle quelle."""
+    histograms, counters = _merge(_snapshots())
+    lines, described = [], set()
+
+    def describe(name):
+        if name not in described and name in HELP:
+            kind, text = HELP[name]
+            lines.append(f'# HELP {name} {text}')
+            lines.append(f'# TYPE {name} {kind}')
+            described.add(name)
+
+    for (name, labels), entry in sorted(histograms.items()):
+        describe(name)
+        cumulative = 0
+        for bound, count in zip(list(entry['buckets']) + ['+Inf'], entry['counts']):
+            cumulative += count
+            lines.append(f'{name}_bucket{_labels(labels, [("le", bound)])} {cumulative}')
+        lines.append(f'{name}_sum{_labels(labels)} {entry["sum"]}')
+        lines.append(f'{name}_count{_labels(labels)} {entry["count"]}')
+    for (name, labels), value in sorted(counters.items()):
+        describe(name)
+        lines.append(f'{name}{_labels(labels)} {value}')
+    for name, labels, value in gauges:
+        describe(name)
+        lines.append(f'{name}{_labels(sorted(labels.items()))} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def _profiler():
+    try:
+        from pyinstrument import Profiler
+        return Profiler()
+    except ImportError:
+        import cProfile
+        return cProfile.Profile()
+
+
+def _profile_report(profiler):
+    if hasattr(profiler, 'output_text'):  # pyinstrument
+        return profiler.output_text()
+    import io
+    import pstats
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(PROFILE_LINES)
+    return out.getvalue()
+
+
+def _save_profile(callback, elapsed, profiler):
+    report = _profile_report(profiler)
+    logger.warning('Callback lent (%.0f ms) : %s\n%s', elapsed * 1000, callback, report)
+    if METRICS_DIR:
+        directory = os.path.join(METRICS_DIR, 'profiles')
+        os.makedirs(directory, exist_ok=True)
+        name = ''.join(c if c.isalnum() else '_' for c in callback)[:80]
+        with open(os.path.join(directory, f'{int(time.time())}-{name}.txt'), 'w') as f:
+            f.write(report)
+
+
+def register_metrics_route(app, figure_cache=None, path='/metrics'):
+    """Mesure les requêtes de callback du serveur Flask de Dash et expose
+    les compteurs sur path."""
+    import flask
+    server = app.server
+    if 'metrics' in server.view_functions:
+        return
+    calls = {'n': 0}
+    calls_lock = threading.Lock()
+    # Une seule requête profilée à la fois : cProfile refuse un second
+    # profileur actif (Python 3.12+)
+    profile_lock = threading.Lock()
+
+    @server.before_request
+    def _start():
+        if not flask.request.path.endswith(DASH_UPDATE_PATH):
+            return
+        flask.g.metrics_start = time.perf_counter()
+        flask.g.metrics_rss = max_rss()
+        with calls_lock:
+            calls['n'] += 1
+            sampled = PROFILE_EVERY and calls['n'] % PROFILE_EVERY == 0
+        if sampled and profile_lock.acquire(blocking=False):
+            profiler = _profiler()
+            try:
+                profiler.enable() if hasattr(profiler, 'enable') else profiler.start()
+            except BaseException:
+                profile_lock.release()
+                raise
+            flask.g.metrics_profiler = profiler
+
+    def _stop_profiler():
+        profiler = flask.g.pop('metrics_profiler', None)
+        if profiler is None:
+            return None
+        try:
+            profiler.disable() if hasattr(profiler, 'disable') else profiler.stop()
+        finally:
+            profile_lock.release()
+        return profiler
+
+    @server.after_request
+    def _stop(response):
+        start = flask.g.pop('metrics_start', None)
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        body = flask.request.get_json(silent=True) or {}
+        labels = {'callback': body.get('output', 'inconnu')}
+        registry.observe('prenoms_callback_seconds', labels, elapsed)
+        if not response.direct_passthrough:
+            registry.observe('prenoms_callback_response_bytes', labels,
+                             len(response.get_data()), BYTES_BUCKETS)
+        if response.status_code >= 500:
+            registry.increment('prenoms_callback_errors_total', labels)
+        before, after = flask.g.pop('metrics_rss', None), max_rss()
+        if before is not None and after is not None:
+            registry.increment('prenoms_callback_rss_growth_bytes', labels,
+                               after - before)
+        profiler = _stop_profiler()
+        if profiler is not None and elapsed * 1000 >= PROFILE_SLOW_MS:
+            _save_profile(labels['callback'], elapsed, profiler)
+        return response
+
+    @server.teardown_request
+    def _teardown(exc):
+        # Requête interrompue avant after_request : le profileur est libéré
+        _stop_profiler()
+
+    def metrics():
+        gauges = []
+        rss = max_rss()
+        if rss is not None:
+            gauges.append(('prenoms_process_max_rss_bytes', {'pid': os.getpid()}, rss))
+        if figure_cache is not None:
+            gauges += [('prenoms_figure_cache', {'pid': os.getpid(), 'counter': key}, value)
+                       for key, value in figure_cache.stats().items()]
+        return flask.Response(render(gauges),
+                              mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+    server.add_url_rule(path, 'metrics', metrics)
+
+
+def summary():
+    """Lignes (mesure, nombre, moyenne et maximum approché en ms) des
+    durées mesurées dans ce processus."""
+    rows = []
+    for name, labels, entry in registry.snapshot()['histograms']:
+        if not name.endswith('_seconds') or not entry['count']:
+            continue
+        # Borne du dernier intervalle non vide (maximum approché)
+        last = max(i for i, count in enumerate(entry['counts']) if count)
+        bound = entry['buckets'][last] if last < len(entry['buckets']) else float('inf')
+        label = ','.join(f'{k}={v}' for k, v in labels)
+        rows.append((f'{name}[{label}]', entry['count'],
+                     entry['sum'] / entry['count'] * 1000, bound * 1000))
+    return sorted(rows)
+
+
+def log_summary():
+    for name, count, mean_ms, bound_ms in summary():
+        logger.info('%s : %d appels, %.1f ms en moyenne, max < %.0f ms',
+                    name, count, mean_ms, bound_ms)
+
+
+_summary_thread = None
+
+
+def start_log_summary(interval=60):
+    """Journalise summary() toutes les interval secondes (une seule fois
+    par processus)."""
+    global _summary_thread
+    if _summary_thread is not None:
+        return
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            log_summary()
+    _summary_thread = threading.Thread(target=loop, name='prenoms-metrics',
+                                       daemon=True)
+    _summary_thread.start()
@@ -0,0 +1,20 @@
+"""Pages de l'application Dash qui regroupe toutes les visualisations.
+
+Chaque page fournit PATH, TITLE, layout() et
+register_callbacks(app, figure_cache). Les identifiants de ses composants
+sont préfixés par le nom de la page, pour que toutes les pages puissent
+cohabiter dans une même application.
+"""
+
+# Styles des panneaux et des libellés communs aux pages
+PANEL = {'backgroundColor': 'white', 'padding': '20px', 'borderRadius': '5px',
+         'margin': '10px'}
+LABEL = {'fontWeight': 'bold', 'fontSize': '16px'}
+
+
+def component_ids(prefix):
+    """Fonction name -> identifiant de composant préfixé par prefix (le nom
+    de la page)."""
+    def _id(name):
+        return prefix + '-' + name
+    return _id
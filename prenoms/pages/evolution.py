@@ -0,0 +1,128 @@
+"""Visualisation 1 : course de barres des prénoms au fil des années."""
+from dash import dcc, html
+from dash.dependencies import Input, Output
+
+from prenoms import barrace, cube, jobs, store
+from prenoms.pages import LABEL, PANEL, component_ids
+
+PATH = '/'
+TITLE = 'Évolution des prénoms'
+
+_id = component_ids('evolution')
+
+
+def layout():
+    return html.Div(style={'backgroundColor': '#f8f9fa', 'height': '100vh'}, children=[
+        html.Div(style=PANEL, children=[
+            html.H1(children='Visualisation des prénoms en France'),
+
+            html.Div(children='''
+                Comment les prénoms ont évolué en popularité de 1900 à 2020 ?
+            ''')
+        ]),
+
+        html.Div(style=PANEL, children=[
+            html.Label('Sélectionnez le sexe:', style=LABEL),
+            dcc.RadioItems(
+                id=_id('sex-filter'),
+                options=[
+                    {'label': 'Tous', 'value': 'Tous'},
+                    {'label': 'Garçons', 'value': 1},
+                    {'label': 'Filles', 'value': 2}
+                ],
+                value='Tous',
+                labelStyle={'display': 'inline-block', 'marginRight': '10px'}
+            ),
+            html.Br(),
+            html.Label('Sélectionnez le département:', style=LABEL),
+            dcc.Dropdown(
+                id=_id('department-filter'),
+                options=[{'label': dpt, 'value': dpt}
+                         for dpt in store.aggregates().departmental['dpt'].cat.categories],
+                value=None,
+                multi=True,
+                style={'marginBottom': '20px'}
+            ),
+            html.Br(),
+            html.Label('Sélectionnez le type:', style=LABEL),
+            dcc.RadioItems(
+                id=_id('popularity-filter'),
+                options=[
+                    {'label': 'Les plus populaires', 'value': 'populaire'},
+                    {'label': 'Les moins populaires', 'value': 'impopulaire'}
+                ],
+                value='populaire',
+                labelStyle={'display': 'inline-block', 'marginRight': '10px'}
+            ),
+            html.Br(),
+            html.Label("Pas de temps de l'animation:", style=LABEL),
+            dcc.RadioItems(
+                id=_id('step'),
+                options=[{'label': f'{step} an' if step == 1 else f'{step} ans',
+                          'value': step} for step in barrace.STEPS],
+                value=barrace.STEPS[0],
+                labelStyle={'display': 'inline-block', 'marginRight': '10px'}
+            )
+        ]),
+
+        html.Div(style=dict(PANEL, flex='1'), children=[
+            # Avancement de la construction des frames (tâche de fond)
+            html.Progress(id=_id('progress'), value='0', max='1',
+                          style=jobs.PROGRESS_HIDDEN),
+            # Données compactes (année, prénom, effectif) : les frames sont
+            # construites par le navigateur
+            dcc.Store(id=_id('bar-race-data')),
+            dcc.Graph(
+                id=_id('bar-race-chart'),
+                style={'height': '70vh'}
+            )
+        ])
+    ])
+
+
+def bar_race_data(selected_sex, selected_departments, popularity_type, step=1,
+                  progress=jobs.no_progress):
+    """Données compactes de la course de barres (voir barrace.compact_data)
+    pour les filtres de la page."""
+    sex = cube.SEX_ALL if selected_sex == 'Tous' else selected_sex
+
+    # Lire dans le cube la somme des naissances pour chaque prénom chaque année
+    if selected_departments:
+        grouped_df = store.aggregates().departments_years(selected_departments, sex)
+    else:
+        grouped_df = store.aggregates().national_years(sex)[['annais', 'preusuel', 'nombre']]
+    progress(1, 2)
+
+    # Top 15 de chaque année (une année sur step), en colonnes
+    return barrace.compact_data(grouped_df, store.name_colors(), popularity_type,
+                                step=step or 1)
+
+
+def register_callbacks(app, figure_cache):
+    # Construction lourde (tous les départements, tous les sexes...) : exécutée
+    # en tâche de fond, le serveur reste disponible pour les autres requêtes
+    @jobs.heavy_callback(
+        app,
+        Output(_id('bar-race-data'), 'data'),
+        [Input(_id('sex-filter'), 'value'),
+         Input(_id('department-filter'), 'value'),
+         Input(_id('popularity-filter'), 'value'),
+         Input(_id('step'), 'value')],
+        progress=[Output(_id('progress'), 'value'), Output(_id('progress'), 'max')],
+        running=[(Output(_id('progress'), 'style'), jobs.PROGRESS_SHOWN,
+                  jobs.PROGRESS_HIDDEN)]
+    )
+    @figure_cache.memoize(ignore=('progress',))
+    def update_bar_race(selected_sex, selected_departments, popularity_type,
+                        step=1, progress=jobs.no_progress):
+        return bar_race_data(selected_sex, selected_departments, popularity_type,
+                             step, progress)
+
+    # Une frame par année, construite dans le navigateur
+    app.clientside_callback(
+        barrace.EXPAND_FIGURE_JS,
+        Output(_id('bar-race-chart'), 'figure'),
+        Input(_id('bar-race-data'), 'data')
+    )
+
+    return update_bar_race
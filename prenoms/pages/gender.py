@@ -0,0 +1,107 @@
+"""Visualisation 3 : prénoms mixtes et évolution de leur part de garçons,
+lues dans la table de mixité précalculée de prenoms.gender."""
+import dash_bootstrap_components as dbc
+import plotly.graph_objects as go
+from dash import dcc, html
+from dash.dependencies import Input, Output
+
+from prenoms import store
+from prenoms.pages import LABEL, PANEL, component_ids
+
+PATH = '/mixite'
+TITLE = 'Prénoms mixtes'
+
+_id = component_ids('gender')
+
+RANKING_LABELS = {
+    'mix': 'Les plus mixtes',
+    'shift': 'Plus forte évolution de la part de garçons',
+}
+COLUMNS = {'preusuel': 'Prénom', 'total': 'Naissances',
+           'male_share': 'Part de garçons', 'mix': 'Mixité',
+           'first_share': 'Part de garçons (première décennie)',
+           'last_share': 'Part de garçons (dernière décennie)',
+           'shift': 'Évolution'}
+
+N_ROWS = 50
+N_LINES = 10
+
+
+def layout():
+    return html.Div(style={'backgroundColor': '#f8f9fa'}, children=[
+        html.Div(style=PANEL, children=[
+            html.H1(children='Prénoms mixtes'),
+            html.Div(children='''
+                La popularité des prénoms donnés aux deux sexes évolue-t-elle de manière cohérente ?
+            ''')
+        ]),
+
+        html.Div(style=PANEL, children=[
+            html.Label('Sélectionnez le classement:', style=LABEL),
+            dcc.RadioItems(
+                id=_id('ranking'),
+                options=[{'label': label, 'value': value}
+                         for value, label in RANKING_LABELS.items()],
+                value='mix',
+                labelStyle={'display': 'inline-block', 'marginRight': '10px'}
+            ),
+            html.Br(),
+            html.Label('Sélectionnez le département (toute la France par défaut):',
+                       style=LABEL),
+            dcc.Dropdown(
+                id=_id('department-filter'),
+                options=[{'label': dpt, 'value': dpt}
+                         for dpt in store.name_series().depts.tolist()],
+                value=None,
+                multi=True
+            )
+        ]),
+
+        html.Div(style=PANEL, children=[
+            dcc.Graph(id=_id('chart'), style={'height': '50vh'}),
+            html.Div(id=_id('table'))
+        ])
+    ])
+
+
+def create_figure(names, depts):
+    mix = store.gender_mix()
+    fig = go.Figure()
+    for name in names:
+        trajectory = mix.trajectory(name, depts)
+        fig.add_trace(go.Scatter(x=trajectory['annais'],
+                                 y=trajectory['male_share'] * 100,
+                                 mode='lines', name=name))
+    fig.update_layout(
+        xaxis=dict(title='Année'),
+        yaxis=dict(title='Part de garçons (%)', range=[0, 100]),
+        margin=dict(l=60, r=40, t=40, b=40)
+    )
+    return fig
+
+
+def create_table(ranking):
+    table = ranking.round({'male_share': 2, 'mix': 2, 'first_share': 2,
+                           'last_share': 2, 'shift': 2})
+    return dbc.Table.from_dataframe(table.rename(columns=COLUMNS), striped=True,
+                                    bordered=True, hover=True)
+
+
+def register_callbacks(app, figure_cache):
+    @app.callback(
+        [Output(_id('chart'), 'figure'),
+         Output(_id('table'), 'children')],
+        [Input(_id('ranking'), 'value'),
+         Input(_id('department-filter'), 'value')]
+    )
+    @figure_cache.memoize
+    def update_gender(ranking_name, depts):
+        mix = store.gender_mix()
+        if ranking_name == 'shift':
+            ranking = mix.most_shifted(N_ROWS)
+        else:
+            ranking = mix.most_mixed(N_ROWS)
+        return (create_figure(ranking['preusuel'].head(N_LINES).tolist(), depts),
+                create_table(ranking))
+
+    return update_gender
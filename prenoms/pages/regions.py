@@ -0,0 +1,94 @@
+"""Visualisation 2 : prénom le plus donné dans chaque département (carte
+Altair) et top 50 national d'une année."""
+import altair as alt
+import dash_bootstrap_components as dbc
+from dash import dcc, html
+from dash.dependencies import Input, Output
+
+from prenoms import data, geo, metrics, store, topology
+from prenoms.pages import component_ids
+
+PATH = '/regions'
+TITLE = 'Carte des prénoms'
+
+_id = component_ids('regions')
+
+
+def create_map(year):
+    dpt_names = geo.department_names(geo.GEOJSON_SIMPLIFIED)
+    max_count = store.top_names().most_frequent_by_department(year).rename(columns=data.ENGLISH_COLUMNS)
+    # Garder uniquement les départements présents sur la carte (sans copier les géométries)
+    max_count = max_count[max_count['dept'].isin(list(dpt_names))]
+
+    max_count = max_count.assign(nom=max_count['dept'].map(dpt_names))
+
+    # Les contours (TopoJSON simplifié) sont chargés par le navigateur depuis /geo/
+    # (et gardés en cache) : seules les valeurs de l'année sont envoyées avec la carte
+    shapes = alt.Data(url=geo.geojson_url(geo.map_file(geo.GEOJSON_SIMPLIFIED, 'topojson')),
+                      format=alt.DataFormat(feature=topology.OBJECT_NAME, type='topojson'))
+
+    chart = alt.Chart(shapes).mark_geoshape(stroke='white').transform_lookup(
+        lookup='properties.code',
+        from_=alt.LookupData(max_count, 'dept', ['nom', 'dept', 'count', 'name'])
+    ).transform_filter(
+        'isValid(datum.count)'
+    ).encode(
+        color='count:Q',
+        tooltip=['nom:N', 'dept:N', 'count:Q', 'name:N']
+    ).properties(
+        width=800,
+        height=600
+    ).project(
+        type='mercator'
+    )
+
+    return chart
+
+
+def create_top50_table(year):
+    top50 = store.top_names().national(year, k=50).rename(columns=data.ENGLISH_COLUMNS)
+
+    return dbc.Table.from_dataframe(top50, striped=True, bordered=True, hover=True)
+
+
+def content(year):
+    """Carte (dans un iframe) et tableau du top 50 d'une année."""
+    chart = create_map(year)
+    table = create_top50_table(year)
+    with metrics.stage('altair_html'):
+        html_chart = chart.to_html()
+    return html.Iframe(
+        srcDoc=html_chart,
+        style={'width': '100%', 'height': '600px', 'border': 'none'}
+    ), table
+
+
+def layout():
+    years = store.top_names().years.tolist()
+    return html.Div([
+        html.H1("Carte des Prénoms en France par Département"),
+        dcc.Dropdown(
+            id=_id('year-dropdown'),
+            options=[{'label': str(year), 'value': year} for year in years],
+            value=years[0],
+            clearable=False
+        ),
+        html.Div(id=_id('map-container')),
+        html.H2("Top 50 des prénoms les plus nombreux"),
+        html.Div(id=_id('top50-table'))
+    ])
+
+
+def register_callbacks(app, figure_cache):
+    geo.register_geojson_route(app)
+
+    @app.callback(
+        [Output(_id('map-container'), 'children'),
+         Output(_id('top50-table'), 'children')],
+        [Input(_id('year-dropdown'), 'value')]
+    )
+    @figure_cache.memoize
+    def update_content(selected_year):
+        return content(selected_year)
+
+    return update_content
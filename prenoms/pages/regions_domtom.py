@@ -0,0 +1,267 @@
+"""Visualisation 2 avec les DOM-TOM : carte Plotly dont l'année change
+entièrement dans le navigateur.
+
+Outre l'effectif du prénom le plus donné, la carte peut être colorée par
+les indicateurs de prenoms.regional (diversité des prénoms, ressemblance
+avec la France ou avec un département, quotient de localisation d'un
+prénom) : les valeurs de toutes les années sont envoyées d'un coup.
+"""
+from functools import lru_cache
+
+import dash_bootstrap_components as dbc
+import numpy as np
+import plotly.express as px
+from dash import dcc, html
+from dash.dependencies import Input, Output, State
+from dash.exceptions import PreventUpdate
+
+from prenoms import data, geo, metrics, store
+from prenoms.pages import component_ids
+
+PATH = '/regions-domtom'
+TITLE = 'Carte avec les DOM-TOM'
+
+_id = component_ids('domtom')
+
+# Colorations proposées : (libellé, titre de la carte, titre de l'échelle)
+COLOURINGS = {
+    'top': ('Effectif du prénom le plus donné', 'Carte des prénoms en ', 'count'),
+    'diversity': ('Nombre effectif de prénoms', 'Diversité des prénoms en ',
+                  'prénoms'),
+    'typicality': ('Ressemblance avec la France', 'Ressemblance avec la France en ',
+                   'similarité'),
+    'lq': ("Surreprésentation d'un prénom", 'Quotient de localisation en ',
+           'quotient'),
+    'similarity': ('Ressemblance avec un département (toute la période)',
+                   'Ressemblance avec le département ', 'similarité'),
+}
+# Prénoms les plus donnés dont la concentration est affichée
+N_CONCENTRATION = 20
+N_SUGGESTIONS = 20
+
+
+def _data_key():
+    """CSV et version des données courants : clé des caches de la page."""
+    return store.csv_path(), store.data_version()
+
+
+@lru_cache(maxsize=1)
+def map_values(csv_path=None, version=None):
+    # Prénom le plus fréquent et son nombre par département, pour toutes les années :
+    # envoyé une seule fois au navigateur, qui change d'année sans appeler le serveur.
+    # csv_path et version (_data_key()) ne servent que de clé du cache
+    top_names = store.top_names()
+    values = {}
+    for year in top_names.years.tolist():
+        max_count = top_names.most_frequent_by_department(year)
+        values[str(year)] = {
+            'dept': max_count['dpt'].tolist(),
+            'name': max_count['preusuel'].tolist(),
+            'count': max_count['nombre'].tolist()
+        }
+    return values
+
+
+def _department_values(vector):
+    """Valeurs d'un vecteur indexé par département, au format d'une année de
+    map_values ; name est le nom du département."""
+    regional = store.regional_stats()
+    dpt_names = geo.department_names(geo.GEOJSON_DOMTOM)
+    labels = np.array([dpt_names.get(dept, dept) for dept in regional.depts],
+                      dtype=object)
+    present = np.isfinite(vector)
+    return {
+        'dept': regional.depts[present].tolist(),
+        'name': labels[present].tolist(),
+        'count': np.round(vector[present].astype(float), 3).tolist()
+    }
+
+
+def _matrix_values(matrix):
+    """Valeurs par année d'un tableau (année, département), au format de
+    map_values."""
+    return {str(year): _department_values(matrix[i])
+            for i, year in enumerate(store.regional_stats().years.tolist())}
+
+
+@lru_cache(maxsize=64)
+def colour_values(colouring='top', key=None, csv_path=None, version=None):
+    """Valeurs de la coloration pour toutes les années ; key est le prénom
+    (lq) ou le département (similarity) choisi, csv_path et version
+    (_data_key()) la clé des données."""
+    regional = store.regional_stats()
+    if colouring == 'top':
+        values = map_values(csv_path, version)
+    elif colouring in regional.DEPARTMENT_VALUES:
+        values = _matrix_values(regional.department_values(colouring))
+    elif colouring == 'lq':
+        values = _matrix_values(regional.location_quotients(key))
+    else:
+        # Même valeur toutes les années : envoyée une seule fois et utilisée
+        # par le navigateur pour chaque année, sans changer le titre
+        values = _department_values(regional.similar_departments(key))
+        _, title, scale = COLOURINGS[colouring]
+        return {'title': title + key, 'scale': scale, 'static': True,
+                'values': values}
+    _, title, scale = COLOURINGS[colouring]
+    return {'title': title, 'scale': scale, 'static': False, 'years': values}
+
+
+# Calculées à partir des tables de store : oubliées avec elles
+store.on_clear(map_values.cache_clear)
+store.on_clear(colour_values.cache_clear)
+
+
+def name_metrics(name):
+    name_stats = store.regional_stats().name_metrics(name) if name else None
+    if name_stats is None:
+        return ''
+    return (f"{name} : entropie de la répartition {name_stats['entropy']:.2f}, "
+            f"indice de Gini {name_stats['gini']:.2f}, le plus surreprésenté dans "
+            f"le département {name_stats['top_lq_dept']} "
+            f"({name_stats['top_lq']:.1f} fois sa part nationale)")
+
+
+def create_concentration_table():
+    top = store.trend_stats().ranking('total', k=N_CONCENTRATION)['preusuel']
+    table = store.regional_stats().concentration(top.tolist())
+    table = table.round({'entropy': 2, 'gini': 2, 'top_lq': 2}).rename(columns={
+        'preusuel': 'Prénom', 'entropy': 'Entropie', 'gini': 'Gini',
+        'top_lq': 'Quotient maximal', 'top_lq_dept': 'Département'})
+    return dbc.Table.from_dataframe(table, striped=True, bordered=True, hover=True)
+
+
+def create_map(year):
+    max_count = store.top_names().most_frequent_by_department(year).rename(columns=data.ENGLISH_COLUMNS)
+
+    # Les contours simplifiés (PRENOMS_MAP_TIER) sont chargés par le navigateur depuis
+    # /geo/ (et gardés en cache)
+    with metrics.stage('choropleth'):
+        fig = px.choropleth(
+            max_count,
+            geojson=geo.geojson_url(geo.map_file(geo.GEOJSON_DOMTOM)),
+            locations='dept',
+            featureidkey="properties.code",
+            color='count',
+            hover_name='name',
+            hover_data={'dept': False},
+            title=f'Carte des prénoms en {year}',
+            projection='mercator'
+        )
+
+    # Mise à jour de l'apparence de la carte
+    fig.update_geos(
+        visible=False,
+        resolution=50,
+        showcountries=True,
+        countrycolor="Black"
+    )
+
+    fig.update_layout(
+        width=800,
+        height=600,
+        margin={"r": 0, "t": 0, "l": 0, "b": 0}
+    )
+
+    return fig
+
+
+def layout():
+    years = store.top_names().years.tolist()
+    return html.Div([
+        html.H1("Carte des Prénoms en France par Département (y compris DOM-TOM)"),
+        dcc.Dropdown(
+            id=_id('year-dropdown'),
+            options=[{'label': str(year), 'value': year} for year in years],
+            value=years[0],
+            clearable=False
+        ),
+        dcc.RadioItems(
+            id=_id('colouring'),
+            options=[{'label': label, 'value': value}
+                     for value, (label, _, _) in COLOURINGS.items()],
+            value='top',
+            labelStyle={'display': 'inline-block', 'marginRight': '10px'}
+        ),
+        dcc.Dropdown(id=_id('name'), options=[], value=None,
+                     placeholder='Prénom (surreprésentation)'),
+        dcc.Dropdown(
+            id=_id('dept'),
+            options=[{'label': dept, 'value': dept}
+                     for dept in store.regional_stats().depts.tolist()],
+            value=None,
+            placeholder='Département (ressemblance)'
+        ),
+        html.Div(id=_id('name-metrics')),
+        dcc.Store(id=_id('map-values'), data=colour_values('top', None, *_data_key())),
+        dcc.Graph(id=_id('map-container'), figure=create_map(years[0])),
+        html.H2('Concentration géographique des prénoms les plus donnés'),
+        html.Div(children='''
+            Entropie proche de 1 et Gini proche de 0 : prénom donné partout
+            dans les mêmes proportions.
+        '''),
+        create_concentration_table()
+    ])
+
+
+def register_callbacks(app, figure_cache):
+    geo.register_geojson_route(app)
+
+    @app.callback(
+        Output(_id('name'), 'options'),
+        Input(_id('name'), 'search_value'),
+        State(_id('name'), 'value')
+    )
+    def update_name_options(search_value, selected):
+        if not search_value:
+            raise PreventUpdate
+        found = store.name_series().search.search(search_value, N_SUGGESTIONS)
+        if selected and selected not in found:
+            found = [selected] + found
+        return [{'label': name, 'value': name} for name in found]
+
+    # Les valeurs de toutes les années sont calculées à chaque changement de
+    # coloration, pas à chaque changement d'année
+    @app.callback(
+        [Output(_id('map-values'), 'data'),
+         Output(_id('name-metrics'), 'children')],
+        [Input(_id('colouring'), 'value'),
+         Input(_id('name'), 'value'),
+         Input(_id('dept'), 'value')]
+    )
+    def update_colouring(colouring, name, dept):
+        key = {'lq': name, 'similarity': dept}.get(colouring)
+        if colouring in ('lq', 'similarity') and not key:
+            raise PreventUpdate
+        return colour_values(colouring, key, *_data_key()), name_metrics(name)
+
+    # Changement d'année côté navigateur : seules les valeurs de la trace sont remplacées
+    app.clientside_callback(
+        """
+        function(year, values, figure) {
+            var v = values && (values.static ? values.values : values.years[String(year)]);
+            if (!v || !figure) {
+                return window.dash_clientside.no_update;
+            }
+            var trace = Object.assign({}, figure.data[0], {
+                locations: v.dept,
+                z: v.count,
+                hovertext: v.name
+            });
+            var layout = Object.assign({}, figure.layout, {
+                title: Object.assign({}, figure.layout.title, {text: values.static ? values.title : values.title + year})
+            });
+            if (layout.coloraxis) {
+                layout.coloraxis = Object.assign({}, layout.coloraxis, {
+                    colorbar: Object.assign({}, layout.coloraxis.colorbar,
+                                            {title: {text: values.scale}})
+                });
+            }
+            return Object.assign({}, figure, {data: [trace], layout: layout});
+        }
+        """,
+        Output(_id('map-container'), 'figure'),
+        Input(_id('year-dropdown'), 'value'),
+        Input(_id('map-values'), 'data'),
+        State(_id('map-container'), 'figure')
+    )
@@ -0,0 +1,123 @@
+"""Trajectoire de prénoms choisis (et de prénoms proches) au fil des
+années, en France ou dans des départements."""
+import plotly.graph_objects as go
+from dash import dcc, html
+from dash.dependencies import Input, Output, State
+from dash.exceptions import PreventUpdate
+
+from prenoms import cube, store
+from prenoms.pages import LABEL, PANEL, component_ids
+
+PATH = '/prenoms'
+TITLE = 'Trajectoires des prénoms'
+
+_id = component_ids('names')
+
+# Nombre de propositions affichées pendant la saisie, et de prénoms proches
+# ajoutés à chaque prénom choisi
+N_SUGGESTIONS = 20
+N_SIMILAR = 5
+
+
+def layout():
+    return html.Div(style={'backgroundColor': '#f8f9fa'}, children=[
+        html.Div(style=PANEL, children=[
+            html.H1(children='Trajectoire des prénoms'),
+            html.Div(children='''
+                Comment la popularité de quelques prénoms a-t-elle évolué de 1900 à 2020 ?
+            ''')
+        ]),
+
+        html.Div(style=PANEL, children=[
+            html.Label('Prénoms (saisissez le début ou une variante):', style=LABEL),
+            dcc.Dropdown(
+                id=_id('names'),
+                options=[],
+                value=[],
+                multi=True,
+                placeholder='Marie, Jean...'
+            ),
+            dcc.Checklist(
+                id=_id('similar'),
+                options=[{'label': ' Ajouter les prénoms proches', 'value': 'similar'}],
+                value=[]
+            ),
+            html.Br(),
+            html.Label('Sélectionnez le sexe:', style=LABEL),
+            dcc.RadioItems(
+                id=_id('sex-filter'),
+                options=[
+                    {'label': 'Tous', 'value': cube.SEX_ALL},
+                    {'label': 'Garçons', 'value': 1},
+                    {'label': 'Filles', 'value': 2}
+                ],
+                value=cube.SEX_ALL,
+                labelStyle={'display': 'inline-block', 'marginRight': '10px'}
+            ),
+            html.Br(),
+            html.Label('Sélectionnez le département (toute la France par défaut):',
+                       style=LABEL),
+            dcc.Dropdown(
+                id=_id('department-filter'),
+                options=[{'label': dpt, 'value': dpt}
+                         for dpt in store.name_series().depts.tolist()],
+                value=None,
+                multi=True
+            )
+        ]),
+
+        html.Div(style=PANEL, children=[
+            dcc.Graph(id=_id('series-chart'), style={'height': '60vh'})
+        ])
+    ])
+
+
+def create_figure(names, depts, sex):
+    series = store.name_series()
+    fig = go.Figure()
+    for name in names:
+        fig.add_trace(go.Scatter(x=series.years, y=series.series(name, depts, sex),
+                                 mode='lines', name=name))
+    fig.update_layout(
+        xaxis=dict(title='Année'),
+        yaxis=dict(title='Nombre de naissances'),
+        margin=dict(l=60, r=40, t=40, b=40),
+        hovermode='x unified'
+    )
+    return fig
+
+
+def register_callbacks(app, figure_cache):
+    # Propositions pendant la saisie : préfixe puis recherche approchée ; les
+    # prénoms déjà choisis restent dans les options
+    @app.callback(
+        Output(_id('names'), 'options'),
+        Input(_id('names'), 'search_value'),
+        State(_id('names'), 'value')
+    )
+    def update_options(search_value, selected):
+        if not search_value:
+            raise PreventUpdate
+        found = store.name_series().search.search(search_value, N_SUGGESTIONS)
+        selected = selected or []
+        return [{'label': name, 'value': name}
+                for name in selected + [n for n in found if n not in selected]]
+
+    @app.callback(
+        Output(_id('series-chart'), 'figure'),
+        [Input(_id('names'), 'value'),
+         Input(_id('similar'), 'value'),
+         Input(_id('sex-filter'), 'value'),
+         Input(_id('department-filter'), 'value')]
+    )
+    @figure_cache.memoize
+    def update_series(names, similar, sex, depts):
+        names = list(names or [])
+        if similar:
+            search = store.name_series().search
+            for name in list(names):
+                names += [n for n in search.fuzzy(name, N_SIMILAR + 1)
+                          if n not in names][:N_SIMILAR]
+        return create_figure(names, depts, sex)
+
+    return update_series
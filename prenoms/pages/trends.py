@@ -0,0 +1,115 @@
+"""Prénoms constamment populaires, engouements soudains et prénoms les plus
+volatils, lus dans les indicateurs précalculés de prenoms.trends."""
+import dash_bootstrap_components as dbc
+import plotly.graph_objects as go
+from dash import dcc, html
+from dash.dependencies import Input, Output
+
+from prenoms import cube, store
+from prenoms.pages import LABEL, PANEL, component_ids
+
+PATH = '/tendances'
+TITLE = 'Tendances'
+
+_id = component_ids('trends')
+
+# Classements proposés : (indicateur, ordre croissant)
+RANKINGS = {
+    'persistance': ('persistence', False),
+    'engouement': ('burst', False),
+    'volatilite': ('volatility', False),
+    'stabilite': ('volatility', True),
+}
+RANKING_LABELS = {
+    'persistance': 'Favoris constants',
+    'engouement': 'Engouements soudains',
+    'volatilite': 'Les plus volatils',
+    'stabilite': 'Les plus stables',
+}
+COLUMNS = {'preusuel': 'Prénom', 'total': 'Naissances', 'peak_year': 'Année du pic',
+           'peak_count': 'Naissances au pic', 'burst': 'Engouement',
+           'width': 'Années à plus de la moitié du pic',
+           'persistence': 'Persistance', 'volatility': 'Volatilité'}
+
+N_ROWS = 50
+N_LINES = 10
+
+
+def layout():
+    return html.Div(style={'backgroundColor': '#f8f9fa'}, children=[
+        html.Div(style=PANEL, children=[
+            html.H1(children='Tendances des prénoms'),
+            html.Div(children='''
+                Quels prénoms sont restés populaires, lesquels l'ont été soudainement ou brièvement ?
+            ''')
+        ]),
+
+        html.Div(style=PANEL, children=[
+            html.Label('Sélectionnez le classement:', style=LABEL),
+            dcc.RadioItems(
+                id=_id('ranking'),
+                options=[{'label': label, 'value': value}
+                         for value, label in RANKING_LABELS.items()],
+                value='persistance',
+                labelStyle={'display': 'inline-block', 'marginRight': '10px'}
+            ),
+            html.Br(),
+            html.Label('Sélectionnez le sexe:', style=LABEL),
+            dcc.RadioItems(
+                id=_id('sex-filter'),
+                options=[
+                    {'label': 'Tous', 'value': cube.SEX_ALL},
+                    {'label': 'Garçons', 'value': 1},
+                    {'label': 'Filles', 'value': 2}
+                ],
+                value=cube.SEX_ALL,
+                labelStyle={'display': 'inline-block', 'marginRight': '10px'}
+            )
+        ]),
+
+        html.Div(style=PANEL, children=[
+            dcc.Graph(id=_id('chart'), style={'height': '50vh'}),
+            html.Div(id=_id('table'))
+        ])
+    ])
+
+
+def create_figure(names, sex):
+    # Part des naissances de chaque année, comme pour le calcul des indicateurs
+    name_series = store.name_series()
+    year_totals = name_series.national_counts[:, sex, :].sum(axis=0)
+    year_totals[year_totals == 0] = 1
+    fig = go.Figure()
+    for name in names:
+        fig.add_trace(go.Scatter(x=name_series.years,
+                                 y=name_series.national(name, sex) / year_totals * 1000,
+                                 mode='lines', name=name))
+    fig.update_layout(
+        xaxis=dict(title='Année'),
+        yaxis=dict(title='Naissances pour 1000'),
+        margin=dict(l=60, r=40, t=40, b=40)
+    )
+    return fig
+
+
+def create_table(ranking):
+    table = ranking.round({'burst': 2, 'persistence': 2, 'volatility': 2})
+    return dbc.Table.from_dataframe(table.rename(columns=COLUMNS), striped=True,
+                                    bordered=True, hover=True)
+
+
+def register_callbacks(app, figure_cache):
+    @app.callback(
+        [Output(_id('chart'), 'figure'),
+         Output(_id('table'), 'children')],
+        [Input(_id('ranking'), 'value'),
+         Input(_id('sex-filter'), 'value')]
+    )
+    @figure_cache.memoize
+    def update_trends(ranking_name, sex):
+        stat, ascending = RANKINGS[ranking_name]
+        ranking = store.trend_stats().ranking(stat, sex, N_ROWS, ascending)
+        return (create_figure(ranking['preusuel'].head(N_LINES).tolist(), sex),
+                create_table(ranking))
+
+    return update_trends
@@ -0,0 +1,71 @@
+"""Visualisation 3a : nuages de mots des prénoms par sexe, d'un département
+et d'une année, avec ou sans le top 10 (portage de Visualization3a et
+Visualization3a_V2 sans serveur Bokeh)."""
+import os
+
+from dash import dcc, html
+from dash.dependencies import Input, Output
+
+from prenoms import jobs, wordclouds
+from prenoms.pages import component_ids
+
+PATH = '/wordclouds'
+TITLE = 'Nuages de mots'
+
+_id = component_ids('wordclouds')
+
+
+def layout():
+    years = wordclouds.years()
+    departments = wordclouds.departments()
+    return html.Div([
+        html.H1("Nuages de mots des prénoms par sexe"),
+        html.Div(style={'display': 'flex', 'gap': '20px'}, children=[
+            html.Div(style={'width': '320px'}, children=[
+                html.Label('Département:'),
+                dcc.Dropdown(id=_id('department'), value=departments[0],
+                             options=departments, clearable=False)
+            ]),
+            html.Div(style={'width': '160px'}, children=[
+                html.Label('Année:'),
+                dcc.Dropdown(id=_id('year'), value=years[0], options=years,
+                             clearable=False)
+            ]),
+            dcc.RadioItems(
+                id=_id('variant'),
+                options=[
+                    {'label': 'Nuages de mots', 'value': 'simple'},
+                    {'label': 'Nuages de mots & Top 10', 'value': 'top10'}
+                ],
+                value='simple',
+                labelStyle={'display': 'inline-block', 'marginRight': '10px'}
+            )
+        ]),
+        # Affichée pendant le rendu d'une image absente du disque (tâche de fond)
+        html.Progress(id=_id('progress'), style=jobs.PROGRESS_HIDDEN),
+        html.Img(id=_id('image'), style={'width': '100%', 'maxWidth': '1600px'})
+    ])
+
+
+def register_callbacks(app, figure_cache):
+    # Images servies comme fichiers statiques par le serveur de l'application,
+    # ou par PRENOMS_WORDCLOUD_URL (nginx, CDN...) si elle est définie
+    base_url = os.environ.get('PRENOMS_WORDCLOUD_URL') or wordclouds.IMAGE_ROUTE
+    renders = {variant: wordclouds.RenderCache(variant=variant, base_url=base_url)
+               for variant in wordclouds.VARIANTS}
+    wordclouds.register_image_route(app)
+
+    # Rendu lourd (« Tous les départements ») : exécuté en tâche de fond
+    @jobs.heavy_callback(
+        app,
+        Output(_id('image'), 'src'),
+        [Input(_id('department'), 'value'),
+         Input(_id('year'), 'value'),
+         Input(_id('variant'), 'value')],
+        running=[(Output(_id('progress'), 'style'), jobs.PROGRESS_SHOWN,
+                  jobs.PROGRESS_HIDDEN)]
+    )
+    def update_wordcloud(department, year, variant, progress=jobs.no_progress):
+        return renders[variant].url(department, year)
+
+    return update_wordcloud
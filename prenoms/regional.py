@@ -0,0 +1,207 @@
+"""Effets régionaux : concentration géographique des prénoms et proximité
+entre départements.
+
+Le tenseur (prénom, département, année) est creux : il est gardé sous la
+forme des lignes du cube départemental, et toutes les sommes sont des
+np.bincount sur des clés combinées, sans boucle par prénom ni par
+département. On en tire :
+
+- par (année, sexe, département) : nombre effectif de prénoms (exponentielle
+  de l'entropie de leur répartition) et ressemblance avec la France
+  (similarité cosinus entre les naissances par prénom du département et
+  celles du pays) ;
+- par (sexe, prénom), sur toute la période : entropie normalisée de la
+  répartition entre départements, indice de Gini des quotients de
+  localisation (part du prénom dans le département rapportée à sa part
+  nationale) et département où ce quotient est le plus fort ;
+- par sexe : similarité cosinus entre départements (matrice
+  département × département).
+
+Les quotients de localisation d'un prénom pour toutes les années se
+calculent à la demande sur les lignes de ce prénom (prenoms.series). Tout
+le reste est précalculé et persisté à côté du cache : changer d'année sur
+la carte ne demande aucun calcul.
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from prenoms import cube, data, series, topk
+
+
+def _name_metrics(counts):
+    """Indicateurs de concentration de chaque prénom à partir de la matrice
+    counts (prénom, département) d'un sexe."""
+    dept_totals = counts.sum(axis=0)
+    name_totals = counts.sum(axis=1)
+    n_depts = max(int((dept_totals > 0).sum()), 2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        shares = counts / name_totals[:, None]
+        entropy = -np.where(shares > 0, shares * np.log(shares), 0).sum(axis=1)
+        entropy = np.where(name_totals > 0, entropy / np.log(n_depts), np.nan)
+        national_share = name_totals / dept_totals.sum()
+        lq = np.where(dept_totals > 0, counts / dept_totals, 0) / national_share[:, None]
+    lq = np.nan_to_num(lq[:, dept_totals > 0])
+    # Gini sur les départements (classés par quotient croissant)
+    ordered = np.sort(lq, axis=1)
+    n = ordered.shape[1]
+    weights = 2 * np.arange(1, n + 1) - n - 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gini = (ordered * weights).sum(axis=1) / (n * ordered.sum(axis=1))
+    present = np.flatnonzero(dept_totals > 0)
+    return {
+        'entropy': entropy.astype(np.float32),
+        'gini': np.where(name_totals > 0, gini, np.nan).astype(np.float32),
+        'top_lq': lq.max(axis=1).astype(np.float32),
+        'top_lq_dept': present[lq.argmax(axis=1)].astype(np.int16),
+    }
+
+
+def _similarity(counts):
+    """Similarité cosinus entre départements (colonnes de counts)."""
+    norms = np.sqrt((counts ** 2).sum(axis=0))
+    norms[norms == 0] = 1
+    vectors = counts / norms
+    return (vectors.T @ vectors).astype(np.float32)
+
+
+def build_regional(aggregates, name_series, regional_dir):
+    years = topk.year_range(aggregates)
+    first_year = int(years[0])
+    departmental = aggregates.departmental
+    n_depts = len(departmental['dpt'].cat.categories)
+    n_names = len(departmental['preusuel'].cat.categories)
+    n_years, n_sexes = len(years), topk.N_SEXES
+
+    sexe = departmental['sexe'].to_numpy().astype(np.int64)
+    year = departmental['annais'].to_numpy().astype(np.int64) - first_year
+    dpt = departmental['dpt'].cat.codes.to_numpy().astype(np.int64)
+    name = departmental['preusuel'].cat.codes.to_numpy().astype(np.int64)
+    count = departmental['nombre'].to_numpy().astype(np.float64)
+
+    # Sommes par (année, sexe, département)
+    key = (year * n_sexes + sexe) * n_depts + dpt
+    size = n_years * n_sexes * n_depts
+
+    def by_department(weights):
+        return np.bincount(key, weights, minlength=size).reshape(
+            n_years, n_sexes, n_depts)
+    totals = by_department(count)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        entropy = np.log(totals) - by_department(np.where(count > 0, count * np.log(count), 0)) / totals
+        diversity = np.where(totals > 0, np.exp(entropy), np.nan)
+
+        national = name_series.national_counts
+        national_norms = np.sqrt((national.astype(np.float64) ** 2).sum(axis=0)).T
+        dot = by_department(count * national[name, sexe, year])
+        norms = np.sqrt(by_department(count ** 2))
+        typicality = np.where(totals > 0,
+                              dot / (norms * national_norms[:, :, None]), np.nan)
+
+    # Sur toute la période, un sexe à la fois : matrice (prénom, département)
+    metrics, similarity = [], []
+    for sex in range(n_sexes):
+        rows = sexe == sex
+        counts = np.bincount(name[rows] * n_depts + dpt[rows], count[rows],
+                             minlength=n_names * n_depts).reshape(n_names, n_depts)
+        metrics.append(_name_metrics(counts))
+        similarity.append(_similarity(counts))
+
+    os.makedirs(regional_dir, exist_ok=True)
+    arrays = {'years': years,
+              'depts': np.asarray(departmental['dpt'].cat.categories, dtype=str),
+              'totals': totals.astype(np.int64),
+              'diversity': diversity.astype(np.float32),
+              'typicality': typicality.astype(np.float32),
+              'similarity': np.stack(similarity)}
+    for stat in metrics[0]:
+        arrays[stat] = np.stack([m[stat] for m in metrics])
+    for key_name, array in arrays.items():
+        np.save(os.path.join(regional_dir, key_name + '.npy'), array)
+
+
+class RegionalStats:
+    """Indicateurs régionaux précalculés (voir build_regional)."""
+
+    # Valeurs par (année, sexe, département) affichables sur la carte
+    DEPARTMENT_VALUES = ('diversity', 'typicality')
+    NAME_METRICS = ('entropy', 'gini', 'top_lq', 'top_lq_dept')
+
+    def __init__(self, regional_dir, name_series):
+        def load(key):
+            return np.load(os.path.join(regional_dir, key + '.npy'))
+        self.series = name_series
+        self.years = load('years')
+        self.depts = load('depts').astype(object)
+        self.totals = load('totals')
+        self.values = {key: load(key) for key in self.DEPARTMENT_VALUES}
+        self.similarity = load('similarity')
+        self.metrics = {key: load(key) for key in self.NAME_METRICS}
+        self._dept_index = {dept: i for i, dept in enumerate(self.depts)}
+
+    def department_values(self, kind, sex=cube.SEX_ALL):
+        """Tableau (année, département) de kind (DEPARTMENT_VALUES), NaN
+        pour les départements sans naissance."""
+        return self.values[kind][:, sex, :]
+
+    def location_quotients(self, name, sex=cube.SEX_ALL):
+        """Quotients de localisation (année, département) de name : part du
+        prénom dans le département rapportée à sa part en France."""
+        counts = self.series.department_counts(name, sex)
+        totals = self.totals[:, sex, :]
+        national_totals = totals.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            national_share = counts.sum(axis=1) / national_totals
+            lq = counts / totals / national_share[:, None]
+        return np.where((totals > 0) & (national_share[:, None] > 0), lq, np.nan)
+
+    def similar_departments(self, dept, sex=cube.SEX_ALL):
+        """Similarité de chaque département avec dept (un par self.depts)."""
+        i = self._dept_index.get(dept)
+        if i is None:
+            return np.full(len(self.depts), np.nan, dtype=np.float32)
+        return self.similarity[sex, i]
+
+    def name_metrics(self, name, sex=cube.SEX_ALL):
+        """Indicateurs de concentration de name, ou None s'il est inconnu."""
+        code = self.series.code(name)
+        if code is None:
+            return None
+        values = {key: self.metrics[key][sex, code] for key in self.NAME_METRICS}
+        values['top_lq_dept'] = self.depts[values['top_lq_dept']]
+        return values
+
+    def concentration(self, names, sex=cube.SEX_ALL):
+        """Indicateurs de concentration de plusieurs prénoms (colonnes
+        preusuel, entropy, gini, top_lq, top_lq_dept)."""
+        codes = [code for code in map(self.series.code, names)
+                 if code is not None]
+        frame = pd.DataFrame({'preusuel': self.series.names[codes]})
+        for key in self.NAME_METRICS:
+            frame[key] = self.metrics[key][sex, codes]
+        frame['top_lq_dept'] = self.depts[frame['top_lq_dept'].to_numpy()]
+        return frame
+
+
+def load_regional(csv_path=data.CSV_PATH, cache_dir=None, rebuild=False):
+    """Charge les indicateurs régionaux, en les (re)calculant si le CSV a
+    changé."""
+    cache_dir = cache_dir or data.cache_dir_for(csv_path)
+    regional_dir = os.path.join(cache_dir, 'regional')
+    meta_path = os.path.join(cache_dir, 'regional.json')
+    paths = data.sources(csv_path, cache_dir)
+    name_series = series.load_series(csv_path, cache_dir)
+    if rebuild or not data.is_fresh(paths, meta_path):
+        build_regional(cube.load_cube(csv_path, cache_dir), name_series,
+                       regional_dir)
+        data.mark_fresh(paths, meta_path)
+    return RegionalStats(regional_dir, name_series)
+
+
+if __name__ == '__main__':
+    # python -m prenoms.regional [chemin/vers/dpt2020.csv]
+    path = sys.argv[1] if len(sys.argv) > 1 else data.CSV_PATH
+    load_regional(path, rebuild=True)
+    print('Indicateurs écrits dans', os.path.join(data.cache_dir_for(path), 'regional'))
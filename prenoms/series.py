@@ -0,0 +1,227 @@
+"""Trajectoire d'un prénom de la première à la dernière année.
+
+Index inversé prénom -> séries, construit à partir du cube :
+
+- national : tableau dense (prénom, sexe, année) des naissances en France ;
+  la série d'un prénom est une simple tranche, sans calcul ;
+- départemental : les lignes du cube triées par (prénom, sexe, département,
+  année), avec pour chaque prénom le début de ses lignes (offsets) ; la
+  série d'un prénom dans quelques départements se calcule sur ses seules
+  lignes.
+
+NameSearch retrouve les prénoms par préfixe (tableau trié) ou de façon
+approchée (index des trigrammes, puis similarité de difflib sur les
+meilleurs candidats), sans tenir compte des accents ni de la casse.
+"""
+import difflib
+import os
+import sys
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from prenoms import cube, data, topk
+
+# Nombre de candidats (trigrammes communs) comparés par la recherche approchée
+FUZZY_CANDIDATES = 200
+
+
+def normalize(name):
+    """Prénom sans accents, en majuscules."""
+    decomposed = unicodedata.normalize('NFKD', str(name))
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).upper().strip()
+
+
+def _trigrams(key):
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameSearch:
+    """Recherche de prénoms par préfixe ou approchée.
+
+    Les résultats sont classés par nombre total de naissances décroissant
+    (préfixe) ou par similarité (approchée).
+    """
+
+    def __init__(self, names, totals):
+        self.names = np.asarray(names, dtype=object)
+        self.totals = np.asarray(totals)
+        keys = [normalize(name) for name in self.names]
+        self._order = np.argsort(np.asarray(keys, dtype=str), kind='stable')
+        self._keys = np.asarray(keys, dtype=str)[self._order]
+        grams = {}
+        for code, key in enumerate(keys):
+            for gram in _trigrams(key):
+                grams.setdefault(gram, []).append(code)
+        self._grams = {gram: np.asarray(codes, dtype=np.int32)
+                       for gram, codes in grams.items()}
+        self._key_list = keys
+
+    def prefix(self, query, limit=20):
+        """Prénoms commençant par query, les plus donnés d'abord."""
+        key = normalize(query)
+        if not key:
+            return []
+        start = np.searchsorted(self._keys, key, side='left')
+        stop = np.searchsorted(self._keys, key + '\uffff', side='left')
+        codes = self._order[start:stop]
+        codes = codes[np.argsort(-self.totals[codes], kind='stable')][:limit]
+        return self.names[codes].tolist()
+
+    def fuzzy(self, query, limit=10):
+        """Prénoms les plus proches de query (fautes de frappe, variantes)."""
+        key = normalize(query)
+        if not key:
+            return []
+        hits = [self._grams[gram] for gram in _trigrams(key) if gram in self._grams]
+        if not hits:
+            return []
+        shared = np.bincount(np.concatenate(hits), minlength=len(self.names))
+        candidates = np.argsort(-shared, kind='stable')[:FUZZY_CANDIDATES]
+        candidates = candidates[shared[candidates] > 0]
+        matcher = difflib.SequenceMatcher(b=key, autojunk=False)
+        scored = []
+        for code in candidates.tolist():
+            matcher.set_seq1(self._key_list[code])
+            scored.append((-matcher.ratio(), -int(self.totals[code]), code))
+        scored.sort()
+        return [self.names[code] for _, _, code in scored[:limit]]
+
+    def search(self, query, limit=20):
+        """Préfixe d'abord, complété par la recherche approchée."""
+        found = self.prefix(query, limit)
+        if len(found) < limit:
+            found += [name for name in self.fuzzy(query, limit)
+                      if name not in found][:limit - len(found)]
+        return found
+
+
+class NameSeries:
+    """Séries annuelles des naissances par prénom, en France ou dans des
+    départements."""
+
+    def __init__(self, series_dir):
+        def load(key, mmap_mode='r'):
+            return np.load(os.path.join(series_dir, key + '.npy'),
+                           mmap_mode=mmap_mode)
+        self.years = load('years', None)
+        self.names = load('names', None).astype(object)
+        self.depts = load('depts', None).astype(object)
+        self.national_counts = load('national_counts')
+        self.offsets = load('offsets', None)
+        self.sexe = load('sexe')
+        self.dpt = load('dpt')
+        self.year = load('year')
+        self.nombre = load('nombre')
+        self._codes = {name: i for i, name in enumerate(self.names)}
+        self._dept_index = {dept: i for i, dept in enumerate(self.depts)}
+        self._search = None
+
+    @property
+    def search(self):
+        """NameSearch des prénoms, construit à la première recherche."""
+        if self._search is None:
+            totals = self.national_counts[:, cube.SEX_ALL, :].sum(axis=1)
+            self._search = NameSearch(self.names, totals)
+        return self._search
+
+    def code(self, name):
+        """Indice de name dans self.names, ou None s'il est inconnu."""
+        return self._codes.get(name)
+
+    def national(self, name, sex=cube.SEX_ALL):
+        """Naissances en France pour chaque année de self.years."""
+        code = self._codes.get(name)
+        if code is None:
+            return np.zeros(len(self.years), dtype=np.int32)
+        return self.national_counts[code, sex]
+
+    def departments(self, name, depts, sex=cube.SEX_ALL):
+        """Naissances sommées sur les départements depts, pour chaque année."""
+        code = self._codes.get(name)
+        wanted = [self._dept_index[d] for d in depts if d in self._dept_index]
+        if code is None or not wanted:
+            return np.zeros(len(self.years), dtype=np.int32)
+        start, stop = self.offsets[code], self.offsets[code + 1]
+        rows = slice(start, stop)
+        keep = (self.sexe[rows] == sex) & np.isin(self.dpt[rows], wanted)
+        return np.bincount(self.year[rows][keep], weights=self.nombre[rows][keep],
+                           minlength=len(self.years)).astype(np.int32)
+
+    def department_counts(self, name, sex=cube.SEX_ALL):
+        """Naissances de name par (année, département de self.depts)."""
+        shape = (len(self.years), len(self.depts))
+        code = self._codes.get(name)
+        if code is None:
+            return np.zeros(shape, dtype=np.int32)
+        rows = slice(self.offsets[code], self.offsets[code + 1])
+        keep = self.sexe[rows] == sex
+        key = self.year[rows][keep].astype(np.int64) * shape[1] + self.dpt[rows][keep]
+        return np.bincount(key, weights=self.nombre[rows][keep],
+                           minlength=shape[0] * shape[1]).reshape(shape).astype(np.int32)
+
+    def series(self, name, depts=None, sex=cube.SEX_ALL):
+        """Série de name en France (depts vide) ou dans les départements
+        depts."""
+        if depts:
+            return self.departments(name, depts, sex)
+        return self.national(name, sex)
+
+    def frame(self, names, depts=None, sex=cube.SEX_ALL):
+        """Séries de plusieurs prénoms (colonnes annais, preusuel, nombre)."""
+        frames = [pd.DataFrame({'annais': self.years, 'preusuel': name,
+                                'nombre': self.series(name, depts, sex)})
+                  for name in names]
+        if not frames:
+            return pd.DataFrame({'annais': [], 'preusuel': [], 'nombre': []})
+        return pd.concat(frames, ignore_index=True)
+
+
+def build_series(aggregates, series_dir):
+    years = topk.year_range(aggregates)
+    first_year = int(years[0])
+    names = np.asarray(aggregates.national['preusuel'].cat.categories, dtype=str)
+    depts = np.asarray(aggregates.departmental['dpt'].cat.categories, dtype=str)
+
+    national = aggregates.national
+    counts = np.zeros((len(names), topk.N_SEXES, len(years)), dtype=np.int32)
+    counts[national['preusuel'].cat.codes.to_numpy(),
+           national['sexe'].to_numpy(),
+           national['annais'].to_numpy() - first_year] = national['nombre'].to_numpy()
+
+    departmental = aggregates.departmental
+    name_codes = departmental['preusuel'].cat.codes.to_numpy()
+    sexe = departmental['sexe'].to_numpy()
+    dpt = departmental['dpt'].cat.codes.to_numpy().astype(np.int16)
+    year = (departmental['annais'].to_numpy() - first_year).astype(np.int16)
+    order = np.lexsort((year, dpt, sexe, name_codes))
+    offsets = np.searchsorted(name_codes[order], np.arange(len(names) + 1))
+
+    os.makedirs(series_dir, exist_ok=True)
+    arrays = {'years': years, 'names': names, 'depts': depts,
+              'national_counts': counts, 'offsets': offsets.astype(np.int64),
+              'sexe': sexe[order], 'dpt': dpt[order], 'year': year[order],
+              'nombre': departmental['nombre'].to_numpy()[order]}
+    for key, array in arrays.items():
+        np.save(os.path.join(series_dir, key + '.npy'), array)
+
+
+def load_series(csv_path=data.CSV_PATH, cache_dir=None, rebuild=False):
+    """Charge l'index des séries, en le (re)construisant si le CSV a changé."""
+    cache_dir = cache_dir or data.cache_dir_for(csv_path)
+    series_dir = os.path.join(cache_dir, 'series')
+    meta_path = os.path.join(cache_dir, 'series.json')
+    paths = data.sources(csv_path, cache_dir)
+    if rebuild or not data.is_fresh(paths, meta_path):
+        build_series(cube.load_cube(csv_path, cache_dir), series_dir)
+        data.mark_fresh(paths, meta_path)
+    return NameSeries(series_dir)
+
+
+if __name__ == '__main__':
+    # python -m prenoms.series [chemin/vers/dpt2020.csv]
+    path = sys.argv[1] if len(sys.argv) > 1 else data.CSV_PATH
+    load_series(path, rebuild=True)
+    print('Séries écrites dans', os.path.join(data.cache_dir_for(path), 'series'))
@@ -0,0 +1,175 @@
+"""Données partagées par toutes les pages d'un même processus.
+
+Chaque table (prénoms, cube, index top K, séries, tendances et mixité par
+prénom, indicateurs régionaux, palette de la course de barres) n'est chargée
+qu'une fois par processus, quelle que soit la page qui la demande, et
+rechargée quand les données changent (cache reconstruit ou complété par
+prenoms.ingest).
+preload() les charge toutes à l'avance : appelé avant le fork des workers
+(gunicorn --preload), il permet aux workers de partager ces objets par
+copie sur écriture.
+"""
+import os
+from functools import lru_cache
+
+import numpy as np
+import plotly.express as px
+
+from prenoms import cube, data, gender, geo, regional, series, topk, trends
+
+_csv_path = data.CSV_PATH
+# Version des données (data_version) de chaque CSV lors du dernier accès
+_versions = {}
+
+# Palette de la course de barres, une couleur par prénom
+COLORS = px.colors.qualitative.Set3
+
+
+def use_csv(csv_path):
+    """Change le CSV utilisé par les tables chargées ensuite."""
+    global _csv_path
+    _csv_path = csv_path
+
+
+def csv_path():
+    return _csv_path
+
+
+def data_version():
+    """Change quand le cache des prénoms est reconstruit ou complété : les
+    résultats calculés sur les anciennes données ne sont plus relus."""
+    meta = os.path.join(data.cache_dir_for(_csv_path), 'names.json')
+    try:
+        return os.stat(meta).st_mtime_ns
+    except OSError:
+        return None
+
+
+def clear():
+    """Oublie toutes les tables chargées (et les valeurs calculées à partir
+    d'elles) : elles seront relues au prochain accès."""
+    for loader in _LOADERS:
+        loader.cache_clear()
+    for hook in _clear_hooks:
+        hook()
+
+
+def on_clear(hook):
+    """Enregistre hook, appelé par clear() : pour les caches des pages
+    calculés à partir des tables."""
+    _clear_hooks.append(hook)
+    return hook
+
+
+def _refresh():
+    """Vide les tables si les données du CSV courant ont changé depuis le
+    dernier accès (par exemple après prenoms.ingest.append)."""
+    version = data_version()
+    known = _versions.get(_csv_path)
+    if known is not None and version != known:
+        clear()
+    _versions[_csv_path] = version
+
+
+@lru_cache(maxsize=None)
+def _names(path):
+    return data.load_names(path)
+
+
+@lru_cache(maxsize=None)
+def _aggregates(path):
+    return cube.load_cube(path)
+
+
+@lru_cache(maxsize=None)
+def _top_names(path):
+    return topk.load_topk(path)
+
+
+@lru_cache(maxsize=None)
+def _name_series(path):
+    return series.load_series(path)
+
+
+@lru_cache(maxsize=None)
+def _trend_stats(path):
+    return trends.load_trends(path)
+
+
+@lru_cache(maxsize=None)
+def _regional_stats(path):
+    return regional.load_regional(path)
+
+
+@lru_cache(maxsize=None)
+def _gender_mix(path):
+    return gender.load_gender(path)
+
+
+@lru_cache(maxsize=None)
+def _name_colors(path):
+    n_names = len(_aggregates(path).national['preusuel'].cat.categories)
+    return np.asarray(COLORS, dtype=object)[np.arange(n_names) % len(COLORS)]
+
+
+_LOADERS = (_names, _aggregates, _top_names, _name_series, _trend_stats,
+            _regional_stats, _gender_mix, _name_colors)
+_clear_hooks = []
+
+
+def names():
+    _refresh()
+    return _names(_csv_path)
+
+
+def aggregates():
+    _refresh()
+    return _aggregates(_csv_path)
+
+
+def top_names():
+    _refresh()
+    return _top_names(_csv_path)
+
+
+def name_series():
+    _refresh()
+    return _name_series(_csv_path)
+
+
+def trend_stats():
+    _refresh()
+    return _trend_stats(_csv_path)
+
+
+def regional_stats():
+    _refresh()
+    return _regional_stats(_csv_path)
+
+
+def gender_mix():
+    _refresh()
+    return _gender_mix(_csv_path)
+
+
+def name_colors():
+    """Couleur de chaque prénom dans la course de barres, indexée par son
+    code (catégories de preusuel dans le cube)."""
+    _refresh()
+    return _name_colors(_csv_path)
+
+
+def preload():
+    """Charge toutes les tables et prépare les contours simplifiés."""
+    names()
+    aggregates()
+    top_names()
+    name_series().search
+    trend_stats()
+    regional_stats()
+    gender_mix()
+    name_colors()
+    for path, fmt in ((geo.GEOJSON_SIMPLIFIED, 'topojson'),
+                      (geo.GEOJSON_DOMTOM, 'geojson')):
+        geo.department_names(path)
+        geo.map_file(path, fmt)
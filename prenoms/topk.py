@@ -0,0 +1,164 @@
+"""Index des K prénoms les plus donnés par année, au niveau national et par
+département.
+
+L'index est stocké sous forme de tableaux denses triés
+(année, [département,] sexe, rang) de codes de prénoms et d'effectifs : le
+prénom le plus fréquent de chaque département ou le top 50 national d'une
+année se lisent directement, sans groupby.
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from prenoms import cube, data
+
+K_NATIONAL = 50
+K_DEPARTMENTAL = 10
+N_SEXES = 3  # SEX_ALL, garçons, filles
+
+
+def _dense(frame, keys, shape, first_year):
+    """Range les shape[-1] premières lignes de chaque clé de frame (déjà triée
+    par effectif décroissant) dans des tableaux denses codes/effectifs."""
+    k = shape[-1]
+    rank = frame.groupby(keys, observed=True, sort=False).cumcount().to_numpy()
+    keep = rank < k
+    rows = frame[keep]
+    where = []
+    for key in keys:
+        if key == 'annais':
+            where.append(rows['annais'].to_numpy() - first_year)
+        elif key == 'dpt':
+            where.append(rows['dpt'].cat.codes.to_numpy())
+        else:
+            where.append(rows[key].to_numpy())
+    # Les tableaux sont indexés (année, [département,] sexe, rang)
+    where = tuple(where[i] for i in _AXES[len(keys)]) + (rank[keep],)
+    codes = np.full(shape, -1, dtype=np.int32)
+    counts = np.zeros(shape, dtype=np.int32)
+    codes[where] = rows['preusuel'].cat.codes.to_numpy()
+    counts[where] = rows['nombre'].to_numpy()
+    return codes, counts
+
+
+# Ordre des clés de cube.NATIONAL_KEYS / DEPARTMENTAL_KEYS dans les tableaux
+_AXES = {2: (1, 0), 3: (1, 2, 0)}
+
+
+def year_range(aggregates):
+    """Années de l'index : toutes celles entre la première et la dernière
+    du cube, y compris les années manquantes."""
+    years = aggregates.years
+    return np.arange(years[0], years[-1] + 1, dtype=np.int16)
+
+
+def dense_tables(aggregates, years):
+    """Tableaux denses (codes, effectifs) des années consécutives years."""
+    first_year = int(years[0])
+    n_depts = len(aggregates.departmental['dpt'].cat.categories)
+    national, departmental = aggregates.year_rows(years)
+    national_codes, national_counts = _dense(
+        national, cube.NATIONAL_KEYS, (len(years), N_SEXES, K_NATIONAL),
+        first_year)
+    departmental_codes, departmental_counts = _dense(
+        departmental, cube.DEPARTMENTAL_KEYS,
+        (len(years), n_depts, N_SEXES, K_DEPARTMENTAL), first_year)
+    return {'national_codes': national_codes,
+            'national_counts': national_counts,
+            'departmental_codes': departmental_codes,
+            'departmental_counts': departmental_counts}
+
+
+def save_topk(aggregates, years, tables, topk_dir):
+    depts = np.asarray(aggregates.departmental['dpt'].cat.categories, dtype=str)
+    names = np.asarray(aggregates.national['preusuel'].cat.categories, dtype=str)
+    assert np.array_equal(
+        names, np.asarray(aggregates.departmental['preusuel'].cat.categories,
+                          dtype=str))
+    os.makedirs(topk_dir, exist_ok=True)
+    arrays = dict(tables, years=years, depts=depts, names=names)
+    for key, array in arrays.items():
+        np.save(os.path.join(topk_dir, key + '.npy'), array)
+
+
+def build_topk(aggregates, topk_dir):
+    years = year_range(aggregates)
+    save_topk(aggregates, years, dense_tables(aggregates, years), topk_dir)
+
+
+class TopKIndex:
+    """Top K des prénoms par (année, sexe) et par (année, département, sexe)."""
+
+    def __init__(self, topk_dir):
+        def load(key):
+            return np.load(os.path.join(topk_dir, key + '.npy'))
+        self.years = load('years')
+        self.depts = load('depts').astype(object)
+        self.names = load('names').astype(object)
+        self.national_codes = load('national_codes')
+        self.national_counts = load('national_counts')
+        self.departmental_codes = load('departmental_codes')
+        self.departmental_counts = load('departmental_counts')
+        self._first_year = int(self.years[0]) if len(self.years) else 0
+        self._dept_index = {dept: i for i, dept in enumerate(self.depts)}
+
+    def _year_index(self, year):
+        i = int(year) - self._first_year
+        return i if 0 <= i < len(self.years) else None
+
+    def national(self, year, sex=cube.SEX_ALL, k=K_NATIONAL):
+        """Les k prénoms les plus donnés en France une année (colonnes
+        preusuel, nombre)."""
+        i = self._year_index(year)
+        if i is None:
+            return pd.DataFrame({'preusuel': [], 'nombre': []})
+        codes = self.national_codes[i, sex, :k]
+        codes = codes[codes >= 0]
+        return pd.DataFrame({'preusuel': self.names[codes],
+                             'nombre': self.national_counts[i, sex, :len(codes)]})
+
+    def department(self, year, dept, sex=cube.SEX_ALL, k=K_DEPARTMENTAL):
+        """Les k prénoms les plus donnés dans un département une année."""
+        i = self._year_index(year)
+        j = self._dept_index.get(dept)
+        if i is None or j is None:
+            return pd.DataFrame({'preusuel': [], 'nombre': []})
+        codes = self.departmental_codes[i, j, sex, :k]
+        codes = codes[codes >= 0]
+        return pd.DataFrame({
+            'preusuel': self.names[codes],
+            'nombre': self.departmental_counts[i, j, sex, :len(codes)]})
+
+    def most_frequent_by_department(self, year, sex=cube.SEX_ALL):
+        """Le prénom le plus donné dans chaque département une année
+        (colonnes dpt, preusuel, nombre)."""
+        i = self._year_index(year)
+        if i is None:
+            return pd.DataFrame({'dpt': [], 'preusuel': [], 'nombre': []})
+        codes = self.departmental_codes[i, :, sex, 0]
+        present = codes >= 0
+        return pd.DataFrame({
+            'dpt': self.depts[present],
+            'preusuel': self.names[codes[present]],
+            'nombre': self.departmental_counts[i, present, sex, 0]})
+
+
+def load_topk(csv_path=data.CSV_PATH, cache_dir=None, rebuild=False):
+    """Charge l'index top K, en le (re)construisant si le CSV a changé."""
+    cache_dir = cache_dir or data.cache_dir_for(csv_path)
+    topk_dir = os.path.join(cache_dir, 'topk')
+    meta_path = os.path.join(cache_dir, 'topk.json')
+    paths = data.sources(csv_path, cache_dir)
+    if rebuild or not data.is_fresh(paths, meta_path):
+        build_topk(cube.load_cube(csv_path, cache_dir), topk_dir)
+        data.mark_fresh(paths, meta_path)
+    return TopKIndex(topk_dir)
+
+
+if __name__ == '__main__':
+    # python -m prenoms.topk [chemin/vers/dpt2020.csv]
+    path = sys.argv[1] if len(sys.argv) > 1 else data.CSV_PATH
+    load_topk(path, rebuild=True)
+    print('Index écrit dans', os.path.join(data.cache_dir_for(path), 'topk'))
@@ -0,0 +1,459 @@
+"""Simplification des contours des départements et export TopoJSON.
+
+Les coordonnées sont quantifiées sur la grille des coordonnées arrondies du
+GeoJSON (10^-DECIMALS degré), les anneaux sont découpés en arcs aux points
+où le voisinage change, et chaque arc partagé par deux départements n'est
+stocké et simplifié (Douglas-Peucker) qu'une fois : les frontières communes
+restent jointives quel que soit le niveau de simplification.
+
+Douglas-Peucker, arc par arc, peut faire se croiser deux arcs d'un même
+département ou pincer un anneau. Les contours simplifiés sont donc vérifiés
+sur la grille entière (celle du fichier écrit) : les arcs en cause sont
+simplifiés à nouveau avec une tolérance plus faible, jusqu'à l'arc
+d'origine si besoin. Chaque niveau est écrit en TopoJSON (pour Altair/Vega)
+et en GeoJSON compact (pour Plotly).
+
+    python -m prenoms.topology [fichier.geojson ...]
+"""
+import json
+import os
+import sys
+from collections import defaultdict
+
+import numpy as np
+
+# Décimales des coordonnées écrites ; 10^-5 degré (environ 1 m) garde les
+# contours d'origine valides, pas 10^-4
+DECIMALS = 5
+OBJECT_NAME = 'departements'
+# Change quand les fichiers produits changent (voir geo.map_file)
+VERSION = 2
+
+
+def _rings(geometry):
+    """Liste de polygones (listes d'anneaux) d'une géométrie GeoJSON."""
+    if geometry['type'] == 'Polygon':
+        return [geometry['coordinates']]
+    if geometry['type'] == 'MultiPolygon':
+        return geometry['coordinates']
+    raise ValueError(f"Géométrie non prise en charge : {geometry['type']}")
+
+
+def _transform(features, decimals):
+    """Grille des coordonnées arrondies à decimals : le GeoJSON écrit a
+    exactement les points vérifiés."""
+    points = np.concatenate([np.asarray(ring, dtype=float)[:, :2]
+                             for feature in features
+                             for polygon in _rings(feature['geometry'])
+                             for ring in polygon])
+    step = 10.0 ** -decimals
+    x0, y0 = np.floor(points.min(axis=0) / step) * step
+    return {'scale': [step, step],
+            'translate': [round(float(x0), decimals), round(float(y0), decimals)]}
+
+
+def _quantize(ring, transform):
+    points = np.asarray(ring, dtype=float)[:, :2]
+    q = np.rint((points - transform['translate']) / transform['scale']).astype(np.int64)
+    keep = np.ones(len(q), dtype=bool)
+    keep[1:] = np.any(q[1:] != q[:-1], axis=1)
+    q = [tuple(p) for p in q[keep].tolist()]
+    if q[0] != q[-1]:
+        q.append(q[0])
+    return q
+
+
+def _edge(a, b):
+    return (a, b) if a <= b else (b, a)
+
+
+def _cut(ring, owners):
+    """Découpe un anneau fermé en arcs aux points où l'ensemble des anneaux
+    partageant l'arête change."""
+    n = len(ring) - 1
+    shared = [owners[_edge(ring[i], ring[i + 1])] for i in range(n)]
+    cuts = [i for i in range(n) if shared[i - 1] != shared[i]]
+    if not cuts:
+        return [ring], True
+    arcs = [ring[a:b + 1] for a, b in zip(cuts, cuts[1:])]
+    arcs.append(ring[cuts[-1]:] + ring[1:cuts[0] + 1])
+    return arcs, False
+
+
+def _normalize_closed(arc):
+    points = arc[:-1]
+    start = points.index(min(points))
+    return points[start:] + points[:start] + [points[start]]
+
+
+def _douglas_peucker(points, tolerance):
+    """Indices des points gardés (extrémités toujours gardées)."""
+    n = len(points)
+    if n <= 2 or tolerance <= 0:
+        return list(range(n))
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        a, b = points[first], points[last]
+        inner = points[first + 1:last]
+        ab = b - a
+        length = np.hypot(*ab)
+        if length == 0:
+            distances = np.hypot(*(inner - a).T)
+        else:
+            distances = np.abs(ab[0] * (inner[:, 1] - a[1])
+                               - ab[1] * (inner[:, 0] - a[0])) / length
+        i = int(np.argmax(distances))
+        if distances[i] > tolerance:
+            keep[first + 1 + i] = True
+            stack.append((first, first + 1 + i))
+            stack.append((first + 1 + i, last))
+    return np.flatnonzero(keep).tolist()
+
+
+def _simplify(arc, closed, transform, tolerance):
+    """Indices des points gardés de arc."""
+    points = np.asarray(arc, dtype=float) * transform['scale']
+    if not closed:
+        return _douglas_peucker(points, tolerance)
+    # Anneau isolé (île, enclave) : on le coupe au point le plus éloigné du
+    # départ pour garder une surface, et au moins quatre points
+    far = int(np.argmax(np.hypot(*(points - points[0]).T)))
+    kept = _douglas_peucker(points[:far + 1], tolerance)
+    kept += [far + i for i in _douglas_peucker(points[far:], tolerance)[1:]]
+    if len(kept) < 4:
+        n = len(arc) - 1
+        kept = sorted({0, n // 3, 2 * n // 3, n}) if n >= 3 else kept
+    return kept
+
+
+def _refine(arc, kept, segment):
+    """Ajoute à kept le point de arc le plus éloigné du segment kept[segment],
+    kept[segment + 1] (l'étape suivante de Douglas-Peucker) ; renvoie faux si
+    le segment n'a plus de point intermédiaire."""
+    first, last = kept[segment], kept[segment + 1]
+    if last - first < 2:
+        return False
+    a, b = arc[first], arc[last]
+    inner = arc[first + 1:last]
+    ab = b - a
+    if not ab.any():
+        distances = np.hypot(*(inner - a).T)
+    else:
+        distances = np.abs(ab[0] * (inner[:, 1] - a[1]) - ab[1] * (inner[:, 0] - a[0]))
+    kept.insert(segment + 1, first + 1 + int(np.argmax(distances)))
+    return True
+
+
+def _orientation(ax, ay, bx, by, cx, cy):
+    return np.sign((bx - ax) * (cy - ay) - (by - ay) * (cx - ax))
+
+
+def _candidate_pairs(x0, y0, x1, y1):
+    """Paires (i, j), i < j, de segments dont les rectangles englobants
+    tombent dans une même case d'une grille."""
+    n = len(x0)
+    if n < 2:
+        return np.zeros((0, 2), dtype=np.int64)
+    xmin, xmax = np.minimum(x0, x1), np.maximum(x0, x1)
+    ymin, ymax = np.minimum(y0, y1), np.maximum(y0, y1)
+    cell = max(1, int(np.median(np.maximum(xmax - xmin, ymax - ymin))) * 2)
+    cx0, cx1 = xmin // cell, xmax // cell
+    cy0, cy1 = ymin // cell, ymax // cell
+    width = cx1 - cx0 + 1
+    counts = width * (cy1 - cy0 + 1)
+    segment = np.repeat(np.arange(n), counts)
+    offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    cx = cx0[segment] + offset % width[segment]
+    cy = cy0[segment] + offset // width[segment]
+    key = (cx - cx.min()) * (cy.max() - cy.min() + 1) + (cy - cy.min())
+    order = np.argsort(key, kind='stable')
+    key, segment = key[order], segment[order]
+    # Chaque segment est apparié aux segments suivants de sa case
+    starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+    stops = np.r_[starts[1:], len(key)]
+    position = np.arange(len(key))
+    partners = np.repeat(stops, stops - starts) - position - 1
+    left = np.repeat(position, partners)
+    right = left + 1 + np.arange(len(left)) - np.repeat(np.cumsum(partners) - partners,
+                                                        partners)
+    pairs = np.sort(np.stack([segment[left], segment[right]], axis=1), axis=1)
+    return np.unique(pairs, axis=0)
+
+
+def _crossing_pairs(points):
+    """Paires de segments ((arc, segment), (arc, segment)) qui se croisent,
+    se touchent ailleurs qu'en une extrémité commune ou se superposent."""
+    x0 = np.concatenate([p[:-1, 0] for p in points])
+    y0 = np.concatenate([p[:-1, 1] for p in points])
+    x1 = np.concatenate([p[1:, 0] for p in points])
+    y1 = np.concatenate([p[1:, 1] for p in points])
+    sizes = [len(p) - 1 for p in points]
+    arc = np.repeat(np.arange(len(points)), sizes)
+    segment = np.arange(len(arc)) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    pairs = _candidate_pairs(x0, y0, x1, y1)
+    i, j = pairs[:, 0], pairs[:, 1]
+    d1 = _orientation(x0[j], y0[j], x1[j], y1[j], x0[i], y0[i])
+    d2 = _orientation(x0[j], y0[j], x1[j], y1[j], x1[i], y1[i])
+    d3 = _orientation(x0[i], y0[i], x1[i], y1[i], x0[j], y0[j])
+    d4 = _orientation(x0[i], y0[i], x1[i], y1[i], x1[j], y1[j])
+    collinear = (d1 == 0) & (d2 == 0)
+    shared = np.zeros(len(i), dtype=bool)
+    for ax, ay, bx, by in ((x0, y0, x0, y0), (x0, y0, x1, y1),
+                           (x1, y1, x0, y0), (x1, y1, x1, y1)):
+        shared |= (ax[i] == bx[j]) & (ay[i] == by[j])
+    # Deux segments non alignés ont au plus un point commun : il doit être
+    # une extrémité commune
+    crossing = ~collinear & (d1 * d2 <= 0) & (d3 * d4 <= 0) & ~shared
+    # Segments alignés : ils ne doivent pas se recouvrir sur une longueur
+    overlap_x = (np.minimum(np.maximum(x0[i], x1[i]), np.maximum(x0[j], x1[j]))
+                 - np.maximum(np.minimum(x0[i], x1[i]), np.minimum(x0[j], x1[j])))
+    overlap_y = (np.minimum(np.maximum(y0[i], y1[i]), np.maximum(y0[j], y1[j]))
+                 - np.maximum(np.minimum(y0[i], y1[i]), np.minimum(y0[j], y1[j])))
+    overlap = collinear & (((overlap_x > 0) & (overlap_y >= 0))
+                           | ((overlap_y > 0) & (overlap_x >= 0)))
+    bad = crossing | overlap
+    return list(zip(zip(arc[i[bad]].tolist(), segment[i[bad]].tolist()),
+                    zip(arc[j[bad]].tolist(), segment[j[bad]].tolist())))
+
+
+def _ring_points(refs, points):
+    coords = []
+    for ref in refs:
+        arc = points[ref] if ref >= 0 else points[~ref][::-1]
+        coords.extend(arc.tolist() if not coords else arc[1:].tolist())
+    return coords
+
+
+def _inside(point, ring):
+    """Vrai si point est à l'intérieur de l'anneau fermé ring."""
+    x, y = point
+    ring = np.asarray(ring, dtype=float)
+    xi, yi, xj, yj = ring[:-1, 0], ring[:-1, 1], ring[1:, 0], ring[1:, 1]
+    straddle = (yi > y) != (yj > y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        crossing = x < (xj - xi) * (y - yi) / (yj - yi) + xi
+    return bool(np.count_nonzero(straddle & crossing) % 2)
+
+
+def _nesting(points, feature_rings):
+    """Pour chaque département, les paires (i, j) d'anneaux tels que le
+    premier point de i (une extrémité d'arc, jamais déplacée) est dans j."""
+    nesting = []
+    for rings in feature_rings:
+        coords = [_ring_points(refs, points) for refs in rings]
+        nesting.append({(i, j) for i in range(len(coords)) for j in range(len(coords))
+                        if i != j and _inside(coords[i][0], coords[j])})
+    return nesting
+
+
+def _arc_ids(refs):
+    return [ref if ref >= 0 else ~ref for ref in refs]
+
+
+def _segments(arcs, points):
+    return {(arc, segment) for arc in arcs for segment in range(len(points[arc]) - 1)}
+
+
+def _sliver_segments(point, refs, arcs, kept):
+    """Segments de l'anneau refs dont la partie d'arc d'origine qu'ils
+    remplacent, refermée par le segment, contient point."""
+    found = set()
+    for arc in _arc_ids(refs):
+        for segment, (first, last) in enumerate(zip(kept[arc], kept[arc][1:])):
+            if last - first >= 2 and _inside(point, arcs[arc][first:last + 1].tolist()
+                                             + [arcs[arc][first].tolist()]):
+                found.add((arc, segment))
+    return found
+
+
+def _invalid_segments(points, feature_rings, nesting, arcs, kept):
+    """Segments (arc, segment) à préciser : ceux qui se croisent à
+    l'intérieur d'un même département, ceux des anneaux qui passent deux
+    fois par un point et ceux des anneaux dont l'imbrication (nesting, celle
+    des contours d'origine) a changé, comme une île englobée par la côte
+    voisine."""
+    invalid = set()
+    arc_features = defaultdict(set)
+    for feature, rings in enumerate(feature_rings):
+        for refs in rings:
+            for arc in _arc_ids(refs):
+                arc_features[arc].add(feature)
+            coords = _ring_points(refs, points)
+            if len(set(map(tuple, coords[:-1]))) < len(coords) - 1:
+                invalid |= _segments(_arc_ids(refs), points)
+    for rings, before, after in zip(feature_rings, nesting,
+                                    _nesting(points, feature_rings)):
+        # Le premier point de i n'a pas bougé : c'est un segment de l'anneau
+        # j qui est passé de l'autre côté
+        for i, j in before ^ after:
+            point = _ring_points(rings[i], points)[0]
+            invalid |= (_sliver_segments(point, rings[j], arcs, kept)
+                        or _segments(_arc_ids(rings[j]), points))
+    for a, b in _crossing_pairs(points):
+        if arc_features[a[0]] & arc_features[b[0]]:
+            invalid.update((a, b))
+    return invalid
+
+
+def build_topology(geojson, tolerance=0.0, decimals=DECIMALS):
+    """Topologie TopoJSON (dict) d'une FeatureCollection GeoJSON, avec des
+    arcs simplifiés à tolerance (en degrés) sur la grille de decimals
+    décimales, sans contour invalide."""
+    features = geojson['features']
+    transform = _transform(features, decimals)
+    geometries = []
+    for feature in features:
+        polygons = []
+        for polygon in _rings(feature['geometry']):
+            # Les anneaux réduits à moins de trois points par la
+            # quantification n'ont plus de surface
+            rings = [_quantize(ring, transform) for ring in polygon]
+            if len(rings[0]) < 4:
+                continue
+            polygons.append([ring for ring in rings if len(ring) >= 4])
+        geometries.append(polygons)
+
+    owners = defaultdict(set)
+    ring_id = 0
+    for polygons in geometries:
+        for polygon in polygons:
+            for ring in polygon:
+                for a, b in zip(ring, ring[1:]):
+                    owners[_edge(a, b)].add(ring_id)
+                ring_id += 1
+    owners = {edge: frozenset(rings) for edge, rings in owners.items()}
+
+    arcs, closed_arcs, index = [], [], {}
+
+    def arc_ref(arc, closed):
+        if closed:
+            arc = _normalize_closed(arc)
+        key = tuple(arc)
+        if key in index:
+            return index[key]
+        reverse = key[::-1]
+        if reverse in index:
+            return ~index[reverse]
+        index[key] = len(arcs)
+        arcs.append(arc)
+        closed_arcs.append(closed)
+        return index[key]
+
+    topo_geometries, feature_rings = [], []
+    for feature, polygons in zip(features, geometries):
+        refs = []
+        for polygon in polygons:
+            polygon_refs = []
+            for ring in polygon:
+                pieces, closed = _cut(ring, owners)
+                polygon_refs.append([arc_ref(piece, closed) for piece in pieces])
+            refs.append(polygon_refs)
+        feature_rings.append([ring for polygon in refs for ring in polygon])
+        geometry = {'type': 'Polygon', 'arcs': refs[0]} if len(refs) == 1 \
+            else {'type': 'MultiPolygon', 'arcs': refs}
+        geometry['properties'] = feature.get('properties', {})
+        if 'code' in geometry['properties']:
+            geometry['id'] = geometry['properties']['code']
+        topo_geometries.append(geometry)
+
+    # Les segments des contours invalides sont précisés (point d'origine le
+    # plus éloigné remis) jusqu'à ce que tous les contours soient valides
+    arcs = [np.asarray(arc, dtype=np.int64) for arc in arcs]
+    kept = [_simplify(arc, closed, transform, tolerance)
+            for arc, closed in zip(arcs, closed_arcs)]
+    points = [arc[indices] for arc, indices in zip(arcs, kept)]
+    if tolerance > 0:
+        nesting = _nesting(arcs, feature_rings)
+        while True:
+            refined = set()
+            # Du dernier segment au premier : les indices des autres segments
+            # d'un même arc ne changent pas
+            for arc, segment in sorted(_invalid_segments(points, feature_rings, nesting,
+                                                         arcs, kept), reverse=True):
+                if _refine(arcs[arc], kept[arc], segment):
+                    refined.add(arc)
+            if not refined:
+                break
+            for arc in refined:
+                points[arc] = arcs[arc][kept[arc]]
+
+    encoded = []
+    for arc_points in points:
+        deltas = np.vstack([arc_points[:1], np.diff(arc_points, axis=0)])
+        encoded.append(deltas.tolist())
+
+    return {
+        'type': 'Topology',
+        'transform': transform,
+        'objects': {OBJECT_NAME: {'type': 'GeometryCollection',
+                                  'geometries': topo_geometries}},
+        'arcs': encoded,
+    }
+
+
+def to_geojson(topology, decimals=DECIMALS):
+    """FeatureCollection GeoJSON compacte (coordonnées arrondies) à partir
+    d'une topologie construite par build_topology avec les mêmes
+    decimals."""
+    sx, sy = topology['transform']['scale']
+    tx, ty = topology['transform']['translate']
+    arcs = []
+    for arc in topology['arcs']:
+        points = np.cumsum(np.asarray(arc, dtype=float), axis=0)
+        coords = np.round(points * [sx, sy] + [tx, ty], decimals)
+        arcs.append(coords.tolist())
+
+    def ring(refs):
+        coords = []
+        for ref in refs:
+            arc = arcs[ref] if ref >= 0 else arcs[~ref][::-1]
+            coords.extend(arc if not coords else arc[1:])
+        return coords
+
+    features = []
+    for geometry in topology['objects'][OBJECT_NAME]['geometries']:
+        if geometry['type'] == 'Polygon':
+            coordinates = [ring(refs) for refs in geometry['arcs']]
+        else:
+            coordinates = [[ring(refs) for refs in polygon]
+                           for polygon in geometry['arcs']]
+        features.append({'type': 'Feature',
+                         'properties': geometry.get('properties', {}),
+                         'geometry': {'type': geometry['type'],
+                                      'coordinates': coordinates}})
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def write_tier(source_path, out_dir, tier, tolerance, decimals=DECIMALS):
+    """Écrit <nom>.<tier>.topojson et <nom>.<tier>.geojson dans out_dir."""
+    with open(source_path, encoding='utf-8') as f:
+        geojson = json.load(f)
+    topology = build_topology(geojson, tolerance, decimals)
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {}
+    for fmt, content in (('topojson', topology),
+                         ('geojson', to_geojson(topology, decimals))):
+        path = os.path.join(out_dir, f'{stem}.{tier}.{fmt}')
+        tmp = '%s.tmp-%d' % (path, os.getpid())
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(content, f, separators=(',', ':'), ensure_ascii=False)
+        os.replace(tmp, path)
+        paths[fmt] = path
+    return paths
+
+
+if __name__ == '__main__':
+    from prenoms import geo
+    sources = sys.argv[1:] or [geo.GEOJSON_DOMTOM, geo.GEOJSON_SIMPLIFIED]
+    for source in sources:
+        for tier in geo.TIERS:
+            geo.map_file(source, 'topojson', tier, rebuild=True)
+            for fmt in ('topojson', 'geojson'):
+                path = geo.map_file(source, fmt, tier)
+                print(f'{path} : {os.path.getsize(path) // 1024} Ko')
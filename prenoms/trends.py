@@ -0,0 +1,137 @@
+"""Indicateurs de tendance par prénom, calculés sur toute la matrice
+prénom × année.
+
+Les indicateurs sont obtenus en une passe de tableaux numpy sur la matrice
+dense des naissances de prenoms.series (une ligne par prénom, une colonne
+par année), pour chaque sexe :
+
+- total : naissances sur toute la période ;
+- pic : année et effectif de l'année la plus forte ;
+- engouement (burst) : part des naissances de l'année du pic rapportée à
+  la part moyenne sur la période ; élevé pour un prénom soudainement et
+  brièvement populaire ;
+- largeur : nombre d'années où la part dépasse la moitié de celle du pic ;
+- persistance : part des années où le prénom est dans le top TOP_RANK ;
+- volatilité : écart quadratique moyen de la variation annuelle du
+  logarithme du rang, sur les années consécutives où il est donné.
+
+Les parts sont rapportées aux naissances de chaque année, pour ne pas
+confondre la popularité d'un prénom avec la natalité. Les résultats sont
+persistés à côté du cache et relus directement par la page des tendances.
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from prenoms import cube, data, series, topk
+
+TOP_RANK = 100
+# Naissances minimales (sur la période) pour figurer dans les classements
+MIN_TOTAL = 1000
+
+STATS = ['total', 'peak_year', 'peak_count', 'burst', 'width', 'persistence',
+         'volatility']
+
+
+def compute_stats(counts, years):
+    """Indicateurs de chaque prénom pour une matrice counts
+    (prénom, année)."""
+    counts = np.asarray(counts, dtype=np.float64)
+    n_names, n_years = counts.shape
+    rows = np.arange(n_names)
+
+    total = counts.sum(axis=1)
+    year_totals = counts.sum(axis=0)
+    share = counts / np.where(year_totals > 0, year_totals, 1)
+    peak = share.argmax(axis=1)
+    peak_share = share[rows, peak]
+    mean_share = share.mean(axis=1)
+    present = total > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        burst = np.where(present, peak_share / mean_share, 0)
+    width = np.where(present, (share >= peak_share[:, None] / 2).sum(axis=1), 0)
+
+    # Rang de chaque prénom chaque année (1 = le plus donné), NaN s'il n'est
+    # pas donné cette année-là
+    order = np.argsort(-counts, axis=0, kind='stable')
+    rank = np.empty((n_names, n_years))
+    rank[order, np.arange(n_years)] = rows[:, None] + 1
+    rank[counts == 0] = np.nan
+    persistence = (rank <= TOP_RANK).sum(axis=1) / max(n_years, 1)
+    change = np.diff(np.log(rank), axis=1)
+    valid = ~np.isnan(change)
+    n_changes = valid.sum(axis=1)
+    squares = np.where(valid, change, 0) ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        volatility = np.where(n_changes > 0,
+                              np.sqrt(squares.sum(axis=1) / n_changes), np.nan)
+
+    return {
+        'total': total.astype(np.int64),
+        'peak_year': np.where(present, np.asarray(years)[peak], 0).astype(np.int16),
+        'peak_count': counts[rows, peak].astype(np.int32),
+        'burst': burst.astype(np.float32),
+        'width': width.astype(np.int16),
+        'persistence': persistence.astype(np.float32),
+        'volatility': volatility.astype(np.float32),
+    }
+
+
+def build_trends(name_series, trends_dir):
+    by_sex = [compute_stats(name_series.national_counts[:, sex, :],
+                            name_series.years)
+              for sex in range(topk.N_SEXES)]
+    os.makedirs(trends_dir, exist_ok=True)
+    np.save(os.path.join(trends_dir, 'names.npy'),
+            np.asarray(name_series.names, dtype=str))
+    for stat in STATS:
+        np.save(os.path.join(trends_dir, stat + '.npy'),
+                np.stack([stats[stat] for stats in by_sex]))
+
+
+class TrendStats:
+    """Indicateurs de tendance par (sexe, prénom)."""
+
+    def __init__(self, trends_dir):
+        self.names = np.load(os.path.join(trends_dir, 'names.npy')).astype(object)
+        self.stats = {stat: np.load(os.path.join(trends_dir, stat + '.npy'))
+                      for stat in STATS}
+
+    def frame(self, sex=cube.SEX_ALL, min_total=MIN_TOTAL):
+        """Tous les prénoms d'au moins min_total naissances (colonnes
+        preusuel puis STATS)."""
+        keep = self.stats['total'][sex] >= min_total
+        columns = {'preusuel': self.names[keep]}
+        columns.update((stat, values[sex][keep])
+                       for stat, values in self.stats.items())
+        return pd.DataFrame(columns)
+
+    def ranking(self, stat, sex=cube.SEX_ALL, k=50, ascending=False,
+                min_total=MIN_TOTAL):
+        """Les k prénoms aux plus fortes (ou plus faibles) valeurs de stat ;
+        à égalité, les plus donnés d'abord."""
+        frame = self.frame(sex, min_total).dropna(subset=[stat])
+        frame = frame.sort_values([stat, 'total'], ascending=[ascending, False],
+                                  kind='stable')
+        return frame.head(k).reset_index(drop=True)
+
+
+def load_trends(csv_path=data.CSV_PATH, cache_dir=None, rebuild=False):
+    """Charge les indicateurs, en les (re)calculant si le CSV a changé."""
+    cache_dir = cache_dir or data.cache_dir_for(csv_path)
+    trends_dir = os.path.join(cache_dir, 'trends')
+    meta_path = os.path.join(cache_dir, 'trends.json')
+    paths = data.sources(csv_path, cache_dir)
+    if rebuild or not data.is_fresh(paths, meta_path):
+        build_trends(series.load_series(csv_path, cache_dir), trends_dir)
+        data.mark_fresh(paths, meta_path)
+    return TrendStats(trends_dir)
+
+
+if __name__ == '__main__':
+    # python -m prenoms.trends [chemin/vers/dpt2020.csv]
+    path = sys.argv[1] if len(sys.argv) > 1 else data.CSV_PATH
+    load_trends(path, rebuild=True)
+    print('Indicateurs écrits dans', os.path.join(data.cache_dir_for(path), 'trends'))
@@ -0,0 +1,628 @@
+"""Rendu des nuages de mots de la visualisation 3a.
+
+Deux variantes : 'simple' (Visualization3a, un nuage par sexe) et 'top10'
+(Visualization3a_V2, avec en plus le top 10 des prénoms). Les images sont
+dessinées directement avec PIL à leur taille finale, sans matplotlib. Ce
+sont des fonctions de (département, année, variante) : elles sont gardées
+dans un cache mémoire borné et sur disque, servies comme fichiers statiques,
+et peuvent être toutes pré-rendues en parallèle :
+
+    python -m prenoms.wordclouds [--variant simple|top10] [--workers N]
+                                 [--format png|webp] [chemin/vers/dpt2020.csv]
+"""
+import argparse
+import base64
+import os
+import shutil
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from io import BytesIO
+from random import Random
+
+import numpy as np
+
+from prenoms import cache, cube, data, gender, geo, metrics, store
+
+ALL_DEPARTMENTS = 'Tous les départements'
+VARIANTS = ('simple', 'top10')
+FORMATS = {'png': 'image/png', 'webp': 'image/webp'}
+IMAGE_SIZE = (1600, 800)
+BOKEH_PORT = 5006
+DEFAULT_MAX_MB = 128
+
+IMAGE_ROUTE = '/wordclouds/'
+IMAGE_MAX_AGE = 24 * 3600
+# À incrémenter quand le dessin change : les images déjà rendues (et gardées
+# en cache par les navigateurs) ne sont plus utilisées
+RENDER_VERSION = 2
+
+# Couleur des barres du top 10 selon la part de garçons
+BOYS_COLOR, GIRLS_COLOR, MIXED_COLOR = 'blue', 'pink', 'mediumpurple'
+UNKNOWN_COLOR = 'lightgray'
+
+
+def aggregates():
+    return store.aggregates()
+
+
+def department_codes():
+    return geo.department_codes(geo.GEOJSON_DOMTOM)
+
+
+def years():
+    """Années disponibles, de la plus récente à la plus ancienne."""
+    return aggregates().years[::-1]
+
+
+def departments():
+    """Noms des départements présents dans les données, précédés de
+    ALL_DEPARTMENTS."""
+    names = geo.department_names(geo.GEOJSON_DOMTOM)
+    present = aggregates().departmental['dpt'].cat.categories
+    return [ALL_DEPARTMENTS] + sorted(names[code] for code in present
+                                      if code in names)
+
+
+def _slices(department, year, sex):
+    """Tranche du cube (sexe, année, département) : les années des menus
+    Bokeh arrivent en chaînes et sont converties ici, une seule fois."""
+    if department == ALL_DEPARTMENTS:
+        return aggregates().national_slice(int(year), sex)
+    return aggregates().department_slice(int(year),
+                                         department_codes().get(department), sex)
+
+
+def _department_label(department):
+    if department == ALL_DEPARTMENTS:
+        return '--'
+    code = department_codes().get(department)
+    return 'code unfound' if code is None else code
+
+
+# Mise en page de l'image, en pixels
+MARGIN = 30
+HEADER_TOP = 20
+YEAR_FONT = 60
+DEPARTMENT_FONT = 30
+TITLE_FONT = 28
+LABEL_FONT = 18
+PANELS_TOP = 170
+CLOUD_RATIO = 2.4  # largeur / hauteur des nuages (1200 x 500 à l'origine)
+
+
+@lru_cache(maxsize=None)
+def _font(size):
+    from PIL import ImageFont
+    from wordcloud.wordcloud import FONT_PATH
+    return ImageFont.truetype(FONT_PATH, size)
+
+
+@lru_cache(maxsize=None)
+def _blank():
+    from PIL import Image
+    return Image.new('RGB', IMAGE_SIZE, 'white')
+
+
+def _wordcloud(width, height):
+    # Une instance par rendu : generate_from_frequencies modifie l'instance
+    # (layout_, ...), qui ne peut pas être partagée entre des callbacks
+    # exécutés en parallèle. Seules les polices (_font), immuables, sont
+    # réutilisées d'un rendu à l'autre
+    from wordcloud import WordCloud
+    return WordCloud(width=width, height=height, background_color='white')
+
+
+def _word_random(word):
+    """Générateur aléatoire propre à un mot : son orientation, sa couleur et
+    sa position de repli sont les mêmes d'une image à l'autre."""
+    return Random(zlib.crc32(word.encode('utf-8')))
+
+
+def _is_free(integral, top, left, height, width):
+    """Vrai si le rectangle est dans l'image et ne recouvre aucun mot
+    (integral : image intégrale de l'occupation)."""
+    rows, cols = integral.shape
+    if top < 0 or left < 0 or top + height > rows or left + width > cols:
+        return False
+    bottom, right = top + height - 1, left + width - 1
+    total = int(integral[bottom, right])
+    if top:
+        total -= int(integral[top - 1, right])
+    if left:
+        total -= int(integral[bottom, left - 1])
+    if top and left:
+        total += int(integral[top - 1, left - 1])
+    return total == 0
+
+
+def _start_size(cloud, frequencies):
+    """Taille de police du premier mot, choisie comme le fait
+    WordCloud.generate_from_frequencies."""
+    if cloud.max_font_size is not None:
+        return cloud.max_font_size
+    if len(frequencies) == 1:
+        return cloud.height
+    # Placement tiré toujours de la même façon : la taille ne varie d'une
+    # image à l'autre qu'avec les effectifs
+    state, cloud.random_state = cloud.random_state, Random(0)
+    try:
+        cloud.generate_from_frequencies(dict(frequencies[:2]),
+                                        max_font_size=cloud.height)
+    finally:
+        cloud.random_state = state
+    sizes = [size for _, size, _, _, _ in cloud.layout_]
+    if len(sizes) < 2:
+        return sizes[0] if sizes else cloud.height
+    return int(2 * sizes[0] * sizes[1] / (sizes[0] + sizes[1]))
+
+
+# Variation maximale de la taille d'un mot d'une image à l'autre quand il
+# garde sa place
+SIZE_CHANGE = 0.15
+# Décalages (lignes, colonnes) essayés autour de l'ancienne place d'un mot
+NUDGES = [(0, 0)] + [(dr * step, dc * step) for step in (4, 8, 16)
+                     for dr in (-1, 0, 1) for dc in (-1, 0, 1) if dr or dc]
+
+
+def _box(draw, word, font_size, orientation, margin):
+    """Police et taille (hauteur, largeur, marge comprise) de word."""
+    from PIL import ImageFont
+    font = ImageFont.TransposedFont(_font(font_size), orientation=orientation)
+    box = draw.textbbox((0, 0), word, font=font, anchor='lt')
+    return font, box[3] + margin, box[2] + margin
+
+
+def stable_layout(cloud, frequencies, previous=None):
+    """Disposition des mots (cloud.layout_), comme
+    cloud.generate_from_frequencies mais stable d'une image à l'autre.
+
+    Les mots de previous (layout_ de l'image précédente) sont placés en
+    premier, centrés au même endroit (ou juste à côté) et avec la même
+    orientation. Les autres prennent ensuite une place propre au mot, sinon
+    une place au hasard. Les couleurs dépendent du mot.
+    """
+    from PIL import Image, ImageDraw
+    from wordcloud.wordcloud import IntegralOccupancyMap
+    frequencies = sorted(frequencies.items(), key=lambda item: item[1],
+                         reverse=True)[:cloud.max_words]
+    max_frequency = float(frequencies[0][1])
+    frequencies = [(word, freq / max_frequency) for word, freq in frequencies]
+    before = {word: (size, position, orientation)
+              for (word, _), size, position, orientation, _ in previous or ()}
+
+    # Tailles de police : même progression que generate_from_frequencies
+    sizes, font_size, last_freq = [], _start_size(cloud, frequencies), 1.0
+    for _, freq in frequencies:
+        font_size = int(round((cloud.relative_scaling * (freq / last_freq)
+                               + (1 - cloud.relative_scaling)) * font_size))
+        sizes.append(font_size)
+        last_freq = freq
+
+    height, width, margin = cloud.height, cloud.width, cloud.margin
+    occupancy = IntegralOccupancyMap(height, width, None)
+    grey = Image.new('L', (width, height))
+    draw = ImageDraw.Draw(grey)
+    placed = {}
+
+    def place(i, corner, font, size, orientation):
+        row, col = corner[0] + margin // 2, corner[1] + margin // 2
+        draw.text((col, row), frequencies[i][0], fill='white', font=font)
+        occupancy.update(np.asarray(grey), row, col)
+        placed[i] = (size, (row, col), orientation)
+
+    # Mots déjà présents : même centre que dans l'image précédente, taille
+    # proche de la précédente
+    for i, (word, _) in enumerate(frequencies):
+        if word not in before:
+            continue
+        old_size, (row, col), orientation = before[word]
+        _, old_height, old_width = _box(draw, word, old_size, orientation, margin)
+        size = min(sizes[i], int(old_size * (1 + SIZE_CHANGE)))
+        while i not in placed and size >= max(cloud.min_font_size,
+                                              old_size * (1 - SIZE_CHANGE)):
+            font, box_height, box_width = _box(draw, word, size, orientation, margin)
+            top = min(max(row - margin // 2 + (old_height - box_height) // 2, 0),
+                      height - box_height)
+            left = min(max(col - margin // 2 + (old_width - box_width) // 2, 0),
+                       width - box_width)
+            for dr, dc in NUDGES:
+                if _is_free(occupancy.integral, top + dr, left + dc, box_height, box_width):
+                    place(i, (top + dr, left + dc), font, size, orientation)
+                    break
+            size -= cloud.font_step
+
+    # Autres mots : place propre au mot, sinon au hasard. Comme dans
+    # generate_from_frequencies, une police réduite faute de place réduit
+    # aussi celle des mots suivants, et on s'arrête quand plus rien ne rentre
+    random_state = Random(0)
+    font_size, last_freq = sizes[0], 1.0
+    for i, (word, freq) in enumerate(frequencies):
+        font_size = int(round((cloud.relative_scaling * (freq / last_freq)
+                               + (1 - cloud.relative_scaling)) * font_size))
+        last_freq = freq
+        if i in placed:
+            continue
+        word_random = _word_random(word)
+        horizontal = word_random.random() < cloud.prefer_horizontal
+        fallback = word_random.random(), word_random.random()
+        orientation = before[word][2] if word in before else (
+            None if horizontal else Image.ROTATE_90)
+        while font_size >= cloud.min_font_size:
+            font, box_height, box_width = _box(draw, word, font_size, orientation, margin)
+            corner = (int(fallback[0] * (height - box_height)),
+                      int(fallback[1] * (width - box_width)))
+            if not _is_free(occupancy.integral, *corner, box_height, box_width):
+                corner = occupancy.sample_position(box_height, box_width, random_state)
+            if corner is not None:
+                place(i, corner, font, font_size, orientation)
+                break
+            font_size -= cloud.font_step
+        if font_size < cloud.min_font_size:
+            break
+
+    layout = []
+    for i in sorted(placed):
+        word, freq = frequencies[i]
+        size, position, orientation = placed[i]
+        color = cloud.color_func(word, font_size=size, position=position,
+                                 orientation=orientation,
+                                 random_state=_word_random(word),
+                                 font_path=cloud.font_path)
+        layout.append(((word, freq), size, position, orientation, color))
+    cloud.words_ = dict(frequencies)
+    cloud.layout_ = layout
+    return layout
+
+
+def _panels(count):
+    """Rectangles (x, y, largeur, hauteur) des panneaux côte à côte."""
+    width = (IMAGE_SIZE[0] - MARGIN * (count + 1)) // count
+    height = IMAGE_SIZE[1] - PANELS_TOP - MARGIN
+    return [(MARGIN + i * (width + MARGIN), PANELS_TOP, width, height)
+            for i in range(count)]
+
+
+def _header(draw, department, year, code, top=HEADER_TOP):
+    center = IMAGE_SIZE[0] // 2
+    draw.text((center, top), f'Année : {year}', fill='black',
+              font=_font(YEAR_FONT), anchor='mt')
+    draw.text((center, top + YEAR_FONT + 10), f'{department} ({code})',
+              fill='grey', font=_font(DEPARTMENT_FONT), anchor='mt')
+
+
+def _title(draw, panel, text, color):
+    x, y, width, _ = panel
+    draw.text((x + width // 2, y), text, fill=color, font=_font(TITLE_FONT),
+              anchor='mt')
+
+
+def _no_data(image, draw, panels, department, year, code):
+    print(f"No data for year {year} and department {department}")
+    for panel in panels:
+        _title(draw, panel, 'Pas de données', 'red')
+    _header(draw, department, year, code, top=IMAGE_SIZE[1] // 2 - YEAR_FONT)
+    return image
+
+
+def _draw_cloud(image, draw, panel, df, title, color, layouts=None):
+    x, y, width, height = panel
+    if df.empty:
+        _title(draw, panel, f'Pas de données pour les {title.lower()}', 'red')
+        return
+    _title(draw, panel, title, color)
+    top = y + TITLE_FONT + 20
+    cloud_height = min(int(width / CLOUD_RATIO), y + height - top)
+    freq = dict(zip(df['preusuel'].astype(str), df['nombre'].tolist()))
+    with metrics.stage('wordcloud_layout'):
+        cloud = _wordcloud(width, cloud_height)
+        if layouts is None:
+            cloud.generate_from_frequencies(freq)
+        else:
+            layouts[title] = stable_layout(cloud, freq, layouts.get(title))
+    # Le tableau du nuage est collé tel quel, sans passer par matplotlib
+    image.paste(cloud.to_image(), (x, top + (y + height - top - cloud_height) // 2))
+
+
+def _draw_top_names(draw, panel, df_top_names):
+    x, y, width, height = panel
+    _title(draw, panel, 'Top 10 Prénoms', 'black')
+    if df_top_names.empty:
+        return
+    font = _font(LABEL_FONT)
+    top = y + TITLE_FONT + 30
+    row = (y + height - top) // 10
+    label_width = max(int(draw.textlength(str(name), font=font))
+                      for name in df_top_names['preusuel']) + 10
+    bar_space = width - label_width - 70
+    largest = df_top_names['nombre'].max()
+    for i, (name, count, color) in enumerate(df_top_names[['preusuel', 'nombre', 'color']]
+                                             .itertuples(index=False)):
+        bar_top = top + i * row
+        middle = bar_top + row // 2
+        length = max(1, int(bar_space * count / largest))
+        draw.text((x + label_width - 10, middle), str(name), fill='black',
+                  font=font, anchor='rm')
+        draw.rectangle([x + label_width, bar_top + row // 8,
+                        x + label_width + length, bar_top + row - row // 8],
+                       fill=color)
+        draw.text((x + label_width + length + 5, middle), str(count),
+                  fill='black', font=font, anchor='lm')
+
+
+def top_colors(names, department, year):
+    """Couleur de chaque prénom selon sa part de garçons cette année-là
+    (mixte si le sexe minoritaire dépasse gender.MIXED_SHARE)."""
+    dept = None if department == ALL_DEPARTMENTS else department_codes().get(department)
+    shares = store.gender_mix().male_shares(list(names), year, dept)
+    colors = np.where(shares >= 1 - gender.MIXED_SHARE, BOYS_COLOR,
+                      np.where(shares <= gender.MIXED_SHARE, GIRLS_COLOR,
+                               MIXED_COLOR))
+    return np.where(np.isnan(shares), UNKNOWN_COLOR, colors).tolist()
+
+
+@metrics.timed('wordcloud_render')
+def generate_wordcloud(department, year, variant='simple', layouts=None):
+    """Image PIL (IMAGE_SIZE) du nuage de mots d'un département et d'une
+    année, dessinée directement à la taille finale.
+
+    Pour les animations, layouts (dictionnaire panneau -> disposition) est
+    lu puis mis à jour : les mots restent en place d'une année à l'autre
+    (voir stable_layout).
+    """
+    from PIL import ImageDraw
+    code = _department_label(department)
+    df_male = _slices(department, year, 1)
+    df_female = _slices(department, year, 2)
+
+    image = _blank().copy()
+    draw = ImageDraw.Draw(image)
+    panels = _panels(3 if variant == 'top10' else 2)
+
+    if df_male.empty and df_female.empty:
+        return _no_data(image, draw, panels, department, year, code)
+
+    _draw_cloud(image, draw, panels[0], df_male, 'Prénoms masculins', 'blue',
+                layouts)
+    _draw_cloud(image, draw, panels[1], df_female, 'Prénoms féminins', '#FF1493',
+                layouts)
+
+    if variant == 'top10':
+        df_top_names = _slices(department, year, cube.SEX_ALL) \
+            .head(10)[['preusuel', 'nombre']].reset_index(drop=True)
+        df_top_names['color'] = top_colors(df_top_names['preusuel'], department, year)
+        _draw_top_names(draw, panels[2], df_top_names)
+
+    _header(draw, department, year, code)
+    return image
+
+
+def render(department, year, variant='simple', fmt='png'):
+    """Image (octets) du nuage de mots d'un département et d'une année."""
+    buf = BytesIO()
+    image = generate_wordcloud(department, year, variant)
+    with metrics.stage('wordcloud_encode'):
+        image.save(buf, format=fmt)
+    return buf.getvalue()
+
+
+def image_dir(csv_path=None):
+    return os.path.join(data.cache_dir_for(csv_path or store.csv_path()),
+                        'wordclouds')
+
+
+def render_dir(variant='simple'):
+    """Répertoire des images d'une variante : il change avec RENDER_VERSION
+    et avec la version des données (reconstruction du cache, ajout de
+    fichiers), les images rendues sur d'autres données ne sont pas
+    relues."""
+    aggregates()  # construit le cache des prénoms s'il n'est pas à jour
+    return f'{variant}.v{RENDER_VERSION}.{store.data_version()}'
+
+
+def image_path(directory, department, year, variant='simple', fmt='png'):
+    code = 'all' if department == ALL_DEPARTMENTS else department_codes().get(department, 'unknown')
+    return os.path.join(directory, render_dir(variant), code, f'{year}.{fmt}')
+
+
+def prune_renders(directory, variants=VARIANTS):
+    """Supprime de directory les images des autres versions (dessin ou
+    données) de variants."""
+    current = {render_dir(variant) for variant in variants}
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return
+    for name in names:
+        if name.split('.v')[0] in variants and name not in current:
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+
+class RenderCache:
+    """Images des nuages de mots : mémoire (LRU borné) puis disque, rendues
+    à la demande si absentes.
+
+    url() renvoie l'adresse d'une image :
+
+    - celle donnée par base_url ou PRENOMS_WORDCLOUD_URL (nginx, CDN...) ;
+    - IMAGE_ROUTE, adresse relative servie par le serveur Bokeh lui-même,
+      quand l'application est lancée par run_server (python
+      Visualization3a.py) ;
+    - sur un serveur de fichiers séparé, seulement si
+      PRENOMS_WORDCLOUD_PORT est défini (démarré par serve()) ;
+    - sinon (bokeh serve), l'image elle-même, en data URI.
+    """
+
+    def __init__(self, variant='simple', fmt='png', directory=None,
+                 max_bytes=DEFAULT_MAX_MB * 2**20, base_url=None):
+        self.variant = variant
+        self.fmt = fmt
+        self.directory = directory or image_dir()
+        self.memory = cache.FigureCache(max_bytes=max_bytes, disk_dir='')
+        base_url = base_url or os.environ.get('PRENOMS_WORDCLOUD_URL')
+        port = os.environ.get('PRENOMS_WORDCLOUD_PORT')
+        self.port = int(port) if port and not base_url else None
+        if base_url:
+            self.base_url = base_url
+        elif self.port:
+            self.base_url = f'http://localhost:{self.port}'
+        elif _routed_directories:
+            self.base_url = IMAGE_ROUTE
+        else:
+            self.base_url = None
+        if self.base_url:
+            self.base_url = self.base_url.rstrip('/')
+        self._on_disk = set()
+
+    @property
+    def mimetype(self):
+        return FORMATS[self.fmt]
+
+    def serve(self):
+        """Sert le répertoire des images sur PRENOMS_WORDCLOUD_PORT depuis la
+        boucle tornado du serveur Bokeh, si ce port est demandé."""
+        if self.port:
+            serve_images(self.directory, self.port)
+
+    def path(self, department, year):
+        """Chemin de l'image sur disque, rendue si elle n'existe pas encore."""
+        path = image_path(self.directory, department, year, self.variant, self.fmt)
+        if path not in self._on_disk:
+            if not os.path.exists(path):
+                self.memory.set((department, str(year), self.variant, self.fmt),
+                                _load_or_render(self.directory, department, year,
+                                                self.variant, self.fmt))
+            self._on_disk.add(path)
+        return path
+
+    def url(self, department, year):
+        if self.base_url is None:
+            encoded = base64.b64encode(self.get(department, year)).decode('ascii')
+            return f'data:{self.mimetype};base64,{encoded}'
+        relative = os.path.relpath(self.path(department, year), self.directory)
+        return f"{self.base_url}/{relative.replace(os.sep, '/')}"
+
+    def get(self, department, year):
+        key = (department, str(year), self.variant, self.fmt)
+        image = self.memory.get(key)
+        if image is None:
+            image = _load_or_render(self.directory, department, year,
+                                    self.variant, self.fmt)
+            self.memory.set(key, image)
+        return image
+
+
+_image_servers = {}
+# Répertoires d'images servis sur IMAGE_ROUTE par run_server
+_routed_directories = []
+
+
+def serve_images(directory, port):
+    """Démarre (une seule fois par processus) un serveur de fichiers
+    statiques tornado pour directory sur la boucle d'événements courante."""
+    if port in _image_servers:
+        return _image_servers[port]
+    from tornado.web import Application, StaticFileHandler
+    os.makedirs(directory, exist_ok=True)
+    server = Application([(r'/(.*)', StaticFileHandler, {'path': directory})]) \
+        .listen(port)
+    _image_servers[port] = server
+    return server
+
+
+def run_server(script_path, port=BOKEH_PORT, show=True, directory=None):
+    """Lance le serveur Bokeh de script_path (à la place de bokeh serve) en
+    servant aussi les images sur IMAGE_ROUTE : une adresse relative,
+    valable pour tous les navigateurs, sans second port. Les origines
+    autorisées pour un accès distant se règlent avec BOKEH_ALLOW_WS_ORIGIN,
+    comme pour bokeh serve."""
+    from bokeh.application import Application
+    from bokeh.application.handlers import ScriptHandler
+    from bokeh.server.server import Server
+    from tornado.web import StaticFileHandler
+    directory = os.path.abspath(directory or image_dir())
+    os.makedirs(directory, exist_ok=True)
+    _routed_directories.append(directory)
+    server = Server({'/': Application(ScriptHandler(filename=script_path))},
+                    port=port,
+                    extra_patterns=[(IMAGE_ROUTE + '(.*)', StaticFileHandler,
+                                     {'path': directory})])
+    server.start()
+    print(f'Application sur http://localhost:{port}/')
+    if show:
+        server.io_loop.add_callback(server.show, '/')
+    server.io_loop.start()
+
+
+def register_image_route(app, directory=None):
+    """Sert les images rendues sur le serveur Flask de Dash (IMAGE_ROUTE),
+    à utiliser avec RenderCache(base_url=IMAGE_ROUTE) quand l'application
+    tourne sous un serveur WSGI plutôt que sous bokeh serve."""
+    import flask
+    if 'wordclouds' in app.server.view_functions:
+        return
+    directory = os.path.abspath(directory or image_dir())
+
+    def send_image(name):
+        return flask.send_from_directory(directory, name, max_age=IMAGE_MAX_AGE)
+    app.server.add_url_rule(IMAGE_ROUTE + '<path:name>', 'wordclouds',
+                            send_image)
+
+
+def _load_or_render(directory, department, year, variant, fmt, force=False):
+    path = image_path(directory, department, year, variant, fmt)
+    if not force and os.path.exists(path):
+        with open(path, 'rb') as f:
+            return f.read()
+    image = render(department, year, variant, fmt)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = '%s.tmp-%d' % (path, os.getpid())
+    with open(tmp, 'wb') as f:
+        f.write(image)
+    os.replace(tmp, path)
+    return image
+
+
+def _init_worker(csv_path):
+    store.use_csv(csv_path)
+
+
+def _prerender_one(directory, department, year, variant, fmt, force):
+    _load_or_render(directory, department, year, variant, fmt, force)
+    return department, year
+
+
+def prerender(csv_path=data.CSV_PATH, variants=VARIANTS, fmt='png',
+              workers=None, force=False, directory=None):
+    """Rend toutes les images (département, année) manquantes sur disque
+    (dans le cache, ou dans directory)."""
+    _init_worker(csv_path)
+    directory = directory or image_dir(csv_path)
+    prune_renders(directory, variants)
+    jobs = [(directory, department, year, variant, fmt, force)
+            for variant in variants
+            for department in departments()
+            for year in years()
+            if force or not os.path.exists(
+                image_path(directory, department, year, variant, fmt))]
+    print(f'{len(jobs)} images à rendre dans {directory}')
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(csv_path,)) as pool:
+        futures = [pool.submit(_prerender_one, *job) for job in jobs]
+        for done, future in enumerate(as_completed(futures), 1):
+            future.result()
+            if done % 100 == 0 or done == len(futures):
+                print(f'{done}/{len(futures)}')
+    return directory
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Pré-rendu des nuages de mots')
+    parser.add_argument('csv_path', nargs='?', default=data.CSV_PATH)
+    parser.add_argument('--variant', choices=VARIANTS, action='append')
+    parser.add_argument('--format', choices=sorted(FORMATS), default='png')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--force', action='store_true')
+    args = parser.parse_args()
+    prerender(args.csv_path, args.variant or VARIANTS, args.format,
+              args.workers, args.force)
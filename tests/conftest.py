@@ -0,0 +1,36 @@
+"""Jeu de données synthétique partagé par les tests : prenoms.bench à
+l'échelle 1 (PRENOMS_TEST_ROWS lignes pour un jeu plus petit)."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from prenoms import bench, data
+
+ROWS = int(os.environ.get('PRENOMS_TEST_ROWS', bench.BASE_ROWS))
+
+
+@pytest.fixture(scope='session')
+def csv_path(tmp_path_factory):
+    return bench.generate_csv(str(tmp_path_factory.mktemp('x1') / data.CSV_PATH), ROWS)
+
+
+@pytest.fixture(scope='session')
+def reference(csv_path):
+    """Les données nettoyées comme le faisaient les scripts d'origine :
+    lecture complète avec pandas, sans cache."""
+    raw = pd.read_csv(csv_path, sep=';', dtype=str)
+    raw = raw[(raw['preusuel'] != '_PRENOMS_RARES') & (raw['dpt'] != 'XX')
+              & (raw['annais'] != 'XXXX')]
+    return raw.astype({'sexe': np.int64, 'annais': np.int64, 'nombre': np.int64})
+
+
+def as_table(frame, keys):
+    """frame sans catégories ni ordre de lignes, pour comparer deux
+    constructions."""
+    frame = frame.astype({col: str for col in frame.columns
+                          if isinstance(frame[col].dtype, pd.CategoricalDtype)})
+    frame = frame.astype({col: np.int64 for col in frame.columns
+                          if col not in ('preusuel', 'dpt')})
+    return frame.sort_values(keys).reset_index(drop=True)
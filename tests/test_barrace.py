@@ -0,0 +1,22 @@
+"""Course de barres sans données (aucun prénom pour la sélection)."""
+import numpy as np
+import pandas as pd
+
+from prenoms import barrace
+
+COLORS = np.array(['#8dd3c7', '#ffffb3'], dtype=object)
+
+
+def _empty():
+    return pd.DataFrame({
+        'annais': np.array([], dtype=np.int16),
+        'preusuel': pd.Categorical([], categories=['A', 'B']),
+        'nombre': np.array([], dtype=np.int32),
+    })
+
+
+def test_empty_figure_has_finite_range():
+    fig = barrace.bar_race_figure(_empty(), COLORS, 'populaire')
+    assert list(fig.layout.xaxis.range) == [0, 0]
+    assert not fig.frames
+
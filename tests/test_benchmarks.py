@@ -0,0 +1,57 @@
+"""Benchmarks des fonctions appelées par les callbacks, sur le jeu de
+l'échelle 1 (pytest-benchmark) :
+
+    pip install pytest-benchmark
+    python -m pytest tests/test_benchmarks.py --benchmark-autosave
+    python -m pytest tests/test_benchmarks.py --benchmark-compare --benchmark-compare-fail=median:25%
+
+prenoms.bench reste l'outil pour les échelles 10 et 100 et les mesures de
+mémoire et de taille des réponses.
+"""
+import pytest
+
+from prenoms import cube, data, store
+
+pytest.importorskip('pytest_benchmark')
+
+
+@pytest.fixture(scope='module')
+def loaded(csv_path):
+    store.use_csv(csv_path)
+    store.aggregates()
+    store.top_names()
+    store.name_colors()
+    yield
+    store.use_csv(data.CSV_PATH)
+
+
+def _year():
+    years = store.aggregates().years
+    return years[len(years) // 2]
+
+
+def _depts():
+    return store.top_names().depts.tolist()[:3]
+
+
+def test_national_slice(loaded, benchmark):
+    benchmark(store.aggregates().national_slice, _year())
+
+
+def test_departments_years(loaded, benchmark):
+    benchmark(store.aggregates().departments_years, _depts(), cube.SEX_ALL)
+
+
+def test_topk_national(loaded, benchmark):
+    benchmark(store.top_names().national, _year())
+
+
+def test_most_frequent_by_department(loaded, benchmark):
+    benchmark(store.top_names().most_frequent_by_department, _year())
+
+
+@pytest.mark.parametrize('depts', [None, 'three'])
+def test_bar_race_data(loaded, benchmark, depts):
+    from prenoms.pages import evolution
+    benchmark(evolution.bar_race_data, 'Tous', _depts() if depts else None,
+              'populaire')
@@ -0,0 +1,97 @@
+import os
+import threading
+
+from prenoms import cache, jobs
+
+
+def test_args_key_keeps_positional_order():
+    assert cache.args_key((1, 2)) != cache.args_key((2, 1))
+    assert cache.args_key((['Marie'], ['75'])) != cache.args_key((['75'], ['Marie']))
+
+
+def test_args_key_ignores_order_inside_lists():
+    assert cache.args_key((['75', '92'], 1)) == cache.args_key((['92', '75'], 1))
+    assert cache.args_key(([], 1)) == cache.args_key((None, 1))
+
+
+def test_memoize_distinguishes_argument_order():
+    figure_cache = cache.FigureCache(max_bytes=2**20, disk_dir='')
+    calls = []
+
+    @figure_cache.memoize
+    def f(a, b):
+        calls.append((a, b))
+        return (a, b)
+
+    assert f(1, 2) == (1, 2)
+    assert f(2, 1) == (2, 1)
+    assert f(['Marie'], ['75']) == (['Marie'], ['75'])
+    assert f(['75'], ['Marie']) == (['75'], ['Marie'])
+    assert f(1, 2) == (1, 2)
+    assert len(calls) == 4
+
+
+def test_job_key_keeps_positional_order():
+    def f(a, b):
+        pass
+    assert jobs._key(f, (1, 2)) != jobs._key(f, (2, 1))
+
+
+def test_data_version_is_part_of_the_key(tmp_path):
+    version = [1]
+    figure_cache = cache.FigureCache(max_bytes=2**20, disk_dir=str(tmp_path),
+                                     version=lambda: version[0])
+    calls = []
+
+    @figure_cache.memoize
+    def f(a):
+        calls.append(a)
+        return len(calls)
+
+    assert f(1) == 1
+    assert f(1) == 1
+    version[0] = 2
+    assert f(1) == 2
+    # Un autre worker qui partage le répertoire voit aussi la nouvelle version
+    other = cache.FigureCache(max_bytes=2**20, disk_dir=str(tmp_path),
+                              version=lambda: version[0])
+    assert other.memoize(f.__wrapped__)(1) == 2
+    assert other.stats()['disk_hits'] == 1
+
+
+def test_disk_tier_is_bounded(tmp_path):
+    figure_cache = cache.FigureCache(max_bytes=2**20, disk_dir=str(tmp_path),
+                                     disk_max_bytes=50_000, version=None)
+    for i in range(20):
+        figure_cache.set(('key', i), b'x' * 10_000)
+    sizes = [entry.stat().st_size for entry in os.scandir(tmp_path)]
+    assert sum(sizes) <= 50_000
+    assert figure_cache.stats()['disk_evictions'] > 0
+    assert os.path.exists(figure_cache._disk_path(('key', 19)))
+
+
+def test_memory_reads_do_not_wait_for_disk_trim(tmp_path):
+    figure_cache = cache.FigureCache(max_bytes=2**20, disk_dir=str(tmp_path),
+                                     disk_max_bytes=15_000, version=None)
+    figure_cache.set(('key', 0), b'x' * 10_000)
+    scanning, release = threading.Event(), threading.Event()
+    disk_files = figure_cache._disk_files
+
+    def slow_disk_files():
+        scanning.set()
+        release.wait(5)
+        return disk_files()
+
+    figure_cache._disk_files = slow_disk_files
+    writer = threading.Thread(target=figure_cache.set, args=(('key', 1), b'x' * 10_000))
+    writer.start()
+    try:
+        assert scanning.wait(5)
+        reader = threading.Thread(target=figure_cache.get, args=(('key', 0),))
+        reader.start()
+        reader.join(1)
+        assert not reader.is_alive()
+    finally:
+        release.set()
+        writer.join()
+    assert figure_cache.stats()['disk_evictions'] == 1
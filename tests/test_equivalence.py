@@ -0,0 +1,121 @@
+"""Le cache, le cube et l'index top K donnent les mêmes résultats que les
+groupby des scripts d'origine, et les différentes façons de les construire
+(ajout de fichiers, construction parallèle) donnent les mêmes tables."""
+import os
+
+import pandas as pd
+import pytest
+
+from prenoms import build, cube, data, ingest, topk
+
+from .conftest import as_table
+
+N_YEARS = 5
+
+
+@pytest.fixture(scope='session')
+def serial_dir(csv_path):
+    cache_dir = os.path.join(os.path.dirname(csv_path), 'serial')
+    topk.load_topk(csv_path, cache_dir)
+    return cache_dir
+
+
+def _years(reference):
+    years = sorted(reference['annais'].unique())
+    return years[::max(1, len(years) // N_YEARS)]
+
+
+def _counts(frame):
+    return dict(zip(frame['preusuel'].astype(str), frame['nombre'].astype(int)))
+
+
+def _sex_rows(reference, sex):
+    return reference if sex == cube.SEX_ALL else reference[reference['sexe'] == sex]
+
+
+@pytest.mark.parametrize('sex', [cube.SEX_ALL, 1, 2])
+def test_national_slice_matches_groupby(csv_path, serial_dir, reference, sex):
+    aggregates = cube.load_cube(csv_path, serial_dir)
+    rows = _sex_rows(reference, sex)
+    for year in _years(reference):
+        expected = rows[rows['annais'] == year].groupby('preusuel')['nombre'].sum()
+        assert _counts(aggregates.national_slice(year, sex)) == expected.to_dict()
+
+
+@pytest.mark.parametrize('sex', [cube.SEX_ALL, 2])
+def test_departments_years_matches_groupby(csv_path, serial_dir, reference, sex):
+    aggregates = cube.load_cube(csv_path, serial_dir)
+    depts = sorted(reference['dpt'].unique())[:3]
+    rows = _sex_rows(reference, sex)
+    expected = (rows[rows['dpt'].isin(depts)]
+                .groupby(['annais', 'preusuel'])['nombre'].sum().reset_index())
+    result = aggregates.departments_years(depts, sex)
+    pd.testing.assert_frame_equal(as_table(result, ['annais', 'preusuel']),
+                                  as_table(expected, ['annais', 'preusuel']))
+
+
+def _check_top(result, expected, k):
+    """result (preusuel, nombre) est un top k de la série expected."""
+    top = expected.sort_values(ascending=False).head(k)
+    assert result['nombre'].astype(int).tolist() == top.astype(int).tolist()
+    for name, count in zip(result['preusuel'], result['nombre']):
+        assert expected[name] == count
+
+
+@pytest.mark.parametrize('sex', [cube.SEX_ALL, 1, 2])
+def test_topk_matches_groupby(csv_path, serial_dir, reference, sex):
+    index = topk.load_topk(csv_path, serial_dir)
+    rows = _sex_rows(reference, sex)
+    dept = sorted(reference['dpt'].unique())[0]
+    for year in _years(reference):
+        year_rows = rows[rows['annais'] == year]
+        _check_top(index.national(year, sex),
+                   year_rows.groupby('preusuel')['nombre'].sum(), topk.K_NATIONAL)
+        _check_top(index.department(year, dept, sex),
+                   year_rows[year_rows['dpt'] == dept]
+                   .groupby('preusuel')['nombre'].sum(), topk.K_DEPARTMENTAL)
+        best = year_rows.groupby(['dpt', 'preusuel'])['nombre'].sum().groupby('dpt').max()
+        frame = index.most_frequent_by_department(year, sex)
+        assert dict(zip(frame['dpt'].astype(str), frame['nombre'].astype(int))) \
+            == best.to_dict()
+
+
+def _assert_same_cache(cache_dir, other_dir, csv_path, other_csv):
+    pd.testing.assert_frame_equal(
+        as_table(data.load_names(csv_path, cache_dir), data.KEYS),
+        as_table(data.load_names(other_csv, other_dir), data.KEYS))
+    aggregates = cube.load_cube(csv_path, cache_dir)
+    other = cube.load_cube(other_csv, other_dir)
+    for table, keys in (('national', cube.NATIONAL_KEYS),
+                        ('departmental', cube.DEPARTMENTAL_KEYS)):
+        pd.testing.assert_frame_equal(
+            as_table(getattr(aggregates, table), keys + ['preusuel']),
+            as_table(getattr(other, table), keys + ['preusuel']))
+    index = topk.load_topk(csv_path, cache_dir)
+    other_index = topk.load_topk(other_csv, other_dir)
+    for year in index.years.tolist():
+        for sex in (cube.SEX_ALL, 1, 2):
+            pd.testing.assert_frame_equal(
+                as_table(index.national(year, sex), ['nombre', 'preusuel']),
+                as_table(other_index.national(year, sex), ['nombre', 'preusuel']))
+
+
+def test_append_matches_full_build(csv_path, serial_dir, tmp_path):
+    raw = pd.read_csv(csv_path, sep=';', dtype=str)
+    year = pd.to_numeric(raw['annais'], errors='coerce')
+    # Les années 2000 à 2005 sont dans les deux fichiers : l'ajout les remplace
+    base = str(tmp_path / data.CSV_PATH)
+    raw[~(year > 2005)].to_csv(base, sep=';', index=False)
+    new = str(tmp_path / 'nouveau.csv')
+    raw[year >= 2000].to_csv(new, sep=';', index=False)
+
+    topk.load_topk(base)
+    years = ingest.append([new], base)
+    assert years[0] == 2000
+    _assert_same_cache(data.cache_dir_for(base), serial_dir, base, csv_path)
+
+
+def test_parallel_build_matches_serial(csv_path, serial_dir, tmp_path):
+    cache_dir = str(tmp_path / 'parallel')
+    build.build_all(csv_path, cache_dir, workers=2, chunksize=data.CHUNK_ROWS // 4)
+    _assert_same_cache(cache_dir, serial_dir, csv_path, csv_path)
@@ -0,0 +1,25 @@
+"""Compteurs écrits dans PRENOMS_METRICS_DIR par plusieurs threads à la
+fois (requêtes et /metrics)."""
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from prenoms import metrics
+
+N_THREADS = 8
+
+
+def test_concurrent_flushes(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, 'METRICS_DIR', str(tmp_path))
+    registry = metrics.Registry()
+    registry.increment('prenoms_callback_errors_total', {'callback': 'test'})
+
+    def flush(_):
+        for _ in range(50):
+            registry.flush()
+
+    with ThreadPoolExecutor(max_workers=N_THREADS) as pool:
+        list(pool.map(flush, range(N_THREADS)))
+    assert os.listdir(tmp_path) == [f'{os.getpid()}.json']
+    with open(tmp_path / f'{os.getpid()}.json') as f:
+        assert json.load(f)['counters'][0][2] == 1
@@ -0,0 +1,46 @@
+"""Les cartes s'ouvrent sur la première année des données, quelle qu'elle
+soit, et suivent le CSV utilisé."""
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from prenoms import data, geo, store
+
+ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                    'Initial Implementation')
+FIRST_YEAR = 1950
+
+
+@pytest.fixture
+def late_csv(csv_path, tmp_path, monkeypatch):
+    """Les données à partir de FIRST_YEAR, avec les contours à côté."""
+    raw = pd.read_csv(csv_path, sep=';', dtype=str)
+    year = pd.to_numeric(raw['annais'], errors='coerce')
+    path = str(tmp_path / data.CSV_PATH)
+    raw[year >= FIRST_YEAR].to_csv(path, sep=';', index=False)
+    shutil.copy(os.path.join(ROOT, geo.GEOJSON_DOMTOM), tmp_path)
+    monkeypatch.chdir(tmp_path)
+    store.use_csv(path)
+    yield path
+    store.use_csv(data.CSV_PATH)
+
+
+def test_maps_start_at_first_year(late_csv):
+    from prenoms.pages import regions, regions_domtom
+    assert regions.layout().children[1].value == FIRST_YEAR
+    page = regions_domtom.layout()
+    assert page.children[1].value == FIRST_YEAR
+    figure = next(child.figure for child in page.children
+                  if getattr(child, 'id', None) == regions_domtom._id('map-container'))
+    assert len(figure.data[0].z) > 0
+
+
+def test_map_values_follow_csv(csv_path, late_csv):
+    from prenoms.pages import regions_domtom
+    late = regions_domtom.colour_values('top', None, *regions_domtom._data_key())
+    store.use_csv(csv_path)
+    full = regions_domtom.colour_values('top', None, *regions_domtom._data_key())
+    assert min(late['years'], key=int) == str(FIRST_YEAR)
+    assert min(full['years'], key=int) < str(FIRST_YEAR)
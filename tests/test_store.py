@@ -0,0 +1,27 @@
+"""Les tables chargées par prenoms.store suivent les données : après un ajout
+de fichiers, elles sont relues."""
+import pandas as pd
+
+from prenoms import data, ingest, store, topk
+
+
+def test_tables_reloaded_after_append(csv_path, tmp_path):
+    raw = pd.read_csv(csv_path, sep=';', dtype=str)
+    year = pd.to_numeric(raw['annais'], errors='coerce')
+    last = int(year.max())
+    base = str(tmp_path / data.CSV_PATH)
+    raw[~(year >= last)].to_csv(base, sep=';', index=False)
+    new = str(tmp_path / 'nouveau.csv')
+    raw[year >= last].to_csv(new, sep=';', index=False)
+
+    topk.load_topk(base)
+    store.use_csv(base)
+    try:
+        assert store.aggregates().years[-1] == last - 1
+        version = store.data_version()
+        ingest.append([new], base)
+        assert store.data_version() != version
+        assert store.aggregates().years[-1] == last
+        assert store.top_names().years.tolist()[-1] == last
+    finally:
+        store.use_csv(data.CSV_PATH)
@@ -0,0 +1,32 @@
+import json
+import os
+
+import pytest
+
+from prenoms import geo, topology
+
+shapely_geometry = pytest.importorskip('shapely.geometry')
+
+ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                    'Initial Implementation')
+SOURCES = [geo.GEOJSON_DOMTOM, geo.GEOJSON_SIMPLIFIED]
+
+
+def _invalid(geojson):
+    return [feature['properties'].get('code') for feature in geojson['features']
+            if not shapely_geometry.shape(feature['geometry']).is_valid]
+
+
+@pytest.fixture(scope='module', params=SOURCES)
+def source(request):
+    with open(os.path.join(ROOT, request.param), encoding='utf-8') as f:
+        geojson = json.load(f)
+    assert _invalid(geojson) == []
+    return geojson
+
+
+@pytest.mark.parametrize('tier', list(geo.TIERS))
+def test_tiers_have_no_invalid_geometry(source, tier):
+    simplified = topology.to_geojson(topology.build_topology(source, geo.TIERS[tier]))
+    assert len(simplified['features']) == len(source['features'])
+    assert _invalid(simplified) == []
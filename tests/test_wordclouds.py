@@ -0,0 +1,33 @@
+"""Les nuages de mots rendus en parallèle (callbacks Dash dans des threads)
+sont identiques à ceux rendus un par un. La disposition stable
+(layouts) est déterministe, contrairement à generate_from_frequencies."""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from prenoms import store, wordclouds
+
+pytest.importorskip('wordcloud')
+
+N_RENDERS = 4
+
+
+def test_concurrent_renders_match_serial(csv_path):
+    store.use_csv(csv_path)
+    year = wordclouds.years()[0]
+    jobs = [(wordclouds.ALL_DEPARTMENTS, year)] + [
+        (department, year) for department in wordclouds.departments()[:N_RENDERS - 1]]
+
+    def render(job):
+        return wordclouds.generate_wordcloud(*job, 'simple', {}).tobytes()
+
+    serial = [render(job) for job in jobs]
+    with ThreadPoolExecutor(max_workers=N_RENDERS) as pool:
+        for _ in range(2):
+            assert list(pool.map(render, jobs)) == serial
+
+
+def test_wordcloud_instance_per_render():
+    # Le partage d'une instance n'échoue pas toujours sur une machine à un
+    # seul cœur : on vérifie directement qu'elle n'est pas partagée
+    assert wordclouds._wordcloud(300, 125) is not wordclouds._wordcloud(300, 125)